@@ -0,0 +1,167 @@
+"""Charge locale de l'API HTTP : requêtes/s et latences, rendus à froid et à chaud.
+
+Usage : python -m benchmarks.bench_api [clients] [requêtes par client]
+Démarre ``qrpro.api:app`` sous uvicorn sur un port local, puis des clients
+en threads (connexions HTTP/1.1 persistantes) enchaînent les requêtes.
+Échoue (AssertionError) si une réponse n'a pas le statut attendu, si l'ETag
+d'un rendu change d'une requête à l'autre, si un ``If-None-Match`` ne donne
+pas un 304 vide, ou si le ZIP d'un lot est incomplet.
+"""
+import http.client
+import json
+import socket
+import sys
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from urllib.parse import urlencode
+
+import uvicorn
+
+from qrpro.cache import encode_cache, render_cache
+from qrpro.timing import _percentile
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _start_server():
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config('qrpro.api:app', host='127.0.0.1', port=port,
+                                           log_level='warning', lifespan='on'))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    return server, thread, port
+
+
+def _query(i, fmt='png'):
+    return '/qr?' + urlencode({'type': 'url', 'url': f'https://exemple.fr/produit/{i}',
+                               'format': fmt, 'box_size': 8})
+
+
+class Client:
+    """Connexion persistante ; ``request`` renvoie (statut, en-têtes, corps, secondes)"""
+
+    def __init__(self, port):
+        self.connection = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+
+    def request(self, method, path, body=None, headers=None):
+        start = time.perf_counter()
+        self.connection.request(method, path, body=body, headers=headers or {})
+        response = self.connection.getresponse()
+        payload = response.read()
+        return response.status, dict(response.getheaders()), payload, time.perf_counter() - start
+
+    def close(self):
+        self.connection.close()
+
+
+def _load(port, clients, requests, make_request, expected):
+    """``clients`` clients × ``requests`` requêtes ; statistiques de latence"""
+    def play(number):
+        client = Client(port)
+        latencies = []
+        try:
+            for i in range(requests):
+                method, path, headers = make_request(number * requests + i)
+                status, _, _, seconds = client.request(method, path, headers=headers)
+                assert status == expected, (path, status)
+                latencies.append(seconds)
+        finally:
+            client.close()
+        return latencies
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(clients) as pool:
+        latencies = sorted(v for values in pool.map(play, range(clients)) for v in values)
+    elapsed = time.perf_counter() - start
+    return {'requests': len(latencies), 'rps': len(latencies) / elapsed,
+            'p50': _percentile(latencies, 0.50), 'p90': _percentile(latencies, 0.90),
+            'p99': _percentile(latencies, 0.99)}
+
+
+def _check_contract(port):
+    client = Client(port)
+    status, headers, png, _ = client.request('GET', _query(0))
+    assert status == 200 and png.startswith(b'\x89PNG') and headers['content-type'] == 'image/png'
+    tag = headers['etag']
+    status, headers, _, _ = client.request('GET', _query(0))
+    assert headers['etag'] == tag
+    status, headers, body, _ = client.request('GET', _query(0), headers={'If-None-Match': tag})
+    assert status == 304 and body == b'' and headers['etag'] == tag
+    status, headers, svg, _ = client.request('GET', _query(0, 'svg'))
+    assert status == 200 and svg.lstrip().startswith(b'<') and headers['etag'] != tag
+    body = json.dumps({'type': 'wifi', 'ssid': 'Boutique', 'password': 'secret',
+                       'format': 'svg', 'config': {'error_correction': 'H', 'border': 2}})
+    status, headers, _, _ = client.request('POST', '/qr', body, {'Content-Type': 'application/json'})
+    assert status == 200 and headers['content-type'] == 'image/svg+xml', status
+    for path, expected in (('/qr?type=wifi', 400), ('/qr?data=x&box_size=500', 400),
+                           ('/qr?data=x&format=gif', 400), ('/nulle-part', 404),
+                           ('/batch', 405), ('/health', 200)):
+        status, _, _, _ = client.request('GET', path)
+        assert status == expected, (path, status)
+    client.close()
+
+
+def _batch(port, count):
+    records = [{'type': 'url', 'url': f'https://exemple.fr/lot/{i}', 'filename': f'code-{i}'}
+               for i in range(count)]
+    client = Client(port)
+    status, headers, body, seconds = client.request(
+        'POST', '/batch?format=png&box_size=6', json.dumps(records),
+        {'Content-Type': 'application/json'})
+    client.close()
+    assert status == 200 and headers.get('Transfer-Encoding') == 'chunked', headers
+    with zipfile.ZipFile(BytesIO(body)) as archive:
+        names = archive.namelist()
+        assert len(names) == count and archive.testzip() is None
+    print(f"lot de {count} PNG en flux : {seconds:.2f} s ({count / seconds:.0f} codes/s, "
+          f"{len(body) / 2**20:.1f} Mo)")
+
+
+def _print(name, stats):
+    print(f"{name:<22} {stats['requests']:>6} {stats['rps']:>9.0f} {stats['p50'] * 1000:>8.2f} "
+          f"{stats['p90'] * 1000:>8.2f} {stats['p99'] * 1000:>8.2f}")
+
+
+def main(clients=8, requests=100):
+    server, thread, port = _start_server()
+    try:
+        _check_contract(port)
+        render_cache.clear()
+        encode_cache.clear()
+        print(f"{clients} clients × {requests} requêtes")
+        print(f"{'scénario':<22} {'requêtes':>6} {'req/s':>9} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8}")
+        # Chaque requête est un contenu nouveau : rendu complet dans le pool
+        offset = 1000
+        _print('froid png', _load(port, clients, requests,
+                                  lambda i: ('GET', _query(offset + i), {}), 200))
+        _print('svg du même rendu', _load(port, clients, requests,
+                                          lambda i: ('GET', _query(offset + i, 'svg'), {}), 200))
+        # Mêmes URL : servies depuis le cache de rendu
+        _print('chaud png', _load(port, clients, requests,
+                                  lambda i: ('GET', _query(offset + i), {}), 200))
+        tags = {}
+        probe = Client(port)
+        for i in range(clients * requests):
+            tags[i] = probe.request('GET', _query(offset + i))[1]['etag']
+        probe.close()
+        # Le client a déjà l'image : 304 sans rendu ni encodage
+        _print('conditionnel 304', _load(port, clients, requests,
+                                         lambda i: ('GET', _query(offset + i),
+                                                    {'If-None-Match': tags[i]}), 304))
+        _batch(port, 500)
+    finally:
+        server.should_exit = True
+        thread.join()
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,109 @@
+"""Estimation par table de capacités : exactitude et coût face à l'encodage.
+
+Usage : python -m benchmarks.bench_capacity [essais]
+Échoue (AssertionError) si la table diffère des capacités de la norme
+(ISO 18004, tableau 7), si la version estimée d'un contenu numérique n'est
+pas celle de ``compile_payload``, ou si la version réelle d'un autre contenu
+sort de l'encadrement estimé (ou en diffère alors qu'il est annoncé exact).
+"""
+import random
+import sys
+import time
+
+from benchmarks.bench_error_correction import NAMES
+from benchmarks.bench_segments import PAYLOADS
+from qrpro.cache import encode_cache
+from qrpro.capacity import CAPACITY, LEVELS, estimate
+from qrpro.generator import encode_matrix
+from qrpro.segments import ALPHANUMERIC, BYTE, NUMERIC, compile_payload
+
+# (version, niveau) -> (numérique, alphanumérique, octets), extraits de la norme
+REFERENCE = {
+    (1, 'L'): (41, 25, 17), (1, 'H'): (17, 10, 7),
+    (10, 'M'): (513, 311, 213), (40, 'L'): (7089, 4296, 2953), (40, 'H'): (3057, 1852, 1273),
+}
+ALPHABETS = {NUMERIC: '0123456789', ALPHANUMERIC: '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ $%*+-./:',
+             BYTE: 'abcdéxyz!?€'}
+
+
+def _check_table():
+    levels = {name: level for level, name in NAMES.items()}
+    for (version, name), expected in REFERENCE.items():
+        found = tuple(CAPACITY[levels[name]][mode][version] for mode in (NUMERIC, ALPHANUMERIC, BYTE))
+        assert found == expected, (version, name, found, expected)
+
+
+# Alphanumériques avec des suites de chiffres : un segment numérique les raccourcit
+DIGIT_RUNS = ('A' + '1' * 60, 'TEL:+33612345678901234', 'HTTPS://EXAMPLE.COM/' + '1' * 40)
+
+
+def _check_bounds(guess, actual, context):
+    if actual is None:
+        assert guess.version is None, context
+        return
+    assert guess.low <= actual <= (guess.version or 40), (context, guess.low, actual, guess.version)
+    assert not guess.exact or guess.version == actual, (context, guess.version, actual)
+
+
+def _check_single_mode(trials):
+    for data in DIGIT_RUNS:
+        for level in LEVELS:
+            guess = estimate(data, {'error_correction': level})
+            _check_bounds(guess, compile_payload(data, level).version, (data, level))
+
+    rng = random.Random(0)
+    for _ in range(trials):
+        mode = rng.choice(list(ALPHABETS))
+        data = ''.join(rng.choice(ALPHABETS[mode]) for _ in range(rng.randint(1, 3200)))
+        level = rng.choice(LEVELS)
+        version = rng.choice((None, None, rng.randint(1, 40)))
+        guess = estimate(data, {'error_correction': level, 'version': version})
+        actual = compile_payload(data, level, version).version
+        assert guess.exact or mode != NUMERIC, (mode, len(data), level)
+        _check_bounds(guess, actual, (mode, len(data), level))
+
+
+def _check_corpus():
+    # Contenus mixtes : la version réelle reste dans l'encadrement [low, version]
+    print(f"{'contenu':<12} " + " ".join(f"{NAMES[level]:>9}" for level in LEVELS))
+    for name, data in PAYLOADS.items():
+        cells = []
+        for level in LEVELS:
+            guess = estimate(data, {'error_correction': level})
+            actual = compile_payload(data, level).version
+            _check_bounds(guess, actual, (name, NAMES[level]))
+            bounds = str(guess.version) if guess.exact else f"{guess.low}-{guess.version}"
+            cells.append(f"{bounds}:{actual}")
+        print(f"{name:<12} " + " ".join(f"{cell:>9}" for cell in cells))
+    print("(versions estimées : réelle)")
+
+
+def _per_call(func, data, reset=None, loops=200):
+    start = time.perf_counter()
+    for i in range(loops):
+        if reset:
+            reset()
+        func(data + str(i))
+    return (time.perf_counter() - start) / loops
+
+
+def _timing():
+    config = {'error_correction': 'auto', 'box_size': 10, 'border': 4}
+    print(f"{'contenu':<12} {'estimation µs':>14} {'segments µs':>12} {'encodage µs':>12}")
+    for name, data in PAYLOADS.items():
+        guess = _per_call(lambda d: estimate(d, config), data)
+        segments = _per_call(lambda d: compile_payload(d, LEVELS[0]), data,
+                             compile_payload.cache_clear)
+        matrix = _per_call(lambda d: encode_matrix(d, config), data, encode_cache.clear, loops=20)
+        print(f"{name:<12} {guess * 1e6:>14.1f} {segments * 1e6:>12.1f} {matrix * 1e6:>12.1f}")
+
+
+def main(trials=2000):
+    _check_table()
+    _check_single_mode(trials)
+    _check_corpus()
+    _timing()
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,58 @@
+"""Niveau de correction « auto » face à H imposé, sur un corpus de contenus.
+
+Usage : python -m benchmarks.bench_error_correction
+Pour chaque taille de logo : niveau retenu, version, côté de l'image et
+taille du PNG, avec H (ancien comportement) puis en auto. Échoue
+(AssertionError) si l'auto choisit une version plus grande que H, ou un
+niveau autre que H qui ne résiste pas à l'occultation calculée (H est le
+repli quand aucun niveau ne tient : compté à part).
+"""
+from collections import Counter
+
+from benchmarks.bench_segments import PAYLOADS
+from benchmarks.fixtures import solid_logo
+from qrpro.cache import render_cache
+from qrpro.generator import compile_data, error_correction, generate_qr_artifact
+from qrpro.occlusion import covered_modules, survives
+
+NAMES = {1: 'L', 0: 'M', 3: 'Q', 2: 'H'}
+LOGO_SIZES = (0, 10, 15, 25, 40)
+
+
+def _measure(data, config):
+    compiled = compile_data(data, config)
+    artifact = generate_qr_artifact(data, config)
+    return compiled.version, artifact.size[0], len(artifact.png)
+
+
+def main():
+    logo = solid_logo()
+    print(f"{'logo %':>6} {'niveaux auto':>22} {'version H→auto':>15} {'côté px H→auto':>16} {'PNG H→auto':>16}")
+    for logo_size in LOGO_SIZES:
+        base = {'box_size': 10, 'border': 4}
+        if logo_size:
+            base.update(logo=logo, logo_size=logo_size)
+        levels = Counter()
+        totals = {'H': [0, 0, 0], 'auto': [0, 0, 0]}
+        for data in PAYLOADS.values():
+            render_cache.clear()
+            for mode in ('H', 'auto'):
+                config = dict(base, error_correction=2 if mode == 'H' else 'auto')
+                measured = _measure(data, config)
+                totals[mode] = [t + m for t, m in zip(totals[mode], measured)]
+            level = error_correction(data, dict(base, error_correction='auto'))
+            version = compile_data(data, dict(base, error_correction='auto')).version
+            readable = survives(version, level, covered_modules(version, 4, 10, logo_size))
+            assert readable or level == 2, (data, level)
+            assert version <= compile_data(data, dict(base, error_correction=2)).version
+            levels[NAMES[level] if readable else 'illisible'] += 1
+        count = len(PAYLOADS)
+        (v_h, px_h, png_h), (v_a, px_a, png_a) = totals['H'], totals['auto']
+        mix = ' '.join(f"{name}×{levels[name]}" for name in ('L', 'M', 'Q', 'H', 'illisible')
+                       if levels[name])
+        print(f"{logo_size:>6} {mix:>22} {v_h / count:>6.1f} → {v_a / count:<6.1f} "
+              f"{px_h / count:>6.0f} → {px_a / count:<6.0f} {png_h / 1024:>6.1f} → {png_a / 1024:<5.1f}Ko")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""Planches d'étiquettes : débit, mémoire et partage des codes identiques.
+
+Usage : python -m benchmarks.bench_labels [étiquettes]
+Écrit les planches dans un fichier temporaire et échoue (AssertionError) si
+le PDF ne contient pas une Form XObject par code distinct et une page par
+planche, ou si le pic mémoire croît avec le nombre d'étiquettes.
+"""
+import math
+import os
+import re
+import sys
+import tempfile
+import tracemalloc
+
+from qrpro.cache import encode_cache
+from qrpro.labels import TEMPLATES, write_label_sheets
+
+TEMPLATE = 'avery-l7160'
+
+
+def _records(count, distinct):
+    # Enregistrements produits à la volée : rien n'est gardé en mémoire côté appelant
+    for i in range(count):
+        yield {'type': 'url', 'url': f'https://exemple.fr/article/{i % distinct}',
+               'label': f'Article n°{i % distinct} – réf. {i}'}
+
+
+def _run(count, distinct):
+    encode_cache.clear()
+    fd, path = tempfile.mkstemp(suffix='.pdf')
+    os.close(fd)
+    try:
+        tracemalloc.start()
+        stats = write_label_sheets(_records(count, distinct), {}, path, TEMPLATE)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        with open(path, 'rb') as f:
+            pdf = f.read()
+    finally:
+        os.unlink(path)
+    forms = len(re.findall(rb'/Subtype /Form', pdf))
+    pages = len(re.findall(rb'/Type /Page\b(?!s)', pdf))
+    expected_pages = math.ceil(count / TEMPLATES[TEMPLATE].per_page)
+    assert stats['written'] == count and not stats['errors'], stats['errors'][:3]
+    assert forms == stats['distinct'] == min(count, distinct), (forms, stats['distinct'])
+    assert pages == stats['pages'] == expected_pages, (pages, expected_pages)
+    return stats, peak, len(pdf)
+
+
+def main(count=10000):
+    print(f"{'étiquettes':>10} {'distincts':>9} {'pages':>6} {'PDF Mo':>7} "
+          f"{'pic Mo':>7} {'s':>6} {'étiq./s':>8}")
+    peaks = {}
+    for labels in (count // 10, count):
+        for distinct in (50, count // 10):
+            stats, peak, size = _run(labels, distinct)
+            peaks[labels, distinct] = peak
+            print(f"{labels:>10} {stats['distinct']:>9} {stats['pages']:>6} {size / 1e6:>7.2f} "
+                  f"{peak / 1e6:>7.2f} {stats['seconds']:>6.2f} {stats['codes_per_second']:>8.0f}")
+    # À codes distincts égaux, le pic ne dépend pas du nombre de pages
+    for distinct in (50, count // 10):
+        assert peaks[count, distinct] < 1.5 * peaks[count // 10, distinct], peaks
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,50 @@
+"""Compare l'encodage qrcode d'origine et FastQRCode (masques vectorisés).
+
+Usage : python -m benchmarks.bench_masking [répétitions]
+"""
+import random
+import sys
+import time
+
+import qrcode
+from qrcode import util
+
+from qrpro.masking import FastQRCode
+
+
+def _payload(version, error_correction):
+    # Contenu octet remplissant ~90 % de la capacité de la version
+    capacity_bits = util.BIT_LIMIT_TABLE[error_correction][version]
+    length = max(1, int((capacity_bits - 20) / 8 * 0.9))
+    rng = random.Random(version)
+    return ''.join(rng.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(length))
+
+
+def _best_of(cls, data, version, error_correction, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        qr = cls(version=version, error_correction=error_correction)
+        qr.add_data(data)
+        start = time.perf_counter()
+        qr.make(fit=False)
+        best = min(best, time.perf_counter() - start)
+    return best, qr.modules
+
+
+def main(repeat=3):
+    error_correction = qrcode.constants.ERROR_CORRECT_H
+    print(f"{'version':>7} {'octets':>7} {'qrcode ms':>10} {'numpy ms':>9} {'gain':>6}  identique")
+    total_ref = total_fast = 0.0
+    for version in range(1, 41):
+        data = _payload(version, error_correction)
+        t_ref, ref = _best_of(qrcode.QRCode, data, version, error_correction, repeat)
+        t_fast, fast = _best_of(FastQRCode, data, version, error_correction, repeat)
+        total_ref += t_ref
+        total_fast += t_fast
+        print(f"{version:>7} {len(data):>7} {t_ref * 1000:>10.1f} {t_fast * 1000:>9.1f} "
+              f"{t_ref / t_fast:>5.1f}x  {'oui' if ref == fast else 'NON'}")
+    print(f"{'total':>7} {'':>7} {total_ref * 1000:>10.1f} {total_fast * 1000:>9.1f} {total_ref / total_fast:>5.1f}x")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 3)
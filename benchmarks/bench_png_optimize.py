@@ -0,0 +1,55 @@
+"""Taille et durée du PNG optimisé face au PNG RGBA 32 bits d'origine.
+
+Usage : python -m benchmarks.bench_png_optimize
+Échoue (AssertionError) si une image optimisée ne redonne pas exactement
+les mêmes pixels.
+"""
+import time
+from io import BytesIO
+
+import numpy as np
+from PIL import Image
+
+from qrpro.generator import generate_qr_artifact
+from qrpro.png_optimize import optimized_png, rgba_png
+
+
+def _logo():
+    logo = Image.radial_gradient('L').resize((256, 256)).convert('RGB')
+    logo.putalpha(Image.radial_gradient('L').resize((256, 256)).point(lambda v: 255 - v))
+    buffered = BytesIO()
+    logo.save(buffered, format='PNG')
+    return buffered.getvalue()
+
+
+CASES = {
+    'noir/blanc': {},
+    'couleurs': {'fill_color': '#1A237E', 'back_color': '#FFF8E1'},
+    'fond transparent': {'back_color': 'transparent'},
+    'logo': {'logo': _logo(), 'logo_size': 20},
+}
+
+
+def _timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+def main():
+    print(f"{'cas':>17} {'box':>4} {'RGBA ko':>8} {'ms':>6} {'optimisé ko':>12} {'ms':>6} {'gain':>6} mode")
+    for name, options in CASES.items():
+        for box_size in (10, 30):
+            artifact = generate_qr_artifact('https://example.com/' + 'x' * 300,
+                                            dict(options, box_size=box_size))
+            t_ref, ref = _timed(lambda: rgba_png(artifact.image))
+            t_opt, opt = _timed(lambda: optimized_png(artifact.image, artifact.matrix, artifact.style))
+            decoded = Image.open(BytesIO(opt))
+            same = np.array_equal(np.asarray(decoded.convert('RGBA')), np.asarray(artifact.image))
+            assert same, f"pixels différents pour {name}"
+            print(f"{name:>17} {box_size:>4} {len(ref) / 1024:>8.1f} {t_ref * 1000:>6.1f} "
+                  f"{len(opt) / 1024:>12.1f} {t_opt * 1000:>6.1f} {len(ref) / len(opt):>5.1f}x {decoded.mode}")
+
+
+if __name__ == '__main__':
+    main()
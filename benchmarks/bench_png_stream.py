@@ -0,0 +1,59 @@
+"""Mémoire de pointe de l'écriture PNG en flux selon box_size.
+
+Usage : python -m benchmarks.bench_png_stream
+Échoue (AssertionError) si la mémoire de pointe dépasse un budget fixe,
+indépendant de box_size, ou si l'image relue diffère du rendu raster.
+"""
+import io
+import time
+import tracemalloc
+
+import numpy as np
+from PIL import Image
+
+from qrpro.cache import normalize_config
+from qrpro.generator import encode_matrix, render_matrix
+from qrpro.png_stream import write_png_stream
+
+# Une ligne de pixels (1 bit) + l'état de zlib + les blocs IDAT en attente
+PEAK_BUDGET = 2 * 1024 * 1024
+
+
+class _CountingSink:
+    """Flux de sortie qui ne garde rien : seule la taille est comptée"""
+
+    def __init__(self):
+        self.size = 0
+
+    def write(self, data):
+        self.size += len(data)
+
+
+def main():
+    matrix = encode_matrix('x' * 1200, {})  # version 40
+    style = normalize_config({'fill_color': '#0D47A1'})
+
+    # Contrôle de fidélité sur une petite taille
+    buffered = io.BytesIO()
+    write_png_stream(buffered, matrix, style)
+    streamed = np.asarray(Image.open(io.BytesIO(buffered.getvalue())).convert('RGBA'))
+    assert np.array_equal(streamed, np.asarray(render_matrix(matrix, style))), "pixels différents"
+
+    print(f"{'box':>4} {'pixels':>13} {'RGBA équivalent':>16} {'pic mémoire':>12} {'PNG':>10} {'s':>6}")
+    for box_size in (10, 30, 100, 200, 400):
+        style = normalize_config({'box_size': box_size, 'fill_color': '#0D47A1'})
+        sink = _CountingSink()
+        tracemalloc.start()
+        start = time.perf_counter()
+        write_png_stream(sink, matrix, style)
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        side = (matrix.shape[0] + 2 * style['border']) * box_size
+        print(f"{box_size:>4} {side:>6}x{side:<6} {side * side * 4 / 1e6:>13.0f} Mo "
+              f"{peak / 1024:>9.0f} Ko {sink.size / 1024:>7.0f} Ko {elapsed:>6.2f}")
+        assert peak <= PEAK_BUDGET, f"pic mémoire {peak} octets pour box_size={box_size}"
+
+
+if __name__ == '__main__':
+    main()
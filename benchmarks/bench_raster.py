@@ -0,0 +1,44 @@
+"""Compare les moteurs de rendu 'pil' (qrcode) et 'numpy' (qrpro.raster).
+
+Usage : python -m benchmarks.bench_raster [répétitions]
+"""
+import sys
+import time
+
+import numpy as np
+import qrcode
+
+from qrpro.raster import rasterize
+
+VERSIONS = (1, 10, 20, 30, 40)
+BOX_SIZES = (5, 10, 20, 30)
+
+
+def _best_of(func, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main(repeat=3):
+    print(f"{'version':>7} {'box':>4} {'pixels':>11} {'pil ms':>9} {'numpy ms':>9} {'gain':>6}  identique")
+    for version in VERSIONS:
+        qr = qrcode.QRCode(version=version, box_size=1, border=4,
+                           error_correction=qrcode.constants.ERROR_CORRECT_H)
+        qr.add_data('QR')
+        qr.make(fit=False)
+        matrix = qr.get_matrix()
+        for box_size in BOX_SIZES:
+            qr.box_size = box_size
+            t_pil, ref = _best_of(lambda: qr.make_image(fill_color='#1a237e', back_color='#FFFFFF').convert('RGBA'), repeat)
+            t_np, img = _best_of(lambda: rasterize(matrix, box_size, '#1a237e', '#FFFFFF'), repeat)
+            same = np.array_equal(np.asarray(ref), np.asarray(img))
+            print(f"{version:>7} {box_size:>4} {ref.size[0]:>5}x{ref.size[1]:<5} "
+                  f"{t_pil * 1000:>9.1f} {t_np * 1000:>9.1f} {t_pil / t_np:>5.1f}x  {'oui' if same else 'NON'}")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 3)
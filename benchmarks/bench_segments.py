@@ -0,0 +1,86 @@
+"""Version et modules avec les segments optimaux, face au découpage par défaut.
+
+Usage : python -m benchmarks.bench_segments
+Relit chaque flux de bits (mode, longueur, données) pour vérifier qu'il
+redonne le contenu, et échoue (AssertionError) si la compilation produit
+une version plus grande que le découpage de ``QRCode.add_data``.
+"""
+import time
+
+import qrcode
+from qrcode import util
+
+from qrpro.payloads import (create_email_qr, create_event_qr, create_sms_qr,
+                            create_tel_qr, create_url_qr, create_vcard_qr,
+                            create_wifi_qr)
+from qrpro.segments import (ALPHANUMERIC, BYTE, NUMERIC, _BANDS, _COUNT_BITS,
+                            compile_payload)
+
+PAYLOADS = {
+    'tel': create_tel_qr('+33 6 12 34 56 78'),
+    'sms': create_sms_qr('+33612345678', 'Code 482913'),
+    'wifi': create_wifi_qr('LIVEBOX-4F2A', '8F3K2J9D7Q', 'WPA'),
+    'vcard': create_vcard_qr({'name': 'Jean Dupont', 'phone': '+33612345678',
+                              'email': 'jean.dupont@example.com', 'company': 'ACME'}),
+    'email': create_email_qr('contact@example.com', 'Commande 20240517', 'Merci'),
+    'event': create_event_qr('Réunion', description='Salle B12'),
+    'url MAJ': create_url_qr('HTTPS://EXAMPLE.COM/P/0012345678'),
+    'url': create_url_qr('https://example.com/produit?id=123456789012'),
+}
+
+
+def _read_back(segments, band):
+    # Écrit les segments comme qrcode, puis les relit bit à bit
+    buffer = util.BitBuffer()
+    for mode, chunk in segments:
+        data = util.QRData(chunk, mode=mode)
+        buffer.put(mode, 4)
+        buffer.put(len(data), _COUNT_BITS[mode][band])
+        data.write(buffer)
+    bits = ''.join('1' if buffer.get(i) else '0' for i in range(len(buffer)))
+    pos, out = 0, b''
+
+    def take(n):
+        nonlocal pos
+        pos += n
+        return int(bits[pos - n:pos], 2)
+
+    while pos < len(bits):
+        mode = take(4)
+        length = take(_COUNT_BITS[mode][band])
+        if mode == NUMERIC:
+            for i in range(0, length, 3):
+                group = min(3, length - i)
+                out += str(take((0, 4, 7, 10)[group])).zfill(group).encode()
+        elif mode == ALPHANUMERIC:
+            for i in range(0, length, 2):
+                if length - i >= 2:
+                    value = take(11)
+                    out += bytes([util.ALPHA_NUM[value // 45], util.ALPHA_NUM[value % 45]])
+                else:
+                    out += bytes([util.ALPHA_NUM[take(6)]])
+        else:
+            assert mode == BYTE
+            out += bytes(take(8) for _ in range(length))
+    return out
+
+
+def main():
+    ec = qrcode.constants.ERROR_CORRECT_H
+    print(f"{'contenu':>8} {'car.':>5} {'défaut':>14} {'optimisé':>14} {'bits':>11} {'µs':>6}")
+    for name, data in PAYLOADS.items():
+        compile_payload.cache_clear()
+        start = time.perf_counter()
+        compiled = compile_payload(data, ec)
+        micros = (time.perf_counter() - start) * 1e6
+        band = next(b for b, (low, high) in enumerate(_BANDS) if low <= compiled.version <= high)
+        assert _read_back(compiled.segments, band) == data.encode('utf-8'), name
+        assert compiled.version <= compiled.default_version, name
+        before, after = compiled.default_version, compiled.version
+        print(f"{name:>8} {len(data):>5} "
+              f"{f'v{before} {compiled.modules(before)}²':>14} {f'v{after} {compiled.modules(after)}²':>14} "
+              f"{compiled.default_bits:>5}→{compiled.bits:<5} {micros:>6.0f}")
+
+
+if __name__ == '__main__':
+    main()
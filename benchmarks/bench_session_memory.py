@@ -0,0 +1,41 @@
+"""Empreinte mémoire par session : SessionQR contre l'image RGBA complète.
+
+Usage : python -m benchmarks.bench_session_memory
+Échoue (AssertionError) si l'empreinte d'une session dépend de box_size.
+"""
+import pickle
+
+import numpy as np
+
+from qrpro.cache import render_cache
+from qrpro.generator import generate_qr_artifact
+from qrpro.session import SessionQR
+
+# Budget documenté dans SessionQR : bitmap version 40 + style + clé
+SESSION_BUDGET = 8 * 1024
+
+
+def main():
+    payload = 'x' * 1200  # version 40 en correction H
+    print(f"{'box':>4} {'image RGBA':>12} {'session':>9} {'pickle':>8}  reconstruit")
+    footprints = set()
+    for box_size in (5, 10, 20, 30):
+        config = {'box_size': box_size, 'border': 4, 'fill_color': '#0D47A1'}
+        artifact = generate_qr_artifact(payload, config)
+        session = SessionQR.from_artifact(artifact)
+
+        render_cache.clear()  # force la reconstruction depuis le bitmap
+        rebuilt = session.artifact()
+        same = np.array_equal(np.asarray(rebuilt.image), np.asarray(artifact.image))
+
+        pickled = len(pickle.dumps(session))
+        footprints.add(session.nbytes)
+        print(f"{box_size:>4} {artifact.nbytes:>12,} {session.nbytes:>9,} {pickled:>8,}  {'oui' if same else 'NON'}")
+        assert same, "reconstruction différente du rendu d'origine"
+        assert pickled <= SESSION_BUDGET, f"session trop lourde: {pickled} octets"
+    # Seule la longueur des nombres du style varie (quelques octets)
+    assert max(footprints) - min(footprints) <= 16, "l'empreinte de session dépend de box_size"
+
+
+if __name__ == '__main__':
+    main()
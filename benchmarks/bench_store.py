@@ -0,0 +1,83 @@
+"""Cache disque : service à froid depuis le disque et accès concurrents.
+
+Usage : python -m benchmarks.bench_store
+Un processus neuf (caches mémoire vides) sert un code déjà rendu par un
+autre depuis le disque, puis plusieurs processus écrivent et lisent en même
+temps sous un budget serré. Échoue (AssertionError) si une lecture renvoie
+des octets incomplets ou si l'index dépasse le budget.
+"""
+import multiprocessing
+import os
+import tempfile
+import time
+
+PAYLOADS = [f'https://example.com/produit/{i:04d}' for i in range(40)]
+CONFIG = {'box_size': 20, 'fill_color': '#1A237E'}
+
+
+def _serve(directory, queue):
+    # Processus neuf : seule la variable d'environnement relie les caches
+    os.environ['QRPRO_STORE_DIR'] = directory
+    from qrpro.generator import generate_qr_artifact
+    start = time.perf_counter()
+    for data in PAYLOADS:
+        generate_qr_artifact(data, CONFIG).png
+        generate_qr_artifact(data, CONFIG).svg
+    queue.put(time.perf_counter() - start)
+
+
+def _timed_run(directory):
+    queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_serve, args=(directory, queue))
+    process.start()
+    seconds = queue.get()
+    process.join()
+    return seconds
+
+
+def _hammer(directory, worker, max_bytes, errors):
+    from qrpro.store import DiskStore
+    disk = DiskStore(directory, max_bytes=max_bytes)
+    for i in range(300):
+        key = f'{(i * 7 + worker) % 50:064x}'
+        expected = key.encode() * 64
+        view = disk.get(key, 'PNG')
+        if view is not None and bytes(view) != expected:
+            errors.put(key)
+        disk.put(key, 'PNG', expected)
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        cold = _timed_run(directory)
+        warm = _timed_run(directory)
+        print(f"{len(PAYLOADS)} codes PNG+SVG, processus neuf : "
+              f"{cold * 1000:.0f} ms sans cache disque, {warm * 1000:.0f} ms depuis le disque "
+              f"({cold / warm:.1f}x)")
+
+    with tempfile.TemporaryDirectory() as directory:
+        max_bytes = 20 * 64 * 64  # ~20 blobs de 4 Ko pour 50 clés : éviction permanente
+        errors = multiprocessing.Queue()
+        workers = [multiprocessing.Process(target=_hammer, args=(directory, w, max_bytes, errors))
+                   for w in range(4)]
+        start = time.perf_counter()
+        for process in workers:
+            process.start()
+        for process in workers:
+            process.join()
+            assert process.exitcode == 0, "un processus a échoué"
+        seconds = time.perf_counter() - start
+        assert errors.empty(), "lecture incomplète pendant une écriture concurrente"
+
+        from qrpro.store import DiskStore
+        stats = DiskStore(directory, max_bytes=max_bytes).stats()
+        assert stats['bytes'] <= max_bytes, stats
+        blobs = sum(len(files) for _, _, files in os.walk(os.path.join(directory, 'blobs')))
+        assert blobs == stats['entries'], (blobs, stats)
+        print(f"4 processus × 300 lectures+écritures en {seconds:.2f} s : "
+              f"{stats['entries']} entrées, {stats['bytes']} octets (budget {max_bytes}), "
+              f"aucun fichier orphelin")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""Ajout structuré : parties plus petites face à un seul grand symbole.
+
+Usage : python -m benchmarks.bench_structured
+Décode chaque partie depuis sa matrice (``qrpro.verify``), et
+échoue (AssertionError) si les parties ne redonnent pas le contenu complet
+avec la bonne position, le bon total et la bonne parité.
+"""
+import time
+
+from qrpro.cache import encode_cache
+from qrpro.generator import encode_matrix, error_correction, preview_qr_code
+from qrpro.payloads import create_event_qr
+from qrpro.structured import encode_part, generate_structured, parity, plan_parts
+from qrpro.verify import correct_blocks, read_codewords, read_format, read_segments
+
+
+def _read_part(matrix):
+    # Décodage complet de la matrice : format, démasquage, Reed-Solomon, segments
+    version = (matrix.shape[0] - 17) // 4
+    level, mask, _ = read_format(matrix)
+    data, _ = correct_blocks(read_codewords(matrix, mask), version, level)
+    out, header = read_segments(data, version)
+    assert header is not None, "mode ajout structuré attendu"
+    return header, out
+
+
+def _check_reassembly(data, level):
+    parts, compiled = plan_parts(data, level)
+    check = parity(data)
+    out = b''
+    for position, part in enumerate(compiled):
+        header, chunk = _read_part(encode_part(part, level, position, len(parts), check))
+        assert header == (position, len(parts), check), header
+        out += chunk
+    assert out == data.encode('utf-8'), "contenu réassemblé différent"
+    return [part.version for part in compiled]
+
+
+def _best_of(func, runs=3):
+    best = float('inf')
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    config = {'box_size': 4}
+    level = error_correction('', config)  # H : niveau par défaut sans 'auto'
+    description = "Ordre du jour détaillé, point n°{} : budget, planning, risques. "
+    for repeat in (18, 60, 150):
+        data = create_event_qr('Séminaire', description=''.join(description.format(i) for i in range(repeat)))
+        versions = _check_reassembly(data, level)
+        modules = sum((4 * v + 17) ** 2 for v in versions)
+        parts_seconds = _best_of(lambda: generate_structured(data, config))
+        line = (f"{len(data.encode('utf-8')):>6} o : {len(versions):>2} parties v{max(versions)} "
+                f"({modules} modules) {parts_seconds * 1000:>6.1f} ms")
+        try:
+            # Encodage et rendu d'un seul symbole, sans cache d'encodage
+            single = _best_of(lambda: (encode_cache.clear(), preview_qr_code(data, config)))
+            side = encode_matrix(data, config).shape[0]
+            line += f" | un symbole v{(side - 17) // 4} ({side * side} modules) {single * 1000:>6.1f} ms"
+        except Exception:
+            line += " | un symbole : dépasse la version 40"
+        print(line)
+
+
+if __name__ == '__main__':
+    main()
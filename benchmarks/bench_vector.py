@@ -0,0 +1,49 @@
+"""Compare l'export PNG (rastérisation + encodage) aux sorties SVG et PDF.
+
+Usage : python -m benchmarks.bench_vector [répétitions]
+"""
+import sys
+import time
+
+from qrpro.artifact import QRArtifact
+from qrpro.cache import normalize_config
+from qrpro.generator import encode_matrix, render_matrix
+from qrpro.vector import dark_runs, to_pdf, to_svg
+
+BOX_SIZES = (10, 30)
+
+
+def _payload(length):
+    return ''.join(chr(97 + i % 26) for i in range(length))
+
+
+def _best_of(func, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main(repeat=3):
+    print(f"{'version':>7} {'box':>4} {'foncés':>8} {'séries':>7} "
+          f"{'PNG ko':>8} {'PNG ms':>8} {'SVG ko':>7} {'SVG ms':>7} {'PDF ko':>7} {'PDF ms':>7}")
+    for length in (10, 150, 600, 1200):
+        config = {'fill_color': '#1A237E'}
+        matrix = encode_matrix(_payload(length), config)
+        version = (matrix.shape[0] - 17) // 4
+        runs = len(dark_runs(matrix)[0])
+        for box_size in BOX_SIZES:
+            style = normalize_config(dict(config, box_size=box_size))
+            t_png, png = _best_of(lambda: QRArtifact(render_matrix(matrix, style)).png, repeat)
+            t_svg, svg = _best_of(lambda: to_svg(matrix, style).encode(), repeat)
+            t_pdf, pdf = _best_of(lambda: to_pdf(matrix, style), repeat)
+            print(f"{version:>7} {box_size:>4} {int(matrix.sum()):>8} {runs:>7} "
+                  f"{len(png) / 1024:>8.1f} {t_png * 1000:>8.1f} "
+                  f"{len(svg) / 1024:>7.1f} {t_svg * 1000:>7.1f} "
+                  f"{len(pdf) / 1024:>7.1f} {t_pdf * 1000:>7.1f}")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 3)
@@ -0,0 +1,104 @@
+"""Vérification de lecture : exactitude du décodeur et débit en lot.
+
+Usage : python -m benchmarks.bench_verify [codes]
+Échoue (AssertionError) si le décodeur Reed-Solomon ne corrige pas un bloc
+dans sa capacité, si un contenu du corpus ne se relit pas à l'identique à
+chaque niveau, JPEG compris, ou si un logo que le calcul d'occultation
+juge supportable (sans réserve) rend le code illisible.
+"""
+import random
+import sys
+import time
+from io import BytesIO
+
+from benchmarks.bench_error_correction import NAMES
+from benchmarks.bench_segments import PAYLOADS
+from benchmarks.fixtures import solid_logo
+from qrpro.batch import generate_batch_zip
+from qrpro.generator import LogoError, generate_qr_artifact
+from qrpro.masking import FastQRCode
+from qrpro.occlusion import LEVELS, _codeword_blocks, covered_modules, survives
+from qrpro.verify import rs_correct, verify_artifact
+
+LOGO_SIZES = (0, 10, 15, 20, 25, 30, 35, 40)
+
+
+def _check_rs(trials=200):
+    rng = random.Random(0)
+    for version, level in ((1, LEVELS[0]), (10, LEVELS[2]), (40, LEVELS[3])):
+        qr = FastQRCode(version=version, error_correction=level, border=0)
+        qr.add_data('RS')
+        qr.make(fit=False)
+        order, ecc = _codeword_blocks(version, level)
+        codewords = bytes(qr.data_cache)
+        for _ in range(trials):
+            block = rng.randrange(len(ecc))
+            clean = bytes(codewords[i] for i in (order == block).nonzero()[0])
+            budget = int(ecc[block]) // 2
+            errors = rng.randint(1, budget)
+            damaged = bytearray(clean)
+            for i in rng.sample(range(len(clean)), errors):
+                damaged[i] ^= rng.randrange(1, 256)
+            corrected, count = rs_correct(damaged, int(ecc[block]))
+            assert corrected == clean and count == errors, (version, level, errors)
+
+
+def _artifact(data, config):
+    try:
+        return generate_qr_artifact(data, config)
+    except LogoError as e:
+        return e.artifact
+
+
+def _check_corpus():
+    for name, data in PAYLOADS.items():
+        for level in LEVELS:
+            artifact = _artifact(data, {'error_correction': level, 'box_size': 4})
+            for fmt in (None, 'JPEG'):
+                report = verify_artifact(artifact, data, fmt)
+                assert report.passed and report.damaged == 0, (name, NAMES[level], fmt, report.summary())
+
+
+def _logo_sweep(data, box_size=6):
+    logo = solid_logo()
+    print(f"{'logo':>5} " + " ".join(f"{NAMES[level]:>14}" for level in LEVELS))
+    for size in LOGO_SIZES:
+        cells = []
+        for level in LEVELS:
+            config = {'error_correction': level, 'box_size': box_size,
+                      'logo': logo if size else None, 'logo_size': size}
+            artifact = _artifact(data, config)
+            report = verify_artifact(artifact, data)
+            version = report.version
+            covered = covered_modules(version, 4, box_size, size)
+            if survives(version, level, covered, reserve=0):
+                assert report.passed, (size, NAMES[level], report.summary())
+            state = 'ok' if report.passed else 'KO'
+            cells.append(f"{state} {report.budget:>5.0%} {report.seconds * 1000:>3.0f}ms")
+        print(f"{size:>4}% " + " ".join(f"{cell:>14}" for cell in cells))
+
+
+def _throughput(count):
+    records = [{'type': 'url', 'url': f'https://exemple.fr/produit/{i}'} for i in range(count)]
+    config = {'logo': solid_logo(), 'logo_size': 20, 'error_correction': 'auto', 'box_size': 8}
+    for verify in (False, True):
+        start = time.perf_counter()
+        stats = generate_batch_zip(records, config, BytesIO(), verify=verify)
+        elapsed = time.perf_counter() - start
+        line = f"lot de {count} PNG{' + vérification' if verify else ''} : {count / elapsed:>6.0f} codes/s"
+        if verify:
+            assert stats['verified'] == count and not stats['failed'], stats['failed'][:3]
+            line += (f" • {stats['verifications_per_second']:.0f} vérifications/s par processus, "
+                     f"{len(stats['failed'])} illisible(s)")
+        print(line)
+
+
+def main(count=500):
+    _check_rs()
+    _check_corpus()
+    _logo_sweep(PAYLOADS['url'])
+    _throughput(count)
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
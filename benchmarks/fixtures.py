@@ -0,0 +1,11 @@
+"""Données de test partagées par les benchmarks."""
+from io import BytesIO
+
+from PIL import Image
+
+
+def solid_logo(size=200, color='#E53935'):
+    """Logo PNG uni, opaque : occulte entièrement la zone qu'il couvre"""
+    buffered = BytesIO()
+    Image.new('RGB', (size, size), color).save(buffered, format='PNG')
+    return buffered.getvalue()
@@ -0,0 +1,220 @@
+"""Charge de l'application : N sessions simulées sur un même processus Streamlit.
+
+Usage : python -m benchmarks.load_app [--sessions N] [--rounds R] [-o charge.json]
+
+Chaque session est un ``AppTest`` piloté par son propre thread, comme les
+sessions d'un serveur Streamlit partagent un processus : elle choisit un
+type de contenu, remplit le formulaire champ par champ, génère, attend le
+rendu, change la taille des modules et la bordure, puis demande les
+téléchargements PNG et JPG.
+
+``AppTest`` installe un runtime Streamlit global le temps d'un rerun : les
+reruns passent donc un par un (verrou), ce qui revient, pour un script lié
+au CPU, au partage du GIL par les sessions d'un vrai serveur. Les rendus,
+eux, tournent en parallèle dans le pool partagé. Pour chaque rerun on
+relève la latence perçue (attente du verrou comprise) et le temps de
+script ; s'y ajoutent le pic de mémoire résidente du processus et la
+mémoire par session (croissance du RSS et état de session sérialisé).
+"""
+import argparse
+import json
+import pickle
+import resource
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from streamlit.testing.v1 import AppTest
+
+from qrpro.timing import _percentile
+
+APP = str(Path(__file__).resolve().parent.parent / 'test.py')
+TIMEOUT = 120
+POLL_SECONDS = 0.05
+
+# Un seul rerun AppTest à la fois dans le processus
+_RUN_LOCK = threading.Lock()
+
+# Type de contenu -> champs (libellé, valeur) ; {n} : numéro de session
+FORMS = {
+    'URL': [('text_input', "URL complète", "https://exemple.fr/produit/{n}")],
+    'Texte': [('text_area', "Texte à encoder", "Session {n} : bonjour !")],
+    'Email': [('text_input', "Adresse email", "client{n}@exemple.fr"),
+              ('text_input', "Sujet", "Commande {n}"),
+              ('text_area', "Message", "Merci pour votre commande.")],
+    'WiFi': [('text_input', "Nom du réseau (SSID)", "Boutique-{n}"),
+             ('text_input', "Mot de passe", "secret{n}")],
+    'Contact (vCard)': [('text_input', "Nom complet", "Client {n}"),
+                        ('text_input', "Téléphone", "+3361234{n:04d}"),
+                        ('text_input', "Email", "client{n}@exemple.fr")],
+    'SMS': [('text_input', "Numéro de téléphone", "+3361234{n:04d}"),
+            ('text_input', "Message SMS", "Code {n}")],
+    'Téléphone': [('text_input', "Numéro de téléphone", "+3361234{n:04d}")],
+    'Événement': [('text_input', "Titre de l'événement", "Atelier {n}"),
+                  ('text_input', "Lieu", "Salle {n}")],
+}
+
+
+def _rss_bytes():
+    # Mémoire résidente actuelle (Linux), à défaut le pic
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * resource.getpagesize()
+    except OSError:
+        return _peak_rss_bytes()
+
+
+def _peak_rss_bytes():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def _widget(at, kind, label):
+    return next(w for w in getattr(at, kind) if w.label == label)
+
+
+def _button(at, label):
+    return next(b for b in at.button if b.label == label)
+
+
+def _session_bytes(at):
+    # État sérialisable de la session (le Future d'un rendu en cours ne l'est pas)
+    total = 0
+    for key in at.session_state:
+        try:
+            total += len(pickle.dumps(at.session_state[key]))
+        except Exception:
+            pass
+    return total
+
+
+class Session:
+    """Une session simulée ; ``latencies`` : durées des reruns par action"""
+
+    def __init__(self, number, latencies, service, lock):
+        self.number = number
+        self.latencies = latencies
+        self.service = service
+        self.lock = lock
+        self.at = AppTest.from_file(APP, default_timeout=TIMEOUT)
+        self.errors = []
+
+    def _run(self, action, element=None):
+        start = time.perf_counter()
+        with _RUN_LOCK:
+            started = time.perf_counter()
+            (element or self.at).run()
+        end = time.perf_counter()
+        with self.lock:
+            self.latencies[action].append(end - start)
+            self.service[action].append(end - started)
+        if self.at.exception:
+            self.errors.append(f"{action}: {self.at.exception[0].value}")
+
+    def round(self, index):
+        at = self.at
+        content_type = list(FORMS)[(self.number + index) % len(FORMS)]
+        self._run('type', _widget(at, 'selectbox', "Type de contenu").set_value(content_type))
+        for kind, label, value in FORMS[content_type]:
+            self._run('saisie', _widget(at, kind, label).input(value.format(n=self.number * 100 + index)))
+        self._run('générer', _button(at, "🚀 **GÉNÉRER LE QR CODE**").click())
+        # Le rendu part dans le pool partagé : la page est relancée jusqu'au résultat
+        deadline = time.monotonic() + TIMEOUT
+        while at.session_state['render_job'] is not None and time.monotonic() < deadline:
+            time.sleep(POLL_SECONDS)
+            self._run('attente')
+        self._run('curseur', _widget(at, 'slider', "Taille des modules").set_value(8 + index % 10))
+        self._run('curseur', _widget(at, 'slider', "Bordure").set_value(2 + index % 4))
+        if at.session_state['generated_qr'] is not None:
+            for label in ("PNG", "JPG"):
+                self._run('téléchargement', _button(at, label).click())
+
+    def play(self, rounds):
+        self._run('ouverture')
+        for index in range(rounds):
+            self.round(index)
+        return _session_bytes(self.at)
+
+
+def _summary(values):
+    ordered = sorted(values)
+    return {
+        'count': len(ordered),
+        'p50': _percentile(ordered, 0.50),
+        'p90': _percentile(ordered, 0.90),
+        'p99': _percentile(ordered, 0.99),
+        'max': ordered[-1],
+    }
+
+
+def _by_action(samples):
+    return {'toutes': _summary([v for values in samples.values() for v in values]),
+            **{action: _summary(values) for action, values in sorted(samples.items())}}
+
+
+def run_load(sessions, rounds):
+    """Joue ``sessions`` sessions en parallèle ; renvoie le rapport (dict)"""
+    latencies = defaultdict(list)
+    service = defaultdict(list)
+    lock = threading.Lock()
+    # Session d'échauffement hors mesure : imports et caches de module déjà chargés
+    AppTest.from_file(APP, default_timeout=TIMEOUT).run()
+    rss_before = _rss_bytes()
+    start = time.perf_counter()
+    players = [Session(n, latencies, service, lock) for n in range(sessions)]
+    with ThreadPoolExecutor(sessions) as pool:
+        state_bytes = list(pool.map(lambda session: session.play(rounds), players))
+    elapsed = time.perf_counter() - start
+    rss_after = _rss_bytes()
+    reruns = sum(len(values) for values in latencies.values())
+    return {
+        'sessions': sessions,
+        'rounds': rounds,
+        'seconds': elapsed,
+        'reruns': reruns,
+        'reruns_per_second': reruns / elapsed if elapsed > 0 else 0.0,
+        'latency': _by_action(latencies),
+        'script': _by_action(service),
+        'peak_rss_bytes': _peak_rss_bytes(),
+        'rss_growth_per_session': (rss_after - rss_before) / sessions,
+        'session_state_bytes': max(state_bytes),
+        'errors': [error for player in players for error in player.errors],
+    }
+
+
+def _print(report):
+    print(f"{report['sessions']} session(s) × {report['rounds']} tour(s) : {report['reruns']} reruns "
+          f"en {report['seconds']:.1f} s ({report['reruns_per_second']:.1f} reruns/s)")
+    print(f"{'action':<15} {'n':>5} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'max ms':>8} "
+          f"{'script p50':>11}")
+    for action, stats in report['latency'].items():
+        script = report['script'][action]
+        print(f"{action:<15} {stats['count']:>5} {stats['p50'] * 1000:>8.1f} {stats['p90'] * 1000:>8.1f} "
+              f"{stats['p99'] * 1000:>8.1f} {stats['max'] * 1000:>8.1f} {script['p50'] * 1000:>11.1f}")
+    print(f"RSS max {report['peak_rss_bytes'] / 2**20:.0f} Mo • "
+          f"+{report['rss_growth_per_session'] / 2**20:.1f} Mo par session • "
+          f"état de session {report['session_state_bytes'] / 1024:.1f} ko")
+    for error in report['errors'][:10]:
+        print(f"erreur : {error}", file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.load_app',
+                                     description="Charge de l'application Streamlit (AppTest)")
+    parser.add_argument('--sessions', type=int, default=4, help="sessions simultanées")
+    parser.add_argument('--rounds', type=int, default=3, help="tours de formulaire par session")
+    parser.add_argument('-o', '--output', help="rapport JSON")
+    args = parser.parse_args(argv)
+    report = run_load(args.sessions, args.rounds)
+    _print(report)
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2, ensure_ascii=False) + '\n',
+                                     encoding='utf-8')
+    return 1 if report['errors'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,296 @@
+"""Suite de benchmarks reproductible : encodage, rendu, logo, exports, lot.
+
+Usage ::
+
+    python -m benchmarks.suite run -o resultats.json [-k filtre] [--quick]
+    python -m benchmarks.suite compare reference.json resultats.json [--threshold 0.10]
+
+``run`` mesure chaque scénario à froid (caches de rendu, d'encodage et de
+logos vidés avant chaque appel, cache disque désactivé) : un échauffement,
+puis ``--repeat`` échantillons, chacun moyenné sur assez d'appels pour
+durer au moins ``MIN_SAMPLE_SECONDS``. Les résultats sont écrits en JSON
+(format ``FORMAT``, scénarios triés par nom) avec l'environnement de la
+mesure. ``compare`` confronte deux fichiers sur la médiane et sort avec le
+code 1 si un scénario ralentit au-delà du seuil sans recouvrement des
+échantillons (plus rapide des nouveaux plus lent que le plus lent des
+anciens) : la référence est un résultat précédent, gardé sur la même
+machine.
+"""
+import argparse
+import datetime
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import zlib
+from io import BytesIO
+from pathlib import Path
+
+from benchmarks.bench_segments import PAYLOADS
+from benchmarks.fixtures import solid_logo
+from qrpro import store
+from qrpro.artifact import QRArtifact
+from qrpro.batch import generate_batch_zip
+from qrpro.cache import encode_cache, render_cache
+from qrpro.generator import generate_qr_artifact, generate_qr_code
+from qrpro.logo import logo_cache
+from qrpro.segments import compile_payload
+
+FORMAT = 'qrpro-bench/1'
+MIN_SAMPLE_SECONDS = 0.1
+DEFAULT_REPEAT = 7
+DEFAULT_THRESHOLD = 0.10
+# Scénario de référence, toujours mesuré, pour compare --normalize
+CALIBRATION = 'calibration/python'
+
+LEVELS = {'L': 1, 'M': 0, 'Q': 3, 'H': 2}
+BOX_SIZES = (5, 10, 15, 20, 25, 30)
+LOGO_SIZES = (0, 15, 25)
+URL = 'https://exemple.fr/produit?id=123456789012'
+BUILDERS = dict((name, data) for name, data in PAYLOADS.items() if name != 'url MAJ')
+BUILDERS['text'] = "Bonjour ! Rendez-vous à 14 h 30, salle B12."
+
+
+def _cold():
+    # Chaque appel refait tout le travail : ni rendu, ni matrice, ni logo en cache
+    render_cache.clear()
+    encode_cache.clear()
+    logo_cache.clear()
+    compile_payload.cache_clear()
+
+
+class Benchmark:
+    """Scénario : ``func()`` mesurée, ``setup()`` exécutée hors chrono avant chaque appel"""
+
+    __slots__ = ('name', 'func', 'setup', 'quick')
+
+    def __init__(self, name, func, setup=_cold, quick=True):
+        self.name = name
+        self.func = func
+        self.setup = setup
+        self.quick = quick
+
+    def _time(self, loops):
+        # Comme timeit : ramasse-miettes coupé pendant l'échantillon
+        gc.collect()
+        gc.disable()
+        try:
+            elapsed = 0.0
+            for _ in range(loops):
+                if self.setup:
+                    self.setup()
+                start = time.perf_counter()
+                self.func()
+                elapsed += time.perf_counter() - start
+        finally:
+            gc.enable()
+        return elapsed
+
+    def run(self, repeat):
+        """Échauffement et calibrage, puis ``repeat`` échantillons (s par appel)"""
+        self._time(1)
+        first = self._time(1)
+        loops = max(1, min(1000, int(MIN_SAMPLE_SECONDS / first) if first > 0 else 1000))
+        values = [self._time(loops) / loops for _ in range(repeat)]
+        return {
+            'name': self.name,
+            'unit': 'seconds',
+            'loops': loops,
+            'values': values,
+            'median': statistics.median(values),
+            'mean': statistics.fmean(values),
+            'stdev': statistics.stdev(values) if len(values) > 1 else 0.0,
+            'min': min(values),
+        }
+
+
+def _calibration():
+    # Travail fixe, sans qrpro : suit la vitesse de la machine au moment de la mesure
+    total = 0
+    for i in range(100000):
+        total += i * i
+    zlib.compress(bytes(range(256)) * 1000, 6)
+    return total
+
+
+def _generate(data, config):
+    return lambda: generate_qr_code(data, config)
+
+
+def _export(fmt, config):
+    # Artefact neuf à chaque appel : l'encodage n'est pas mémorisé
+    artifact = generate_qr_artifact(URL, config)
+
+    def encode():
+        QRArtifact(artifact.image, artifact.matrix, artifact.style, logo=artifact.logo).encode(fmt)
+    return encode
+
+
+def _data_uri(config):
+    # PNG encodé hors chrono (setup) : seule la part base64 de data_uri est mesurée
+    artifact = generate_qr_artifact(URL, config)
+    fresh = []
+
+    def setup():
+        fresh[:] = [QRArtifact(artifact.image, artifact.matrix, artifact.style, logo=artifact.logo)]
+        fresh[0].encode('PNG')
+
+    def encode():
+        fresh[0].data_uri()
+    return setup, encode
+
+
+def _batch(count, config):
+    records = [{'type': 'url', 'url': f'https://exemple.fr/produit/{i}'} for i in range(count)]
+    return lambda: generate_batch_zip(records, config, BytesIO())
+
+
+def benchmarks():
+    """Tous les scénarios, dans l'ordre d'exécution"""
+    logo = solid_logo()
+    found = [Benchmark(CALIBRATION, _calibration, setup=None)]
+    for version in range(1, 41):
+        found.append(Benchmark(f'generate/version/{version:02d}',
+                               _generate(URL, {'version': version, 'error_correction': LEVELS['M']}),
+                               quick=version in (1, 10, 20, 30, 40)))
+    for name, level in LEVELS.items():
+        found.append(Benchmark(f'generate/ec/{name}', _generate(URL, {'error_correction': level})))
+    for box_size in BOX_SIZES:
+        found.append(Benchmark(f'generate/box/{box_size:02d}', _generate(URL, {'box_size': box_size}),
+                               quick=box_size in (5, 30)))
+    for size in LOGO_SIZES:
+        config = {'logo': logo, 'logo_size': size} if size else {}
+        found.append(Benchmark(f'generate/logo/{size:02d}', _generate(URL, config)))
+    for name, data in sorted(BUILDERS.items()):
+        found.append(Benchmark(f'generate/payload/{name}', _generate(data, {})))
+    for fmt in ('PNG', 'JPEG'):
+        found.append(Benchmark(f'export/{fmt.lower()}', _export(fmt, {}), setup=None))
+    setup, encode = _data_uri({})
+    found.append(Benchmark('export/base64', encode, setup=setup))
+    found.append(Benchmark('batch/1000', _batch(1000, {}), quick=False))
+    return found
+
+
+def _package_version(name):
+    try:
+        from importlib.metadata import version
+        return version(name)
+    except Exception:
+        return None
+
+
+def _metadata():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                                text=True, cwd=Path(__file__).parent, check=True).stdout.strip()
+    except Exception:
+        commit = None
+    return {
+        'date': datetime.datetime.now().isoformat(timespec='seconds'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'packages': {name: _package_version(name) for name in ('qrcode', 'pillow', 'numpy')},
+    }
+
+
+def run(args):
+    store.disk_store = None
+    selected = [b for b in benchmarks()
+                if b.name == CALIBRATION
+                or ((not args.quick or b.quick) and (not args.filter or args.filter in b.name))]
+    if len(selected) == 1:
+        sys.exit(f"aucun scénario ne correspond à « {args.filter} »")
+    results = []
+    for benchmark in selected:
+        result = benchmark.run(args.repeat)
+        results.append(result)
+        print(f"{result['name']:<28} {result['median'] * 1000:>9.3f} ms "
+              f"± {result['stdev'] * 1000:.3f} ({result['loops']} × {len(result['values'])})",
+              file=sys.stderr)
+    document = {'format': FORMAT, 'metadata': _metadata(),
+                'benchmarks': sorted(results, key=lambda r: r['name'])}
+    text = json.dumps(document, indent=2, ensure_ascii=False) + '\n'
+    if args.output in (None, '-'):
+        sys.stdout.write(text)
+    else:
+        Path(args.output).write_text(text, encoding='utf-8')
+    return 0
+
+
+def _load(path):
+    document = json.loads(Path(path).read_text(encoding='utf-8'))
+    if document.get('format') != FORMAT:
+        sys.exit(f"{path} : format inconnu ({document.get('format')!r}, {FORMAT!r} attendu)")
+    return document, {b['name']: b for b in document['benchmarks']}
+
+
+def compare(args):
+    base_doc, base = _load(args.baseline)
+    new_doc, new = _load(args.results)
+    for key in ('machine', 'cpu_count', 'python'):
+        if base_doc['metadata'].get(key) != new_doc['metadata'].get(key):
+            print(f"attention : {key} différent ({base_doc['metadata'].get(key)} -> "
+                  f"{new_doc['metadata'].get(key)}), comparaison peu fiable", file=sys.stderr)
+    # Machine plus lente ou plus chargée qu'à la référence : on la corrige
+    # du rapport des temps du scénario de calibration
+    speed = 1.0
+    if args.normalize and CALIBRATION in base and CALIBRATION in new:
+        speed = new[CALIBRATION]['median'] / base[CALIBRATION]['median']
+        print(f"calibration : machine {speed:.2f}× plus lente qu'à la référence", file=sys.stderr)
+    regressions = 0
+    print(f"{'scénario':<28} {'référence':>11} {'actuel':>11} {'écart':>8}")
+    for name in sorted(base.keys() & new.keys() - {CALIBRATION}):
+        before, after = base[name]['median'], new[name]['median'] / speed
+        change = after / before - 1 if before > 0 else 0.0
+        # Un écart dans le bruit de mesure (échantillons qui se recouvrent) n'est pas signalé
+        values = [value / speed for value in new[name]['values']]
+        separated = (min(values) > max(base[name]['values'])
+                     or max(values) < min(base[name]['values']))
+        flag = ''
+        if change > args.threshold and separated:
+            flag = '  RÉGRESSION'
+            regressions += 1
+        elif change < -args.threshold and separated:
+            flag = '  plus rapide'
+        elif abs(change) > args.threshold:
+            flag = '  (bruit)'
+        print(f"{name:<28} {before * 1000:>8.3f} ms {after * 1000:>8.3f} ms {change:>+7.1%}{flag}")
+    for name in sorted(base.keys() - new.keys()):
+        print(f"{name:<28} absent des résultats")
+    for name in sorted(new.keys() - base.keys()):
+        print(f"{name:<28} nouveau (pas de référence)")
+    print(f"{regressions} régression(s) au-delà de {args.threshold:.0%}", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.suite',
+                                     description="Benchmarks de QR Code Pro")
+    commands = parser.add_subparsers(dest='command', required=True)
+    run_parser = commands.add_parser('run', help="mesure les scénarios et écrit le JSON")
+    run_parser.add_argument('-o', '--output', help="fichier JSON (sortie standard par défaut)")
+    run_parser.add_argument('-k', '--filter', help="ne garde que les scénarios contenant ce texte")
+    run_parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT,
+                            help="échantillons par scénario")
+    run_parser.add_argument('--quick', action='store_true',
+                            help="sous-ensemble représentatif (versions 1/10/20/30/40, sans le lot)")
+    compare_parser = commands.add_parser('compare', help="compare deux résultats")
+    compare_parser.add_argument('baseline', help="résultats de référence")
+    compare_parser.add_argument('results', help="nouveaux résultats")
+    compare_parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                                help="ralentissement toléré sur la médiane (0.10 = 10 %%)")
+    compare_parser.add_argument('--normalize', action='store_true',
+                                help="corrige les écarts de vitesse de la machine (scénario de calibration)")
+    args = parser.parse_args(argv)
+    return run(args) if args.command == 'run' else compare(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,40 @@
+"""QR Code Pro - briques réutilisables hors de l'interface Streamlit.
+
+``import qrpro`` ne charge ni Streamlit, ni PIL, ni qrcode, ni NumPy : les
+fonctions de génération sont importées à leur premier accès.
+"""
+from qrpro.payloads import (build_payload, create_email_qr, create_event_qr,
+                            create_sms_qr, create_tel_qr, create_url_qr,
+                            create_vcard_qr, create_wifi_qr)
+
+# Nom public -> module qui le définit, chargé à la demande
+_LAZY = {
+    'generate_qr_code': 'qrpro.generator',
+    'generate_qr_artifact': 'qrpro.generator',
+    'preview_qr_code': 'qrpro.generator',
+    'LogoError': 'qrpro.generator',
+    'QRArtifact': 'qrpro.artifact',
+    'SessionQR': 'qrpro.session',
+    'generate_batch_zip': 'qrpro.batch',
+    'load_records': 'qrpro.batch',
+    'render_cache': 'qrpro.cache',
+    'disk_store': 'qrpro.store',
+    'render_worker': 'qrpro.worker',
+    'estimate': 'qrpro.capacity',
+}
+
+__all__ = [
+    'build_payload', 'create_email_qr', 'create_event_qr', 'create_sms_qr',
+    'create_tel_qr', 'create_url_qr', 'create_vcard_qr', 'create_wifi_qr',
+    *_LAZY,
+]
+
+
+def __getattr__(name):
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError(f"module 'qrpro' has no attribute {name!r}")
+    import importlib
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,6 @@
+"""Permet ``python -m qrpro``."""
+import sys
+
+from qrpro.cli import main
+
+sys.exit(main())
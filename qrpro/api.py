@@ -0,0 +1,406 @@
+"""API HTTP de génération : application ASGI, sans framework.
+
+Lancement : ``qrpro-api --port 8000`` (uvicorn, extra ``api``), ou tout
+serveur ASGI pointé sur ``qrpro.api:app``.
+
+Routes ::
+
+    GET  /qr?data=…&format=svg&box_size=8          un QR code (PNG, JPEG, SVG, PDF)
+    GET  /qr?type=wifi&ssid=Maison&password=…      contenu construit comme en lot
+    POST /qr      {"type": "url", "url": …, "format": "png", "config": {…}}
+    POST /batch   liste JSON ou CSV d'enregistrements -> ZIP envoyé en flux
+    GET  /health  état du pool de rendu et des caches (JSON)
+    GET  /metrics durée des étapes (format Prometheus)
+
+Les champs du contenu sont ceux de ``build_payload`` ; les options de rendu
+ceux de ``generate_qr_code`` (``error_correction`` : auto, L, M, Q, H ; logo
+en base64 dans ``config`` du POST). L'ETag d'une réponse est la clé de rendu
+(contenu et configuration normalisée) : un ``If-None-Match`` qui correspond
+reçoit un 304 sans aucun rendu. Les rendus passent par la file partagée
+``render_worker`` ; un lot, par le pool de processus de ``generate_batch_zip``,
+dont l'archive est relayée par morceaux au fil de son écriture.
+"""
+import argparse
+import asyncio
+import base64
+import binascii
+import concurrent.futures
+import json
+import os
+import sys
+import threading
+from urllib.parse import parse_qsl
+
+from qrpro.artifact import MIME_TYPES, _format_name
+from qrpro.cache import render_cache, render_key
+from qrpro.cli import ERROR_CORRECTIONS, TYPES, parse_error_correction
+from qrpro.payloads import build_payload
+
+FORMATS = ('PNG', 'JPEG', 'SVG', 'PDF')
+# Options de rendu (le reste de la requête décrit le contenu) : (min, max) des entiers
+INT_OPTIONS = {'box_size': (1, 30), 'border': (0, 10), 'version': (1, 40), 'logo_size': (10, 40)}
+STR_OPTIONS = ('fill_color', 'back_color', 'error_correction', 'logo')
+MAX_BODY = int(os.environ.get('QRPRO_API_MAX_BODY', 8 * 1024 * 1024))
+# Morceaux du ZIP envoyés au client, et morceaux en attente au plus
+CHUNK_SIZE = 64 * 1024
+STREAM_QUEUE = 16
+# Le thread du lot vérifie à ce rythme si la réponse a été abandonnée
+PUT_POLL_SECONDS = 0.5
+# Une URL donne toujours la même image
+CACHE_CONTROL = 'public, max-age=86400'
+
+
+class ApiError(Exception):
+    """Requête refusée : code HTTP et message renvoyé en JSON"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _int_option(name, value):
+    low, high = INT_OPTIONS[name]
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        raise ApiError(400, f"{name} : entier attendu") from None
+    if not low <= value <= high:
+        raise ApiError(400, f"{name} : entre {low} et {high}")
+    return value
+
+
+def _config(options):
+    """Configuration de rendu depuis les paramètres (chaînes ou valeurs JSON)"""
+    config = {'error_correction': 'auto'}
+    for name, value in options.items():
+        if value in (None, ''):
+            continue
+        if name in INT_OPTIONS:
+            config[name] = _int_option(name, value)
+        elif name == 'error_correction':
+            try:
+                config[name] = parse_error_correction(str(value).strip())
+            except ValueError:
+                raise ApiError(400, f"error_correction : {', '.join(ERROR_CORRECTIONS)}") from None
+        elif name == 'logo':
+            try:
+                config['logo'] = base64.b64decode(value, validate=True)
+            except (binascii.Error, TypeError, ValueError):
+                raise ApiError(400, "logo : image encodée en base64 attendue") from None
+        else:
+            config[name] = str(value)
+    if config.get('logo'):
+        config.setdefault('logo_size', 15)
+    else:
+        config.pop('logo_size', None)
+    return config
+
+
+def _format(value):
+    fmt = _format_name(str(value or 'PNG'))
+    if fmt not in FORMATS:
+        raise ApiError(400, f"format : {', '.join(f.lower() for f in FORMATS)}")
+    return fmt
+
+
+def _payload(record):
+    if record.get('type') and str(record['type']).strip().lower() not in TYPES:
+        raise ApiError(400, f"type inconnu : {record['type']} ({', '.join(TYPES)})")
+    try:
+        data = build_payload(record)
+    except KeyError as e:
+        raise ApiError(400, f"champ manquant : {e.args[0]}") from None
+    except (AttributeError, TypeError, ValueError) as e:
+        raise ApiError(400, f"enregistrement invalide : {e}") from None
+    if not isinstance(data, str) or not data:
+        raise ApiError(400, "aucun contenu à encoder (data, ou type et ses champs)")
+    return data
+
+
+def _split(params):
+    # Paramètres d'URL : options de rendu d'un côté, champs du contenu de l'autre
+    options = {k: v for k, v in params.items() if k in INT_OPTIONS or k in STR_OPTIONS}
+    record = {k: v for k, v in params.items() if k not in options and k != 'format'}
+    return record, options
+
+
+def etag(key, fmt):
+    """ETag fort d'un rendu : clé de rendu tronquée et format"""
+    return f'"{key[:32]}.{fmt.lower()}"'
+
+
+def _matches(header, tag):
+    # If-None-Match : liste de validateurs, comparaison faible (RFC 9110)
+    if header is None:
+        return False
+    candidates = [c.strip() for c in header.split(',')]
+    return '*' in candidates or any(c.removeprefix('W/') == tag for c in candidates)
+
+
+def _cached(key, fmt):
+    # Rendu et encodage déjà en mémoire : réponse sans passer par la file
+    artifact = render_cache.get(key)
+    if artifact is not None:
+        payload = artifact.cached(fmt)
+        if payload is not None:
+            return artifact, payload
+    return None, None
+
+
+async def _render(data, config, fmt):
+    from qrpro.worker import render_worker
+    try:
+        result = await asyncio.wrap_future(render_worker.submit(data, config))
+    except ValueError as e:
+        raise ApiError(400, f"génération impossible : {e}") from None
+    if result.warning:
+        raise ApiError(422, result.warning)
+    artifact = result.artifact
+    return artifact, await asyncio.to_thread(artifact.encode, fmt)
+
+
+async def render_response(record, options, fmt, if_none_match=None):
+    """(statut, en-têtes, corps) d'un QR code ; 304 si l'ETag correspond"""
+    data = _payload(record)
+    config = _config(options)
+    key = render_key(data, config)
+    tag = etag(key, fmt)
+    headers = [(b'etag', tag.encode()), (b'cache-control', CACHE_CONTROL.encode())]
+    if _matches(if_none_match, tag):
+        return 304, headers, b''
+    artifact, payload = _cached(key, fmt)
+    if payload is None:
+        artifact, payload = await _render(data, config, fmt)
+    version = (artifact.matrix.shape[0] - 17) // 4
+    headers += [(b'content-type', MIME_TYPES[fmt].encode()),
+                (b'x-qr-version', str(version).encode())]
+    return 200, headers, payload
+
+
+class _QueueWriter:
+    """Fichier en écriture seule, non positionnable, relayé vers une file asyncio
+
+    Appelé depuis le thread du lot : chaque morceau attend une place dans la
+    file (contre-pression), l'écriture échoue si le client est parti.
+    """
+
+    def __init__(self, queue, loop):
+        self.queue = queue
+        self.loop = loop
+        self.buffer = bytearray()
+        self.closed = False
+
+    def _put(self, item):
+        future = None
+        while not self.closed:
+            if future is None:
+                future = asyncio.run_coroutine_threadsafe(self.queue.put(item), self.loop)
+            try:
+                return future.result(PUT_POLL_SECONDS)
+            except concurrent.futures.TimeoutError:
+                continue
+        if future is not None:
+            future.cancel()
+        raise BrokenPipeError("réponse abandonnée")
+
+    def write(self, data):
+        self.buffer += data
+        if len(self.buffer) >= CHUNK_SIZE:
+            self.flush()
+        return len(data)
+
+    def flush(self):
+        if self.buffer:
+            chunk, self.buffer = bytes(self.buffer), bytearray()
+            self._put(chunk)
+
+
+def _batch_records(body, content_type):
+    fmt = 'json' if 'json' in content_type else 'csv' if 'csv' in content_type else None
+    from qrpro.batch import load_records
+    try:
+        records = load_records(body, fmt)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ApiError(400, f"enregistrements illisibles : {e}") from None
+    if not isinstance(records, list) or not records:
+        raise ApiError(400, "liste d'enregistrements vide")
+    return records
+
+
+async def _stream_batch(receive, send, records, config, fmt):
+    from qrpro.batch import generate_batch_zip
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue(STREAM_QUEUE)
+    writer = _QueueWriter(queue, loop)
+
+    def produce():
+        try:
+            generate_batch_zip(records, config, writer, fmt=fmt)
+            # Fin de l'archive (répertoire central écrit par ZipFile.close)
+            writer.flush()
+        except BrokenPipeError:
+            pass
+        finally:
+            if not writer.closed:
+                asyncio.run_coroutine_threadsafe(queue.put(None), loop)
+
+    async def watch():
+        # Client parti : le lot s'arrête à sa prochaine écriture
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+        writer.closed = True
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(None)
+
+    await send({'type': 'http.response.start', 'status': 200, 'headers': [
+        (b'content-type', b'application/zip'),
+        (b'content-disposition', b'attachment; filename="qrcodes.zip"'),
+        (b'x-qr-records', str(len(records)).encode()),
+    ]})
+    watcher = asyncio.create_task(watch())
+    threading.Thread(target=produce, name='qrpro-api-batch', daemon=True).start()
+    try:
+        while (chunk := await queue.get()) is not None:
+            await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+    finally:
+        # Fin normale, client parti ou send en erreur : le thread du lot
+        # s'arrête à sa prochaine écriture au lieu d'attendre une place
+        writer.closed = True
+        watcher.cancel()
+        while not queue.empty():
+            queue.get_nowait()
+    await send({'type': 'http.response.body', 'body': b''})
+
+
+async def _read_body(receive):
+    body = bytearray()
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            raise ConnectionResetError
+        body += message.get('body', b'')
+        if len(body) > MAX_BODY:
+            raise ApiError(413, f"corps limité à {MAX_BODY} octets")
+        if not message.get('more_body'):
+            return bytes(body)
+
+
+def _json(body):
+    try:
+        return json.loads(body or b'{}')
+    except ValueError as e:
+        raise ApiError(400, f"JSON invalide : {e}") from None
+
+
+async def _respond(send, status, headers, body):
+    headers = list(headers) + [(b'content-length', str(len(body)).encode())]
+    await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def _respond_json(send, status, document):
+    body = json.dumps(document, ensure_ascii=False).encode('utf-8')
+    await _respond(send, status, [(b'content-type', b'application/json; charset=utf-8')], body)
+
+
+def _health():
+    from qrpro import store
+    from qrpro.worker import render_worker
+    return {
+        'status': 'ok',
+        'worker': render_worker.stats(),
+        'render_cache': render_cache.stats(),
+        'disk_store': store.disk_store.stats() if store.disk_store is not None else None,
+    }
+
+
+async def _handle(scope, receive, send):
+    method, path = scope['method'], scope['path'].rstrip('/') or '/'
+    params = dict(parse_qsl(scope.get('query_string', b'').decode('latin-1')))
+    headers = {name.decode('latin-1'): value.decode('latin-1') for name, value in scope['headers']}
+
+    if path == '/health':
+        return await _respond_json(send, 200, _health())
+    if path == '/metrics':
+        from qrpro.timing import stage_stats
+        return await _respond(send, 200, [(b'content-type', b'text/plain; version=0.0.4')],
+                              stage_stats.to_prometheus().encode('utf-8'))
+    if path == '/qr':
+        if method in ('GET', 'HEAD'):
+            record, options = _split(params)
+            fmt = _format(params.get('format'))
+        elif method == 'POST':
+            document = _json(await _read_body(receive))
+            if not isinstance(document, dict):
+                raise ApiError(400, "objet JSON attendu")
+            document = dict(document)
+            options = document.pop('config', None) or {}
+            if not isinstance(options, dict):
+                raise ApiError(400, "config : objet JSON attendu")
+            fmt = _format(document.pop('format', None) or params.get('format'))
+            record = document
+        else:
+            raise ApiError(405, "méthodes acceptées : GET, POST")
+        status, response_headers, body = await render_response(
+            record, options, fmt, headers.get('if-none-match'))
+        if method == 'HEAD':
+            response_headers.append((b'content-length', str(len(body)).encode()))
+            await send({'type': 'http.response.start', 'status': status, 'headers': response_headers})
+            return await send({'type': 'http.response.body', 'body': b''})
+        return await _respond(send, status, response_headers, body)
+    if path == '/batch':
+        if method != 'POST':
+            raise ApiError(405, "méthode acceptée : POST")
+        _, options = _split(params)
+        fmt = _format(params.get('format'))
+        records = _batch_records(await _read_body(receive), headers.get('content-type', ''))
+        return await _stream_batch(receive, send, records, _config(options), fmt)
+    raise ApiError(404, f"route inconnue : {path}")
+
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def app(scope, receive, send):
+    """Application ASGI 3"""
+    if scope['type'] == 'lifespan':
+        return await _lifespan(receive, send)
+    if scope['type'] != 'http':
+        return
+    try:
+        await _handle(scope, receive, send)
+    except ApiError as e:
+        await _respond_json(send, e.status, {'error': str(e)})
+    except ConnectionResetError:
+        pass
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='qrpro-api', description="API HTTP de QR Code Pro")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=1, help="processus serveur")
+    parser.add_argument('--store', metavar='DOSSIER',
+                        help="cache disque partagé entre processus (QRPRO_STORE_DIR)")
+    args = parser.parse_args(argv)
+    try:
+        import uvicorn
+    except ImportError:
+        parser.error("uvicorn est requis : pip install 'qrpro[api]'")
+    if args.store:
+        os.environ['QRPRO_STORE_DIR'] = args.store
+    uvicorn.run('qrpro.api:app', host=args.host, port=args.port, workers=args.workers,
+                lifespan='on', log_level='warning')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,209 @@
+"""Artefact généré : l'image et ses encodages, chacun calculé une seule fois."""
+import base64
+import threading
+from io import BytesIO
+
+from qrpro import store
+from qrpro.cache import render_cache
+from qrpro.timing import timed
+
+MIME_TYPES = {
+    'PNG': 'image/png',
+    'PNG_RGBA': 'image/png',
+    'JPEG': 'image/jpeg',
+    'SVG': 'image/svg+xml',
+    'PDF': 'application/pdf',
+}
+
+
+def _encode_png(artifact):
+    from qrpro.png_optimize import optimized_png
+    return optimized_png(artifact.image, artifact.matrix, artifact.style)
+
+
+def _encode_png_rgba(artifact):
+    from qrpro.png_optimize import rgba_png
+    return rgba_png(artifact.image)
+
+
+def _encode_jpeg(artifact):
+    buffered = BytesIO()
+    artifact.image.convert('RGB').save(buffered, format="JPEG", quality=95)
+    return buffered.getvalue()
+
+
+def _encode_svg(artifact):
+    # Import local : les sorties vectorielles ne sont chargées qu'à la demande
+    from qrpro.vector import to_svg
+    return to_svg(artifact.matrix, artifact.style, artifact.logo).encode('utf-8')
+
+
+def _encode_pdf(artifact):
+    from qrpro.vector import to_pdf
+    return to_pdf(artifact.matrix, artifact.style, artifact.logo)
+
+
+# Encodeurs par format ; chacun reçoit l'artefact et renvoie des octets.
+# SVG et PDF partent de la matrice et du style, sans toucher à l'image.
+ENCODERS = {
+    'PNG': _encode_png,
+    # PNG 32 bits d'origine, seulement pour mesurer le gain de l'optimisation
+    'PNG_RGBA': _encode_png_rgba,
+    'JPEG': _encode_jpeg,
+    'SVG': _encode_svg,
+    'PDF': _encode_pdf,
+}
+
+
+def _format_name(fmt):
+    fmt = fmt.upper()
+    return 'JPEG' if fmt == 'JPG' else fmt
+
+
+class QRArtifact:
+    """Image d'un QR code et ses octets encodés, mémorisés par format
+
+    Un artefact est partagé entre sessions via le cache de rendu : l'image ne
+    doit pas être modifiée après sa création. ``key`` (clé de rendu) n'est
+    donnée qu'aux artefacts complets : leurs PNG et SVG sont alors relus
+    dans le cache disque, s'il est activé, ou y sont écrits. ``logo`` (octets
+    bruts) accompagne un style avec logo : SVG et PDF ne dépendent pas de
+    ``logo_store``.
+    """
+
+    def __init__(self, image, matrix=None, style=None, key=None, logo=None):
+        self.image = image
+        # Matrice booléenne des modules, sans bordure (None si inconnue)
+        self.matrix = matrix
+        # Configuration normalisée (normalize_config), utilisée par SVG/PDF
+        self.style = style
+        self.key = key
+        self.logo = logo
+        self._encoded = {}
+        self._lock = threading.Lock()
+
+    @property
+    def size(self):
+        return self.image.size
+
+    def encode(self, fmt='PNG'):
+        """Octets du format demandé, encodés au premier appel seulement"""
+        fmt = _format_name(fmt)
+        data = self._encoded.get(fmt)
+        if data is None:
+            with self._lock:
+                data = self._encoded.get(fmt)
+                if data is None:
+                    data = self._load(fmt)
+                if data is None:
+                    with timed(f'encode_{fmt.lower()}'):
+                        data = ENCODERS[fmt](self)
+                    self._save(fmt, data)
+                self._encoded[fmt] = data
+            self._grown()
+        return data
+
+    def _remember(self, key, compute):
+        # Valeur dérivée (URI, réduction) calculée une fois sous le verrou ;
+        # ``compute`` ne doit pas rappeler ``encode``
+        with self._lock:
+            value = self._encoded.get(key)
+            added = value is None
+            if added:
+                value = self._encoded[key] = compute()
+        if added:
+            self._grown()
+        return value
+
+    def _grown(self):
+        # Un encodage de plus : l'entrée du cache de rendu est recomptée
+        if self.key is not None:
+            render_cache.resize(self.key, self)
+
+    def cached(self, fmt='PNG'):
+        """Octets du format s'ils sont déjà encodés, sinon None (sans encoder)"""
+        return self._encoded.get(_format_name(fmt))
+
+    def _persisted(self, fmt):
+        return self.key is not None and store.disk_store is not None and fmt in store.PERSISTED_FORMATS
+
+    def _load(self, fmt):
+        if not self._persisted(fmt):
+            return None
+        view = store.disk_store.get(self.key, fmt)
+        # Une copie depuis le fichier projeté : les consommateurs attendent des bytes
+        return bytes(view) if view is not None else None
+
+    def _save(self, fmt, data):
+        if self._persisted(fmt):
+            store.disk_store.put(self.key, fmt, data)
+
+    @property
+    def png(self):
+        return self.encode('PNG')
+
+    @property
+    def jpeg(self):
+        return self.encode('JPEG')
+
+    @property
+    def svg(self):
+        return self.encode('SVG')
+
+    @property
+    def pdf(self):
+        return self.encode('PDF')
+
+    def png_savings(self):
+        """(octets PNG optimisé, octets PNG RGBA) ; encode la référence au besoin"""
+        return len(self.encode('PNG')), len(self.encode('PNG_RGBA'))
+
+    def data_uri(self, fmt='PNG'):
+        """URI ``data:`` base64, mémorisée comme les autres encodages"""
+        fmt = _format_name(fmt)
+        key = f'URI:{fmt}'
+        uri = self._encoded.get(key)
+        if uri is None:
+            raw = self.encode(fmt)
+
+            def build():
+                with timed('encode_base64'):
+                    payload = base64.b64encode(raw).decode()
+                return f"data:{MIME_TYPES[fmt]};base64,{payload}"
+            uri = self._remember(key, build)
+        return uri
+
+    def display_png(self, max_width):
+        """PNG d'au plus ``max_width`` pixels de large, à afficher tel quel
+
+        Au-delà, une réduction (modules entiers si le style est connu) est
+        encodée une fois et mémorisée comme les autres formats.
+        """
+        width, height = self.image.size
+        if width <= max_width:
+            return self.png
+        key = f'PNG@{max_width}'
+        data = self._encoded.get(key)
+        if data is None:
+            def build():
+                from PIL import Image
+                box_size = (self.style or {}).get('box_size')
+                if box_size and width % box_size == 0:
+                    # Modules entiers : l'échantillonnage au plus proche les garde nets
+                    modules = width // box_size
+                    size, resample = (modules * max(1, max_width // modules),) * 2, Image.NEAREST
+                else:
+                    size, resample = (max_width, max(1, height * max_width // width)), Image.BOX
+                buffered = BytesIO()
+                self.image.resize(size, resample).save(buffered, format='PNG')
+                return buffered.getvalue()
+            data = self._remember(key, build)
+        return data
+
+    @property
+    def nbytes(self):
+        """Mémoire occupée : pixels, logo brut et octets déjà encodés"""
+        pixels = self.image.size[0] * self.image.size[1] * len(self.image.getbands())
+        # Copie des valeurs : un encodage peut s'ajouter depuis un autre thread
+        encoded = list(self._encoded.values())
+        return pixels + len(self.logo or b'') + sum(len(v) for v in encoded)
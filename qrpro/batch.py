@@ -0,0 +1,206 @@
+"""Génération en lot : CSV/JSON -> ZIP, rendu (et vérification) réparti sur un pool de processus."""
+import csv
+import io
+import json
+import multiprocessing
+import os
+import re
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from qrpro.cache import render_cache
+from qrpro.generator import LogoError, generate_qr_artifact, generate_vector
+from qrpro.payloads import build_payload
+from qrpro.verify import verify_artifact
+
+# Extension de fichier par format de sortie
+EXTENSIONS = {'PNG': 'png', 'JPG': 'jpg', 'JPEG': 'jpg', 'SVG': 'svg', 'PDF': 'pdf'}
+
+
+def load_records(source, fmt=None):
+    """Lit une liste d'enregistrements depuis un fichier ou un texte CSV/JSON
+
+    ``fmt`` vaut 'csv' ou 'json' ; à défaut il est déduit du nom de fichier
+    ou du premier caractère du contenu.
+    """
+    name = getattr(source, 'name', '') or ''
+    if hasattr(source, 'read'):
+        source = source.read()
+    if isinstance(source, bytes):
+        source = source.decode('utf-8-sig')
+
+    if fmt is None:
+        if name.lower().endswith('.json') or source.lstrip()[:1] in ('[', '{'):
+            fmt = 'json'
+        else:
+            fmt = 'csv'
+
+    if fmt == 'json':
+        records = json.loads(source)
+        if isinstance(records, dict):
+            records = records.get('items', [records])
+        return records
+
+    reader = csv.DictReader(io.StringIO(source))
+    return [{k.strip(): (v or '').strip() for k, v in row.items() if k}
+            for row in reader]
+
+
+def _safe_filename(name, index, ext):
+    stem = re.sub(r'[^\w.-]+', '_', str(name)).strip('._') if name else ''
+    return f"{stem or f'qr_{index + 1:05d}'}.{ext}"
+
+
+def _check(artifact, data, fmt):
+    # Résumé picklable : (lisible, message, durée)
+    report = verify_artifact(artifact, data, fmt)
+    return report.passed, report.summary(), report.seconds
+
+
+def _render_one(index, record, config, fmt, verify=False):
+    """Tâche exécutée dans un processus du pool : ne renvoie que les octets
+
+    Avec ``verify``, le code est relu dans le même processus ; le résultat
+    de la vérification accompagne les octets (None sinon).
+    """
+    data = build_payload(record)
+    name = record.get('filename') if isinstance(record, dict) else None
+    ext = EXTENSIONS[fmt.upper()]
+    filename = _safe_filename(name, index, ext)
+    if fmt.upper() in ('SVG', 'PDF'):
+        # Sortie vectorielle : pas de rastérisation, sauf pour la vérifier
+        # (image de même géométrie et même logo)
+        check = None
+        if verify:
+            try:
+                artifact = generate_qr_artifact(data, config)
+            except LogoError as e:
+                artifact = e.artifact
+            check = _check(artifact, data, None)
+        return filename, generate_vector(data, config, fmt), check
+    try:
+        artifact = generate_qr_artifact(data, config)
+    except LogoError as e:
+        artifact = e.artifact
+    payload = artifact.encode(fmt)
+    # Le JPEG est relu depuis ses octets : la compression compte
+    lossy = 'JPEG' if fmt.upper() in ('JPG', 'JPEG') else None
+    return filename, payload, _check(artifact, data, lossy) if verify else None
+
+
+def _mp_context():
+    # Hôtes multi-threads (scripts Streamlit, pool de rendu, API) : un fork copierait
+    # les verrous des caches tenus par d'autres threads. Les processus partent
+    # d'un serveur de fork propre, qui a déjà importé ce module.
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('forkserver')
+        context.set_forkserver_preload([__name__])
+        return context
+    return multiprocessing.get_context('spawn')
+
+
+def _init_worker():
+    # Chaque code d'un lot n'est rendu qu'une fois : un cache de rendu par
+    # processus (256 Mo chacun) retiendrait des images jamais relues
+    render_cache.max_bytes = 0
+
+
+def _picklable_config(config):
+    # Les fichiers uploadés ne passent pas entre processus : on envoie les octets
+    config = dict(config)
+    logo = config.get('logo')
+    if logo is not None and not isinstance(logo, (bytes, str)):
+        config['logo'] = logo.getvalue() if hasattr(logo, 'getvalue') else logo.read()
+    return config
+
+
+def generate_batch_zip(records, config, output, fmt='PNG', max_workers=None,
+                       progress=None, verify=False):
+    """Rend tous les enregistrements et les écrit dans un ZIP au fil de l'eau
+
+    ``output`` est un chemin ou un fichier binaire. Les images sont encodées
+    dans les processus de travail ; seul un nombre borné de résultats est en
+    vol à un instant donné. ``progress(done, total)`` est appelé après chaque
+    code. Renvoie un dictionnaire de statistiques (débit en codes/seconde).
+    Avec ``verify``, chaque code est aussi relu (``qrpro.verify``) : les
+    statistiques listent alors les codes illisibles dans ``failed`` et le
+    débit de vérification ; ces codes restent dans l'archive.
+
+    Les processus partent d'un serveur de fork (ou sont lancés à neuf) : un
+    script qui appelle cette fonction au niveau module doit la protéger par
+    ``if __name__ == '__main__':``.
+    """
+    records = list(records)
+    total = len(records)
+    config = _picklable_config(config)
+    max_workers = max_workers or os.cpu_count() or 1
+    window = max_workers * 4
+    errors = []
+    failed = []
+    verified = 0
+    verify_seconds = 0.0
+    seen = set()
+    done = 0
+    start = time.perf_counter()
+
+    # Les PNG sont déjà compressés : stockage sans recompression
+    with zipfile.ZipFile(output, 'w', zipfile.ZIP_STORED) as archive, \
+            ProcessPoolExecutor(max_workers=max_workers, mp_context=_mp_context(),
+                                initializer=_init_worker) as pool:
+        pending = {}
+        queue = iter(enumerate(records))
+
+        def submit_next():
+            for index, record in queue:
+                future = pool.submit(_render_one, index, record, config, fmt, verify)
+                pending[future] = index
+                return True
+            return False
+
+        for _ in range(window):
+            if not submit_next():
+                break
+
+        while pending:
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                index = pending.pop(future)
+                try:
+                    filename, payload, check = future.result()
+                except Exception as e:
+                    errors.append((index, str(e)))
+                else:
+                    if check is not None:
+                        passed, summary, seconds = check
+                        verified += 1
+                        verify_seconds += seconds
+                        if not passed:
+                            failed.append((index, summary))
+                    if filename in seen:
+                        stem, ext = filename.rsplit('.', 1)
+                        filename = f"{stem}_{index + 1:05d}.{ext}"
+                    seen.add(filename)
+                    archive.writestr(filename, payload)
+                done += 1
+                if progress:
+                    progress(done, total)
+                submit_next()
+
+    elapsed = time.perf_counter() - start
+    stats = {
+        'total': total,
+        'written': total - len(errors),
+        'errors': errors,
+        'seconds': elapsed,
+        'codes_per_second': total / elapsed if elapsed > 0 else 0.0,
+    }
+    if verify:
+        stats.update({
+            'verified': verified,
+            'failed': sorted(failed),
+            # Temps cumulé dans les processus : débit d'un seul processus
+            'verify_seconds': verify_seconds,
+            'verifications_per_second': verified / verify_seconds if verify_seconds > 0 else 0.0,
+        })
+    return stats
@@ -0,0 +1,176 @@
+"""Cache de rendu partagé par tout le processus (toutes sessions Streamlit)."""
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+# Budget mémoire par défaut : 256 Mo, surchargeable par variable d'environnement
+DEFAULT_MAX_BYTES = int(os.environ.get('QRPRO_CACHE_BYTES', 256 * 1024 * 1024))
+
+
+def logo_bytes(logo):
+    """Contenu brut du logo (fichier uploadé, chemin ou bytes)"""
+    if isinstance(logo, (bytes, bytearray, memoryview)):
+        return bytes(logo)
+    if isinstance(logo, (str, os.PathLike)):
+        with open(logo, 'rb') as f:
+            return f.read()
+    if hasattr(logo, 'getvalue'):
+        return logo.getvalue()
+    pos = logo.tell()
+    logo.seek(0)
+    raw = logo.read()
+    logo.seek(pos)
+    return raw
+
+
+def logo_digest(raw):
+    """Empreinte SHA-256 du contenu d'un logo"""
+    return hashlib.sha256(raw).hexdigest()
+
+
+def stored_logo(digest):
+    """Logo brut d'empreinte ``digest`` ; KeyError s'il a été évincé de ``logo_store``
+
+    Un rendu dont le logo manque n'est jamais produit en silence : il serait
+    servi sous la clé du rendu complet.
+    """
+    raw = logo_store.get(digest)
+    if raw is None:
+        raise KeyError(f"logo {digest[:12]} absent de logo_store")
+    return raw
+
+
+def _logo_digest(logo):
+    if not logo:
+        return None
+    return logo_digest(logo_bytes(logo))
+
+
+def normalize_config(config):
+    """Ne garde que les options qui influencent le rendu, sous forme canonique"""
+    logo = _logo_digest(config.get('logo'))
+    return {
+        'version': config.get('version'),
+        'error_correction': config.get('error_correction'),
+        'box_size': int(config.get('box_size', 10)),
+        'border': int(config.get('border', 4)),
+        'fill_color': str(config.get('fill_color', '#000000')).upper(),
+        'back_color': str(config.get('back_color', '#FFFFFF')).upper(),
+        'logo': logo,
+        'logo_size': int(config.get('logo_size', 15)) if logo else 0,
+    }
+
+
+def render_key(data, config):
+    """Clé stable (SHA-256) pour un contenu et une configuration donnés"""
+    canonical = json.dumps([data, normalize_config(config)],
+                           sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def encode_key(data, version, error_correction):
+    """Clé de l'étape d'encodage : seuls le contenu, la version et la correction comptent"""
+    canonical = json.dumps([data, version, error_correction], ensure_ascii=False)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def image_nbytes(img):
+    """Taille approximative en mémoire d'une image PIL"""
+    return img.size[0] * img.size[1] * len(img.getbands())
+
+
+def value_nbytes(value):
+    """Taille d'une entrée : artefact (attribut ``nbytes``) ou image PIL"""
+    nbytes = getattr(value, 'nbytes', None)
+    return nbytes if nbytes is not None else image_nbytes(value)
+
+
+class RenderCache:
+    """Cache LRU borné par un budget en octets, sûr entre threads"""
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, sizeof=value_nbytes):
+        self.max_bytes = max_bytes
+        self._sizeof = sizeof
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._items.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        size = self._sizeof(value)
+        if size > self.max_bytes:
+            # Trop gros pour le budget : on ne le garde pas
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.current_bytes -= old[1]
+            self._items[key] = (value, size)
+            self.current_bytes += size
+            self._evict()
+
+    def resize(self, key, value):
+        """Recompte la taille de ``value`` si c'est toujours l'entrée de ``key``
+
+        Un artefact grossit à chaque encodage mémorisé après son insertion.
+        """
+        with self._lock:
+            entry = self._items.get(key)
+            if entry is None or entry[0] is not value:
+                return
+            size = self._sizeof(value)
+            self._items[key] = (value, size)
+            self.current_bytes += size - entry[1]
+            self._evict()
+
+    def _evict(self):
+        # Les moins récemment utilisées d'abord, jusqu'à revenir sous le budget
+        while self.current_bytes > self.max_bytes:
+            _, (_, evicted_size) = self._items.popitem(last=False)
+            self.current_bytes -= evicted_size
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.current_bytes = 0
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def stats(self):
+        """Compteurs pour l'affichage ou la supervision"""
+        with self._lock:
+            return {
+                'entries': len(self._items),
+                'bytes': self.current_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+
+# Instances uniques du processus, partagées par toutes les sessions
+render_cache = RenderCache()
+# Matrices de modules déjà encodées (étape encodage, indépendante du style)
+encode_cache = RenderCache(max_bytes=64 * 1024 * 1024, sizeof=lambda m: m.nbytes)
+# Logos bruts par empreinte, pour reconstruire un rendu évincé du cache
+logo_store = RenderCache(max_bytes=32 * 1024 * 1024, sizeof=len)
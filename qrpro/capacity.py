@@ -0,0 +1,172 @@
+"""Capacités précalculées et estimation instantanée de la version et de la taille.
+
+``CAPACITY[niveau][mode][version]`` : nombre de caractères (octets UTF-8 en
+mode octets) d'un unique segment qui tient dans la version. L'index inverse
+donne, pour chaque longueur, la plus petite version qui la contient :
+l'estimation se résume à classer le contenu (numérique, alphanumérique ou
+octets) et à une lecture de table, sans encodage ni Reed-Solomon.
+
+Un seul segment est supposé : ``compile_payload`` mélange les modes et peut
+tenir dans une version plus petite, jamais dans une plus grande (des
+chiffres consécutifs dans un contenu alphanumérique, par exemple). La
+version annoncée est donc une borne haute, exacte pour un contenu purement
+numérique ; ``min_version`` l'encadre par le bas (chaque caractère à son
+coût le plus faible, un seul en-tête).
+"""
+from qrcode import util
+from qrcode.constants import ERROR_CORRECT_H, ERROR_CORRECT_L, ERROR_CORRECT_M, ERROR_CORRECT_Q
+
+from qrpro.segments import _BANDS, _COUNT_BITS, _data_bits, ALPHANUMERIC, BYTE, MODES, NUMERIC
+
+LEVELS = (ERROR_CORRECT_L, ERROR_CORRECT_M, ERROR_CORRECT_Q, ERROR_CORRECT_H)
+MODE_NAMES = {NUMERIC: 'numérique', ALPHANUMERIC: 'alphanumérique', BYTE: 'octets'}
+
+_DIGITS = b'0123456789'
+
+
+def _band(version):
+    return next(band for band, (low, high) in enumerate(_BANDS) if low <= version <= high)
+
+
+def _capacity(limit, mode, band):
+    # Plus grande longueur dont en-tête + indicateur + données tiennent en ``limit`` bits
+    budget = limit - 4 - _COUNT_BITS[mode][band]
+    length = {NUMERIC: budget * 3 // 10, ALPHANUMERIC: budget * 2 // 11, BYTE: budget // 8}[mode]
+    while length > 0 and _data_bits(mode, length) > budget:
+        length -= 1
+    while _data_bits(mode, length + 1) <= budget:
+        length += 1
+    # L'indicateur de longueur borne aussi le segment
+    return max(0, min(length, (1 << _COUNT_BITS[mode][band]) - 1))
+
+
+def _tables():
+    capacity, first_version = {}, {}
+    for level in LEVELS:
+        limits = util.BIT_LIMIT_TABLE[level]
+        capacity[level], first_version[level] = {}, {}
+        for mode in MODES:
+            counts = (0,) + tuple(_capacity(limits[v], mode, _band(v)) for v in range(1, 41))
+            index = bytearray(counts[40] + 1)
+            version = 1
+            for length in range(len(index)):
+                while counts[version] < length:
+                    version += 1
+                index[length] = version
+            capacity[level][mode] = counts
+            first_version[level][mode] = bytes(index)
+    return capacity, first_version
+
+
+CAPACITY, _FIRST_VERSION = _tables()
+
+
+def _classes(raw):
+    # (chiffres, autres caractères alphanumériques, octets restants)
+    others = len(raw.translate(None, util.ALPHA_NUM))
+    digits = len(raw) - len(raw.translate(None, _DIGITS))
+    return digits, len(raw) - others - digits, others
+
+
+def payload_mode(data):
+    """(mode, longueur) du segment unique qui porte ``data``"""
+    raw = util.to_bytestring(data)
+    digits, alphanumeric, others = _classes(raw)
+    if len(raw) == digits:
+        return NUMERIC, len(raw)
+    if not others:
+        return ALPHANUMERIC, len(raw)
+    return BYTE, len(raw)
+
+
+def min_version(data, level, start=1):
+    """Plus petite version envisageable, quel que soit le découpage en segments"""
+    digits, alphanumeric, others = _classes(util.to_bytestring(data))
+    # Sixièmes de bit, comme segments._CHAR_COST
+    sixths = 20 * digits + 33 * alphanumeric + 48 * others
+    # Au moins un segment : en mode octets s'il reste des octets hors alphabet
+    modes = (BYTE,) if others else (NUMERIC, ALPHANUMERIC) if alphanumeric else (NUMERIC,)
+    limits = util.BIT_LIMIT_TABLE[level]
+    for version in range(start, 41):
+        header = 4 + min(_COUNT_BITS[mode][_band(version)] for mode in modes)
+        if header + -(-sixths // 6) <= limits[version]:
+            return version
+    return None
+
+
+def fit_version(mode, length, level, start=1):
+    """Plus petite version >= ``start`` qui contient ``length`` caractères ; None au-delà de 40"""
+    index = _FIRST_VERSION[level][mode]
+    if length >= len(index):
+        return None
+    return max(index[length], start)
+
+
+class Estimate:
+    """Version, taille et place restante prévues pour un contenu
+
+    ``version`` vaut None si le contenu dépasse la version 40 ; ``remaining``
+    est alors négatif (caractères en trop).
+    """
+
+    __slots__ = ('version', 'low', 'level', 'mode', 'length', 'capacity', 'box_size', 'border')
+
+    def __init__(self, version, low, level, mode, length, box_size, border):
+        self.version = version
+        self.low = low
+        self.level = level
+        self.mode = mode
+        self.length = length
+        self.capacity = CAPACITY[level][mode][version or 40]
+        self.box_size = box_size
+        self.border = border
+
+    @property
+    def exact(self):
+        """Version certaine : les bornes basse et haute coïncident"""
+        return self.low == self.version
+
+    @property
+    def remaining(self):
+        return self.capacity - self.length
+
+    @property
+    def modules(self):
+        """Modules par côté, bordure exclue"""
+        return 4 * self.version + 17 if self.version else None
+
+    @property
+    def pixels(self):
+        """Côté de l'image en pixels, bordure comprise"""
+        return (self.modules + 2 * self.border) * self.box_size if self.version else None
+
+    @property
+    def unit(self):
+        return 'octets' if self.mode == BYTE else 'caractères'
+
+    @property
+    def mode_name(self):
+        return MODE_NAMES[self.mode]
+
+
+def estimate(data, config):
+    """Estimation sans encodage pour ``data`` et la configuration de rendu
+
+    Avec la correction automatique, le niveau est choisi comme
+    ``generator.error_correction`` le ferait, à partir des versions estimées.
+    """
+    mode, length = payload_mode(data)
+    start = config.get('version') or 1
+    box_size, border = int(config.get('box_size', 10)), int(config.get('border', 4))
+    level = config.get('error_correction')
+    if level is None:
+        level = ERROR_CORRECT_H
+    elif level == 'auto':  # generator.AUTO_ERROR_CORRECTION, sans charger le générateur
+        from qrpro.occlusion import auto_level
+        level = auto_level(lambda candidate: fit_version(mode, length, candidate, start),
+                           border, box_size,
+                           config.get('logo_size', 15) if config.get('logo') else 0)
+    version = fit_version(mode, length, level, start)
+    # Seul un contenu numérique n'a pas de découpage plus économe
+    low = version if mode == NUMERIC else min_version(data, level, start)
+    return Estimate(version, low, level, mode, length, box_size, border)
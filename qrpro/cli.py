@@ -0,0 +1,233 @@
+"""Ligne de commande ``qrpro`` : génère un QR code sans lancer l'application.
+
+Exemples ::
+
+    qrpro https://example.com -o site.png
+    echo "Bonjour" | qrpro - -o bonjour.jpg
+    qrpro --type wifi -f ssid=Maison -f password=secret -o wifi.png
+    qrpro --batch badges.csv -o badges.zip
+    qrpro --batch badges.csv --labels avery-l7160 -o badges.pdf
+    qrpro --split - -o parties.zip < programme.txt
+"""
+import argparse
+import sys
+
+from qrpro.payloads import build_payload
+
+# PIL, qrcode et NumPy ne sont chargés qu'une fois les arguments validés
+TYPES = ('url', 'text', 'email', 'wifi', 'vcard', 'sms', 'tel', 'event')
+ERROR_CORRECTIONS = ('auto', 'L', 'M', 'Q', 'H')
+
+
+def _parse_args(argv):
+    parser = argparse.ArgumentParser(
+        prog='qrpro', description="Générateur de QR codes (QR Code Pro)")
+    parser.add_argument('data', nargs='?',
+                        help="contenu à encoder ; '-' ou absent : lu sur l'entrée standard")
+    parser.add_argument('-o', '--output', required=True,
+                        help="fichier de sortie (.png, .jpg, .svg, .pdf) ou '-' pour la sortie standard")
+    parser.add_argument('-t', '--type', choices=TYPES,
+                        help="construit le contenu à partir des champs --field")
+    parser.add_argument('-f', '--field', action='append', default=[], metavar='CLÉ=VALEUR',
+                        help="champ du constructeur (ex. ssid=Maison), répétable")
+    parser.add_argument('--batch', metavar='FICHIER',
+                        help="CSV/JSON d'enregistrements ; --output est alors un ZIP")
+    parser.add_argument('--labels', metavar='GABARIT',
+                        help="avec --batch : planches d'étiquettes en PDF (avery-l7160, avery-l7163, "
+                             "avery-l7651, avery-5160, a4-4x6)")
+    parser.add_argument('--code-mm', type=float,
+                        help="côté du QR code sur l'étiquette, en mm (par défaut le plus grand possible)")
+    parser.add_argument('--format', choices=('png', 'jpeg', 'svg', 'pdf'),
+                        help="format d'image (déduit de l'extension par défaut)")
+    parser.add_argument('--box-size', type=int, default=10)
+    parser.add_argument('--border', type=int, default=4)
+    parser.add_argument('--version', type=int, choices=range(1, 41), metavar='1-40')
+    parser.add_argument('--error-correction', choices=ERROR_CORRECTIONS, default='auto',
+                        help="niveau de correction ; auto : le plus bas qui résiste au logo")
+    parser.add_argument('--fill-color', default='#000000')
+    parser.add_argument('--back-color', default='#FFFFFF')
+    parser.add_argument('--logo', help="image à placer au centre")
+    parser.add_argument('--logo-size', type=int, default=15, help="taille du logo en %%")
+    parser.add_argument('--renderer', choices=('numpy', 'pil'), default='numpy')
+    parser.add_argument('--split', action='store_true',
+                        help="contenu trop long pour un symbole : 2 à 16 QR codes (ajout structuré), "
+                             "en ZIP si --output finit par .zip, sinon sur une planche")
+    parser.add_argument('--verify', action='store_true',
+                        help="relit et décode chaque QR code rendu ; code de sortie 1 s'il est illisible")
+    parser.add_argument('--stream', action='store_true',
+                        help="PNG écrit en flux, sans image en mémoire (grands formats, sans logo)")
+    parser.add_argument('--timings', choices=('json', 'prometheus'),
+                        help="affiche la durée de chaque étape sur la sortie d'erreur")
+    return parser, parser.parse_args(argv)
+
+
+def _payload(parser, args):
+    if args.type:
+        record = {'type': args.type}
+        for field in args.field:
+            key, sep, value = field.partition('=')
+            if not sep:
+                parser.error(f"champ invalide (CLÉ=VALEUR attendu): {field}")
+            record[key] = value
+        if args.data and args.data != '-' and args.type in ('url', 'text'):
+            record.setdefault(args.type, args.data)
+        try:
+            return build_payload(record)
+        except KeyError as e:
+            parser.error(f"champ manquant pour le type {args.type}: {e.args[0]}")
+    if args.data and args.data != '-':
+        return args.data
+    return sys.stdin.read().rstrip('\n')
+
+
+def parse_error_correction(name):
+    """Niveau de correction pour ``config`` depuis son nom (auto, L, M, Q, H)"""
+    if name not in ERROR_CORRECTIONS:
+        raise ValueError(f"niveau de correction inconnu : {name}")
+    if name == 'auto':
+        return 'auto'  # generator.AUTO_ERROR_CORRECTION, sans charger le générateur
+    from qrcode import constants
+    return getattr(constants, f'ERROR_CORRECT_{name}')
+
+
+def _config(args):
+    return {
+        'box_size': args.box_size,
+        'border': args.border,
+        'fill_color': args.fill_color,
+        'back_color': args.back_color,
+        'logo': args.logo,
+        'logo_size': args.logo_size if args.logo else 0,
+        'version': args.version,
+        'error_correction': parse_error_correction(args.error_correction),
+        'renderer': args.renderer,
+    }
+
+
+def _format(args):
+    if args.format:
+        return args.format.upper()
+    output = args.output.lower()
+    if output.endswith(('.jpg', '.jpeg')):
+        return 'JPEG'
+    if output.endswith(('.svg', '.pdf')):
+        return output.rsplit('.', 1)[1].upper()
+    return 'PNG'
+
+
+def _write_structured(parser, args, data, config, fmt):
+    from qrpro.artifact import QRArtifact
+    from qrpro.structured import generate_structured, structured_sheet, write_structured_zip
+    parts = generate_structured(data, config)
+    if args.output.lower().endswith('.zip'):
+        write_structured_zip(parts, args.output, fmt)
+    elif fmt in ('SVG', 'PDF'):
+        parser.error("planche en PNG ou JPEG uniquement ; --output .zip pour des parties SVG/PDF")
+    else:
+        payload = QRArtifact(structured_sheet(parts)).encode(fmt)
+        if args.output == '-':
+            sys.stdout.buffer.write(payload)
+        else:
+            with open(args.output, 'wb') as f:
+                f.write(payload)
+    print(f"{len(parts)} QR codes (ajout structuré)", file=sys.stderr)
+    _print_timings(args)
+    return 0
+
+
+def _print_timings(args):
+    if args.timings:
+        from qrpro.timing import stage_stats
+        dump = stage_stats.to_json() if args.timings == 'json' else stage_stats.to_prometheus()
+        print(dump, file=sys.stderr)
+
+
+def main(argv=None):
+    parser, args = _parse_args(argv)
+    config = _config(args)
+    fmt = _format(args)
+
+    if args.batch:
+        from qrpro.batch import generate_batch_zip, load_records
+        with open(args.batch, 'rb') as f:
+            records = load_records(f)
+        if args.labels:
+            from qrpro.labels import TEMPLATES, write_label_sheets
+            if args.labels not in TEMPLATES:
+                parser.error(f"gabarit inconnu : {args.labels} ({', '.join(TEMPLATES)})")
+            try:
+                stats = write_label_sheets(records, config, args.output, args.labels,
+                                           code_mm=args.code_mm)
+            except ValueError as e:
+                parser.error(str(e))
+        else:
+            stats = generate_batch_zip(records, config, args.output, fmt=fmt, verify=args.verify)
+        for index, error in stats['errors']:
+            print(f"ligne {index + 1}: {error}", file=sys.stderr)
+        for index, summary in stats.get('failed', []):
+            print(f"ligne {index + 1}: {summary}", file=sys.stderr)
+        print(f"{stats['written']}/{stats['total']} QR codes en {stats['seconds']:.2f} s "
+              f"({stats['codes_per_second']:.0f} codes/s)", file=sys.stderr)
+        if 'verified' in stats:
+            print(f"{stats['verified'] - len(stats['failed'])}/{stats['verified']} lisibles "
+                  f"({stats['verifications_per_second']:.0f} vérifications/s par processus)",
+                  file=sys.stderr)
+        return 1 if stats['errors'] or stats.get('failed') else 0
+
+    data = _payload(parser, args)
+    if not data:
+        parser.error("aucun contenu à encoder")
+
+    from qrpro.generator import (LogoError, compile_data, generate_png_stream,
+                                 generate_qr_artifact, generate_vector)
+    if args.split and compile_data(data, config).version is None:
+        return _write_structured(parser, args, data, config, fmt)
+
+    if args.stream:
+        if fmt != 'PNG' or args.logo:
+            parser.error("--stream ne produit que du PNG sans logo")
+        if args.verify:
+            parser.error("--verify relit l'image en mémoire : incompatible avec --stream")
+        if args.output == '-':
+            generate_png_stream(data, config, sys.stdout.buffer)
+        else:
+            with open(args.output, 'wb') as f:
+                generate_png_stream(data, config, f)
+        _print_timings(args)
+        return 0
+
+    artifact = None
+    try:
+        if fmt in ('SVG', 'PDF') and not args.verify:
+            # Vectoriel : directement depuis la matrice, sans rastérisation
+            payload = generate_vector(data, config, fmt)
+        else:
+            artifact = generate_qr_artifact(data, config)
+            payload = artifact.encode(fmt)
+    except LogoError as e:
+        print(e, file=sys.stderr)
+        artifact = e.artifact
+        payload = artifact.encode(fmt)
+    except Exception as e:
+        print(f"Erreur lors de la génération du QR code: {e}", file=sys.stderr)
+        if compile_data(data, config).version is None:
+            print("Contenu trop long pour un QR code : --split le répartit sur plusieurs", file=sys.stderr)
+        return 1
+
+    if args.output == '-':
+        sys.stdout.buffer.write(payload)
+    else:
+        with open(args.output, 'wb') as f:
+            f.write(payload)
+    status = 0
+    if args.verify:
+        from qrpro.verify import verify_artifact
+        report = verify_artifact(artifact, data, 'JPEG' if fmt == 'JPEG' else None)
+        print(report.summary(), file=sys.stderr)
+        status = 0 if report.passed else 1
+    _print_timings(args)
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
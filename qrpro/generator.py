@@ -0,0 +1,213 @@
+"""Génération d'images QR code, sans dépendance à Streamlit."""
+import numpy as np
+import qrcode
+
+from qrpro.artifact import QRArtifact
+from qrpro.cache import (encode_cache, encode_key, logo_bytes, logo_digest, logo_store,
+                         normalize_config, render_cache, render_key, stored_logo)
+from qrpro.logo import paste_logo
+from qrpro.masking import FastQRCode
+from qrpro.occlusion import auto_level
+from qrpro.png_stream import write_png_stream
+from qrpro import store
+from qrpro.raster import rasterize
+from qrpro.segments import compile_payload
+from qrpro.timing import timed
+from qrpro.vector import to_pdf, to_svg
+
+# Moteurs de rendu disponibles : 'numpy' (vectorisé) ou 'pil' (qrcode d'origine)
+RENDERERS = ('numpy', 'pil')
+DEFAULT_RENDERER = 'numpy'
+# config['error_correction'] : constante qrcode, ou niveau choisi selon le logo
+AUTO_ERROR_CORRECTION = 'auto'
+
+
+class LogoError(Exception):
+    """Le logo n'a pas pu être incrusté ; ``artifact`` contient le QR sans logo"""
+
+    def __init__(self, message, artifact):
+        super().__init__(message)
+        self.artifact = artifact
+
+    @property
+    def image(self):
+        return self.artifact.image
+
+
+def error_correction(data, config):
+    """Niveau de correction d'erreurs de ``config`` (H s'il n'est pas précisé)
+
+    Avec ``'auto'``, le plus bas niveau qui survit à l'occultation du logo,
+    évaluée sur la matrice de la version que ce niveau donnerait.
+    """
+    level = config.get('error_correction')
+    if level is None:
+        return qrcode.constants.ERROR_CORRECT_H
+    if level != AUTO_ERROR_CORRECTION:
+        return level
+    version = config.get('version', None)
+    return auto_level(lambda candidate: compile_payload(data, candidate, version).version,
+                      int(config.get('border', 4)), int(config.get('box_size', 10)),
+                      config.get('logo_size', 15) if config.get('logo') else 0)
+
+
+def compile_data(data, config):
+    """Segments optimaux du contenu pour la version et la correction de ``config``"""
+    with timed('segment'):
+        return compile_payload(data, error_correction(data, config), config.get('version', None))
+
+
+def _add_segments(qr, data, config):
+    # La version trouvée par la compilation sert de départ à make(fit=True)
+    compiled = compile_data(data, config)
+    if compiled.version is not None:
+        qr.version = compiled.version
+    for segment in compiled.qr_data():
+        qr.add_data(segment)
+
+
+def encode_matrix(data, config):
+    """Étape encodage : contenu + version + correction -> matrice de modules
+
+    Le résultat (tableau booléen sans bordure, en lecture seule) est mis en
+    cache : changer couleurs, taille des modules, bordure ou logo ne refait
+    ni Reed-Solomon, ni l'ajustement de version, ni le choix du masque.
+    """
+    version = config.get('version', None)
+    level = error_correction(data, config)
+    key = encode_key(data, version, level)
+    matrix = encode_cache.get(key)
+    if matrix is None and store.disk_store is not None:
+        matrix = store.disk_store.get_matrix(key)
+        if matrix is not None:
+            encode_cache.put(key, matrix)
+    if matrix is None:
+        # Masques évalués en NumPy ; matrice identique à qrcode.QRCode
+        qr = FastQRCode(version=version, error_correction=level, border=0)
+        _add_segments(qr, data, config)
+        qr.make(fit=True)
+        matrix = np.asarray(qr.modules, dtype=bool)
+        matrix.flags.writeable = False
+        encode_cache.put(key, matrix)
+        if store.disk_store is not None:
+            store.disk_store.put_matrix(key, matrix)
+    return matrix
+
+
+def render_matrix(matrix, style, raw_logo=None):
+    """Étape style : matrice (sans bordure) -> image RGBA avec logo
+
+    ``style`` est une configuration normalisée (``normalize_config``). Sans
+    ``raw_logo``, le logo désigné par son empreinte est relu depuis
+    ``logo_store`` ; s'il n'y est plus, ``KeyError`` (jamais de rendu sans logo).
+    """
+    with timed('rasterize'):
+        img = rasterize(np.pad(matrix, style['border']), style['box_size'],
+                        style['fill_color'], style['back_color'])
+    if raw_logo is None and style.get('logo'):
+        raw_logo = stored_logo(style['logo'])
+    if raw_logo is not None:
+        with timed('logo'):
+            paste_logo(img, raw_logo, style['logo_size'], style.get('logo'))
+    return img
+
+
+def _render_with_pil(data, config):
+    # Chemin de référence : pipeline complet de la librairie qrcode
+    qr = qrcode.QRCode(
+        version=config.get('version', None),
+        error_correction=error_correction(data, config),
+        box_size=config.get('box_size', 10),
+        border=config.get('border', 4),
+    )
+    _add_segments(qr, data, config)
+    with timed('qrcode_make'):
+        qr.make(fit=True)
+    with timed('rasterize'):
+        img = qr.make_image(
+            fill_color=config.get('fill_color', '#000000'),
+            back_color=config.get('back_color', '#FFFFFF')
+        )
+        # Conversion PIL pour manipulation
+        img = img.convert('RGBA')
+    return img, np.asarray(qr.modules, dtype=bool)
+
+
+def generate_qr_artifact(data, config):
+    """Génère l'artefact d'un QR code (servi depuis le cache si déjà rendu)
+
+    Lève une exception si l'encodage échoue, ``LogoError`` si seul le logo
+    n'a pas pu être ajouté.
+    """
+    key = render_key(data, config)
+    cached = render_cache.get(key)
+    if cached is not None:
+        return cached
+
+    style = normalize_config(config)
+    if config.get('renderer', DEFAULT_RENDERER) == 'numpy':
+        matrix = encode_matrix(data, config)
+        img = render_matrix(matrix, dict(style, logo=None))
+    else:
+        img, matrix = _render_with_pil(data, config)
+
+    # Ajout de logo si spécifié
+    if config.get('logo'):
+        try:
+            raw_logo = logo_bytes(config['logo'])
+            digest = logo_digest(raw_logo)
+            with timed('logo'):
+                paste_logo(img, raw_logo, config.get('logo_size', 15), digest)
+        except Exception as e:
+            # Rendu incomplet : on ne le met pas en cache
+            raise LogoError(f"Impossible d'ajouter le logo: {e}",
+                            QRArtifact(img, matrix, dict(style, logo=None))) from e
+        logo_store.put(digest, raw_logo)
+
+    artifact = QRArtifact(img, matrix, style, key, raw_logo if config.get('logo') else None)
+    render_cache.put(key, artifact)
+    return artifact
+
+
+def preview_qr_code(data, config, width=None):
+    """Aperçu instantané : réutilise l'encodage en cache, ne rastérise que le style
+
+    Avec ``width``, la taille des modules est réduite au plus petit entier qui
+    couvre cette largeur : l'aperçu ne coûte pas le prix de l'image finale.
+    L'image n'est pas mise en cache de rendu (chaque position de curseur
+    produirait une entrée).
+    """
+    matrix = encode_matrix(data, config)
+    raw_logo = logo_bytes(config['logo']) if config.get('logo') else None
+    style = normalize_config(config)
+    if width:
+        side = matrix.shape[0] + 2 * style['border']
+        style['box_size'] = min(style['box_size'], max(1, -(-width // side)))
+    return render_matrix(matrix, style, raw_logo)
+
+
+def generate_vector(data, config, fmt='SVG'):
+    """Octets SVG ou PDF directement depuis la matrice, sans rastérisation"""
+    matrix = encode_matrix(data, config)
+    raw_logo = logo_bytes(config['logo']) if config.get('logo') else None
+    style = normalize_config(config)
+    with timed(f'encode_{fmt.lower()}'):
+        if fmt.upper() == 'PDF':
+            return to_pdf(matrix, style, raw_logo)
+        return to_svg(matrix, style, raw_logo).encode('utf-8')
+
+
+def generate_png_stream(data, config, stream):
+    """Écrit le PNG dans ``stream`` bande par bande, sans construire l'image
+
+    Destiné aux très grands formats ; le logo n'est pas pris en charge.
+    Renvoie le nombre d'octets écrits.
+    """
+    matrix = encode_matrix(data, config)
+    with timed('encode_png'):
+        return write_png_stream(stream, matrix, normalize_config(config))
+
+
+def generate_qr_code(data, config):
+    """Génère un QR code avec configuration et renvoie l'image PIL"""
+    return generate_qr_artifact(data, config).image
@@ -0,0 +1,229 @@
+"""Planches d'étiquettes : QR codes imposés sur des pages PDF prêtes à imprimer.
+
+Chaque code distinct est écrit une seule fois, en Form XObject vectoriel
+(séries de modules, comme ``vector.write_pdf``), puis placé par référence
+sur chaque étiquette qui l'utilise. Les pages sont écrites dans le flux au
+fur et à mesure de leur composition : seuls la page en cours, la table des
+objets et l'index des codes distincts restent en mémoire, quel que soit le
+nombre d'étiquettes.
+"""
+import time
+import zlib
+
+from qrpro.cache import logo_bytes, normalize_config
+from qrpro.generator import encode_matrix
+from qrpro.payloads import build_payload
+from qrpro.vector import PdfWriter, _pdf_content, write_pdf_logo
+
+MM = 72 / 25.4  # points par millimètre
+
+
+class LabelTemplate:
+    """Gabarit de planche ; toutes les cotes en millimètres
+
+    ``pitch_x``/``pitch_y`` : pas d'une étiquette à la suivante (largeur ou
+    hauteur plus l'espacement).
+    """
+
+    __slots__ = ('name', 'page_width', 'page_height', 'columns', 'rows',
+                 'label_width', 'label_height', 'margin_left', 'margin_top',
+                 'pitch_x', 'pitch_y')
+
+    def __init__(self, name, page_width, page_height, columns, rows, label_width,
+                 label_height, margin_left, margin_top, pitch_x=None, pitch_y=None):
+        self.name = name
+        self.page_width = page_width
+        self.page_height = page_height
+        self.columns = columns
+        self.rows = rows
+        self.label_width = label_width
+        self.label_height = label_height
+        self.margin_left = margin_left
+        self.margin_top = margin_top
+        self.pitch_x = pitch_x or label_width
+        self.pitch_y = pitch_y or label_height
+
+    @property
+    def per_page(self):
+        return self.columns * self.rows
+
+    def slot(self, index):
+        """Coin supérieur gauche (mm, depuis le haut de la page) de l'étiquette ``index``"""
+        row, column = divmod(index % self.per_page, self.columns)
+        return (self.margin_left + column * self.pitch_x,
+                self.margin_top + row * self.pitch_y)
+
+
+A4 = (210.0, 297.0)
+LETTER = (215.9, 279.4)
+
+# Gabarits courants (cotes fabricant)
+TEMPLATES = {
+    'avery-l7160': LabelTemplate('Avery L7160 (A4, 3×7, 63,5×38,1 mm)', *A4, 3, 7,
+                                 63.5, 38.1, 7.25, 15.15, 66.04, 38.1),
+    'avery-l7163': LabelTemplate('Avery L7163 (A4, 2×7, 99,1×38,1 mm)', *A4, 2, 7,
+                                 99.1, 38.1, 4.65, 15.15, 101.6, 38.1),
+    'avery-l7651': LabelTemplate('Avery L7651 (A4, 5×13, 38,1×21,2 mm)', *A4, 5, 13,
+                                 38.1, 21.2, 4.75, 10.7, 40.64, 21.2),
+    'avery-5160': LabelTemplate('Avery 5160 (Letter, 3×10, 2,625×1 po)', *LETTER, 3, 10,
+                                66.675, 25.4, 4.7625, 12.7, 69.85, 25.4),
+    'a4-4x6': LabelTemplate('Grille A4 4×6 (50×48 mm)', *A4, 4, 6,
+                            50.0, 48.0, 5.0, 4.5),
+}
+
+# Marge intérieure de l'étiquette et hauteur réservée à la légende (mm)
+PADDING = 2.0
+CAPTION_HEIGHT = 4.0
+
+
+def _code_size(template, captioned, code_mm=None):
+    # Plus grand carré qui tient dans l'étiquette (moins la légende)
+    available = min(template.label_width - 2 * PADDING,
+                     template.label_height - 2 * PADDING - (CAPTION_HEIGHT if captioned else 0))
+    if code_mm:
+        if code_mm > available:
+            raise ValueError(f"QR code de {code_mm:g} mm trop grand pour l'étiquette "
+                             f"({available:.1f} mm disponibles)")
+        return code_mm
+    return available
+
+
+def _caption(record):
+    return str(record.get('label') or '') if isinstance(record, dict) else ''
+
+
+def _pdf_text(text):
+    # Chaîne hexadécimale en WinAnsi : ni échappement, ni accents perdus
+    return '<' + text.encode('cp1252', 'replace').hex() + '>'
+
+
+class _LabelPdf:
+    """Écriture incrémentale : codes distincts, puis pages au fil de l'eau"""
+
+    def __init__(self, stream, config, template):
+        self.pdf = PdfWriter(stream)
+        self.template = template
+        self.catalog, self.pages, self.font = (self.pdf.reserve() for _ in range(3))
+        self.logo = None
+        if config.get('logo'):
+            # Logo lu une fois, écrit une fois, partagé par tous les codes
+            config = dict(config, logo=logo_bytes(config['logo']))
+            self.logo = write_pdf_logo(self.pdf, config['logo'])
+        self.config = config
+        self.style = normalize_config(config)
+        self.codes = {}
+        self.kids = []
+        self.ops = []
+        self.used = set()
+
+    def code(self, data):
+        """(nom, objet, côté en modules) du Form XObject de ``data``, écrit au premier usage"""
+        code = self.codes.get(data)
+        if code is None:
+            matrix = encode_matrix(data, self.config)
+            total = matrix.shape[0] + 2 * self.style['border']
+            ops = _pdf_content(matrix, self.style, logo_name='Logo' if self.logo else None)
+            resources = f" /Resources << /XObject << /Logo {self.logo} 0 R >> >>" if self.logo else ""
+            number = self.pdf.reserve()
+            self.pdf.write(number, f"<< /Type /XObject /Subtype /Form /BBox [0 0 {total} {total}]"
+                                   f"{resources} /Filter /FlateDecode >>",
+                           zlib.compress(ops.encode('latin-1')))
+            code = self.codes[data] = (f"Q{len(self.codes)}", number, total)
+        return code
+
+    def place(self, index, data, caption, code_mm):
+        template = self.template
+        name, number, total = self.code(data)
+        left, top = template.slot(index)
+        x = (left + (template.label_width - code_mm) / 2) * MM
+        y_top = (top + PADDING) * MM
+        scale = code_mm * MM / total
+        y = template.page_height * MM - y_top - code_mm * MM
+        self.ops.append(f"q {scale:.6g} 0 0 {scale:.6g} {x:.2f} {y:.2f} cm /{name} Do Q")
+        self.used.add((name, number))
+        if caption:
+            size = CAPTION_HEIGHT * MM * 0.7
+            # Chasse moyenne de l'Helvetica ~0,55 em : la légende reste dans l'étiquette
+            fits = int((template.label_width - 2 * PADDING) * MM / (size * 0.55))
+            if len(caption) > fits:
+                caption = caption[:max(fits - 1, 1)] + '…'
+            self.ops.append(f"BT /F1 {size:.2f} Tf {(left + PADDING) * MM:.2f} {y - size * 1.2:.2f} Td "
+                            f"{_pdf_text(caption)} Tj ET")
+
+    def flush_page(self):
+        """Écrit la page en cours (contenu puis objet page) et la libère"""
+        if not self.ops:
+            return
+        width, height = self.template.page_width * MM, self.template.page_height * MM
+        content, page = self.pdf.reserve(), self.pdf.reserve()
+        self.pdf.write(content, "<< /Filter /FlateDecode >>",
+                       zlib.compress("\n".join(self.ops).encode('latin-1')))
+        xobjects = " ".join(f"/{name} {number} 0 R" for name, number in sorted(self.used))
+        self.pdf.write(page, f"<< /Type /Page /Parent {self.pages} 0 R "
+                             f"/MediaBox [0 0 {width:.2f} {height:.2f}] "
+                             f"/Resources << /XObject << {xobjects} >> /Font << /F1 {self.font} 0 R >> >> "
+                             f"/Contents {content} 0 R >>")
+        self.kids.append(page)
+        self.ops = []
+        self.used = set()
+
+    def close(self):
+        self.flush_page()
+        self.pdf.write(self.font, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica "
+                                  "/Encoding /WinAnsiEncoding >>")
+        kids = " ".join(f"{kid} 0 R" for kid in self.kids)
+        self.pdf.write(self.pages, f"<< /Type /Pages /Kids [{kids}] /Count {len(self.kids)} >>")
+        self.pdf.write(self.catalog, f"<< /Type /Catalog /Pages {self.pages} 0 R >>")
+        self.pdf.close(self.catalog)
+
+
+def write_label_sheets(records, config, output, template='avery-l7160', code_mm=None,
+                       captions=True, progress=None):
+    """Impose les enregistrements sur des planches d'étiquettes, dans un PDF
+
+    ``records`` est un itérable (lu une seule fois) d'enregistrements de lot
+    ou de contenus ; la colonne ``label`` sert de légende. ``output`` est un
+    chemin ou un fichier binaire, écrit page par page. Un enregistrement en
+    erreur ne consomme pas d'étiquette. ``progress(faits, total)`` reçoit
+    None pour total si ``records`` n'a pas de longueur. Renvoie des statistiques comme
+    ``generate_batch_zip``, plus le nombre de pages et de codes distincts.
+    """
+    if isinstance(template, str):
+        template = TEMPLATES[template]
+    code_mm = _code_size(template, captions, code_mm)
+    start = time.perf_counter()
+    errors = []
+    total = placed = 0
+    expected = len(records) if hasattr(records, '__len__') else None
+
+    stream = open(output, 'wb') if isinstance(output, str) else output
+    try:
+        sheet = _LabelPdf(stream, config, template)
+        for index, record in enumerate(records):
+            total += 1
+            try:
+                data = build_payload(record)
+                sheet.place(placed, data, _caption(record) if captions else '', code_mm)
+            except Exception as e:
+                errors.append((index, str(e)))
+            else:
+                placed += 1
+                if placed % template.per_page == 0:
+                    sheet.flush_page()
+            if progress:
+                progress(total, expected)
+        sheet.close()
+    finally:
+        if stream is not output:
+            stream.close()
+
+    elapsed = time.perf_counter() - start
+    return {
+        'total': total,
+        'written': placed,
+        'errors': errors,
+        'pages': len(sheet.kids),
+        'distinct': len(sheet.codes),
+        'seconds': elapsed,
+        'codes_per_second': total / elapsed if elapsed > 0 else 0.0,
+    }
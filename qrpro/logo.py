@@ -0,0 +1,60 @@
+"""Logos prétraités : décodés et redimensionnés une fois par contenu et taille."""
+from io import BytesIO
+
+from PIL import Image
+
+from qrpro.cache import RenderCache, logo_digest
+
+
+class PreparedLogo:
+    """Logo prêt à incruster : RGBA redimensionné et masque alpha (None si opaque)
+
+    ``Image.paste`` avec masque calcule ``src·α + dst·(1-α)`` en une passe C,
+    c'est-à-dire le mélange prémultiplié : l'incrustation se réduit à un appel.
+    """
+
+    __slots__ = ('image', 'mask')
+
+    def __init__(self, image, mask):
+        self.image = image
+        self.mask = mask
+
+    @property
+    def nbytes(self):
+        width, height = self.image.size
+        return width * height * (5 if self.mask is not None else 4)
+
+
+def _prepare(raw_logo, pixels):
+    logo = Image.open(BytesIO(raw_logo)).convert("RGBA")
+    # Rééchantillonnage de qualité, payé une seule fois par (contenu, taille)
+    logo = logo.resize((pixels, pixels), Image.Resampling.LANCZOS)
+    alpha = logo.getchannel('A')
+    mask = None if alpha.getextrema() == (255, 255) else alpha
+    return PreparedLogo(logo, mask)
+
+
+# Logos prétraités par (empreinte, taille en pixels), partagés par le processus
+logo_cache = RenderCache(max_bytes=64 * 1024 * 1024)
+
+
+def prepare_logo(raw_logo, pixels, digest=None):
+    """Logo décodé et redimensionné à ``pixels`` de côté, depuis le cache si possible"""
+    key = (digest or logo_digest(raw_logo), pixels)
+    prepared = logo_cache.get(key)
+    if prepared is None:
+        prepared = _prepare(raw_logo, pixels)
+        logo_cache.put(key, prepared)
+    return prepared
+
+
+def paste_logo(img, raw_logo, logo_size=15, digest=None):
+    """Incruste le logo (octets bruts) au centre de l'image, en place"""
+    qr_size = img.size[0]
+    logo_new_size = int(qr_size * logo_size / 100)  # pourcentage
+    prepared = prepare_logo(raw_logo, logo_new_size, digest)
+
+    # Position au centre
+    pos = ((qr_size - logo_new_size) // 2,
+           (qr_size - logo_new_size) // 2)
+    img.paste(prepared.image, pos, prepared.mask)
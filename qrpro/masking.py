@@ -0,0 +1,244 @@
+"""Choix du masque vectorisé : les 8 masques sont évalués d'un coup avec NumPy.
+
+``FastQRCode`` remplace les deux boucles pures Python de ``qrcode.QRCode`` :
+le placement des données (``map_data``) et l'évaluation des pénalités des
+8 masques (``best_mask_pattern``). Les règles reproduisent exactement
+``qrcode.util.lost_point`` ; les matrices produites sont donc identiques
+à celles de la librairie.
+"""
+import numpy as np
+import qrcode
+from qrcode import base, exceptions, util
+
+from qrpro.timing import timed
+
+# Positions des modules de données (ordre zigzag) par version
+_DATA_POSITIONS = {}
+# Motifs des 8 masques par version, tableau (8, n, n)
+_MASKS = {}
+
+# Motif 1:1:3:1:1 précédé/suivi de 4 modules clairs (règle 3)
+_FINDER_PATTERNS = (
+    np.array([1, 0, 1, 1, 1, 0, 1, 0, 0, 0, 0], dtype=np.int16),
+    np.array([0, 0, 0, 0, 1, 0, 1, 1, 1, 0, 1], dtype=np.int16),
+)
+
+
+def mask_patterns(size):
+    """Les 8 masques de la norme pour un symbole de ``size`` modules"""
+    masks = _MASKS.get(size)
+    if masks is None:
+        i, j = np.indices((size, size))
+        masks = np.stack([
+            (i + j) % 2 == 0,
+            i % 2 == 0,
+            j % 3 == 0,
+            (i + j) % 3 == 0,
+            (i // 2 + j // 3) % 2 == 0,
+            (i * j) % 2 + (i * j) % 3 == 0,
+            ((i * j) % 2 + (i * j) % 3) % 2 == 0,
+            ((i * j) % 3 + (i + j) % 2) % 2 == 0,
+        ])
+        masks.flags.writeable = False
+        _MASKS[size] = masks
+    return masks
+
+
+def _zigzag_positions(modules):
+    # Même parcours que QRCode.map_data, calculé une fois par version
+    size = len(modules)
+    rows, cols = [], []
+    inc = -1
+    row = size - 1
+    for col in range(size - 1, 0, -2):
+        if col <= 6:
+            col -= 1
+        while True:
+            for c in (col, col - 1):
+                if modules[row][c] is None:
+                    rows.append(row)
+                    cols.append(c)
+            row += inc
+            if row < 0 or size <= row:
+                row -= inc
+                inc = -inc
+                break
+    return np.array(rows, dtype=np.intp), np.array(cols, dtype=np.intp)
+
+
+def data_positions(version):
+    """(lignes, colonnes) des modules de données d'une version, dans l'ordre des bits"""
+    positions = _DATA_POSITIONS.get(version)
+    if positions is None:
+        # Motifs fonctionnels seuls (repérage, alignement, synchronisation,
+        # format, version) : les cases restées à None reçoivent les données
+        qr = qrcode.QRCode(version=version, border=0)
+        qr.modules_count = size = 4 * version + 17
+        qr.modules = [[None] * size for _ in range(size)]
+        qr.setup_position_probe_pattern(0, 0)
+        qr.setup_position_probe_pattern(size - 7, 0)
+        qr.setup_position_probe_pattern(0, size - 7)
+        qr.setup_position_adjust_pattern()
+        qr.setup_timing_pattern()
+        qr.setup_type_info(True, 0)
+        if version >= 7:
+            qr.setup_type_number(True)
+        positions = _zigzag_positions(qr.modules)
+        _DATA_POSITIONS[version] = positions
+    return positions
+
+
+def _run_penalty(stack):
+    """Règle 1 : séries d'au moins 5 modules de même couleur, par masque"""
+    count, height, width = stack.shape
+    lines = stack.reshape(count * height, width)
+    # Frontières de séries, y compris aux deux bords de chaque ligne
+    edges = np.ones((lines.shape[0], width + 1), dtype=bool)
+    edges[:, 1:width] = lines[:, 1:] != lines[:, :-1]
+    starts = np.flatnonzero(edges.ravel())
+    lengths = np.diff(starts)
+    owner = (starts[:-1] // (width + 1)) // height
+    long_runs = lengths >= 5
+    return np.bincount(owner[long_runs], weights=lengths[long_runs] - 2,
+                       minlength=count)
+
+
+def _finder_penalty(stack):
+    """Règle 3 : motifs 1011101 bordés de 4 clairs, par corrélation sur 11 modules"""
+    count, _, width = stack.shape
+    span = width - 10
+    values = stack.astype(np.int16)
+    total = np.zeros(count, dtype=np.int64)
+    for pattern in _FINDER_PATTERNS:
+        # Une fenêtre correspond ssi sum(x * (2p - 1)) == sum(p)
+        weights = 2 * pattern - 1
+        score = np.zeros((count, stack.shape[1], span), dtype=np.int16)
+        for offset, weight in enumerate(weights):
+            score += weight * values[:, :, offset:offset + span]
+        total += (score == pattern.sum()).sum(axis=(1, 2))
+    return total
+
+
+def lost_points(stack):
+    """Pénalités des 4 règles pour une pile de matrices (k, n, n) -> (k,)"""
+    stack = np.asarray(stack, dtype=bool)
+    count, size, _ = stack.shape
+    transposed = stack.transpose(0, 2, 1)
+
+    level1 = _run_penalty(stack) + _run_penalty(np.ascontiguousarray(transposed))
+
+    # Règle 2 : blocs 2x2 uniformes
+    uniform = ((stack[:, :-1, :-1] == stack[:, :-1, 1:])
+               & (stack[:, :-1, :-1] == stack[:, 1:, :-1])
+               & (stack[:, :-1, :-1] == stack[:, 1:, 1:]))
+    level2 = 3 * uniform.sum(axis=(1, 2))
+
+    level3 = 40 * (_finder_penalty(stack) + _finder_penalty(transposed))
+
+    # Règle 4 : écart à 50 % de modules foncés (même arithmétique flottante que qrcode)
+    dark = stack.sum(axis=(1, 2))
+    level4 = [int(abs(float(d) / (size ** 2) * 100 - 50) / 5) * 10 for d in dark]
+
+    return level1.astype(np.int64) + level2 + level3 + np.array(level4, dtype=np.int64)
+
+
+# Indicateur de mode « ajout structuré » (ISO/IEC 18004, 8.3.9)
+MODE_STRUCTURED_APPEND = 3
+
+
+def create_data(version, error_correction, data_list, structured_append=None):
+    """``util.create_data``, précédé au besoin de l'en-tête d'ajout structuré
+
+    ``structured_append`` vaut ``(position, total, parité)``, la position
+    comptée depuis 0 : 4 bits de mode, 4 bits de position, 4 bits de
+    ``total - 1`` et 8 bits de parité, soit 20 bits avant les segments.
+    """
+    if structured_append is None:
+        return util.create_data(version, error_correction, data_list)
+
+    # Même déroulé que util.create_data, l'en-tête en tête du flux
+    position, total, parity = structured_append
+    buffer = util.BitBuffer()
+    buffer.put(MODE_STRUCTURED_APPEND, 4)
+    buffer.put(position, 4)
+    buffer.put(total - 1, 4)
+    buffer.put(parity, 8)
+    for data in data_list:
+        buffer.put(data.mode, 4)
+        buffer.put(len(data), util.length_in_bits(data.mode, version))
+        data.write(buffer)
+
+    rs_blocks = base.rs_blocks(version, error_correction)
+    bit_limit = sum(block.data_count * 8 for block in rs_blocks)
+    if len(buffer) > bit_limit:
+        raise exceptions.DataOverflowError(
+            f"Code length overflow. Data size ({len(buffer)}) > size available ({bit_limit})")
+    for _ in range(min(bit_limit - len(buffer), 4)):
+        buffer.put_bit(False)
+    if len(buffer) % 8:
+        for _ in range(8 - len(buffer) % 8):
+            buffer.put_bit(False)
+    for i in range((bit_limit - len(buffer)) // 8):
+        buffer.put(util.PAD1 if i % 2 else util.PAD0, 8)
+    return util.create_bytes(buffer, rs_blocks)
+
+
+class FastQRCode(qrcode.QRCode):
+    """``qrcode.QRCode`` avec placement des données et choix du masque vectorisés
+
+    ``structured_append`` (position, total, parité) fait de ce symbole une
+    partie d'un ajout structuré ; la version doit alors être fixée par
+    l'appelant et ``make(fit=False)`` utilisé.
+    """
+
+    structured_append = None
+
+    def make(self, fit=True):
+        # Même déroulé que QRCode.make, découpé en étapes chronométrées
+        if fit or (self.version is None):
+            with timed('fit'):
+                self.best_fit(start=self.version)
+        if self.data_cache is None:
+            with timed('reed_solomon'):
+                self.data_cache = create_data(
+                    self.version, self.error_correction, self.data_list,
+                    self.structured_append)
+        if self.mask_pattern is None:
+            with timed('mask'):
+                mask_pattern = self.best_mask_pattern()
+        else:
+            mask_pattern = self.mask_pattern
+        with timed('place'):
+            self.makeImpl(False, mask_pattern)
+
+    def _data_positions(self):
+        return data_positions(self.version)
+
+    def _data_bits(self, data, count):
+        bits = np.unpackbits(np.asarray(data, dtype=np.uint8))[:count]
+        if len(bits) < count:
+            bits = np.concatenate([bits, np.zeros(count - len(bits), dtype=np.uint8)])
+        return bits.astype(bool)
+
+    def map_data(self, data, mask_pattern):
+        rows, cols = self._data_positions()
+        bits = self._data_bits(data, len(rows))
+        dark = bits ^ mask_patterns(self.modules_count)[mask_pattern][rows, cols]
+
+        matrix = np.array(self.modules, dtype=object)
+        matrix[rows, cols] = dark.tolist()
+        self.modules = matrix.tolist()
+
+    def best_mask_pattern(self):
+        self.makeImpl(True, 0)
+        base = np.array(self.modules, dtype=bool)
+        rows, cols = self._data_positions()
+        masks = mask_patterns(self.modules_count)
+
+        # Bits de données démasqués, puis les 8 variantes en une opération
+        bits = base[rows, cols] ^ masks[0][rows, cols]
+        stack = np.repeat(base[np.newaxis], 8, axis=0)
+        stack[:, rows, cols] = bits[np.newaxis] ^ masks[:, rows, cols]
+
+        # argmin garde le premier minimum, comme la boucle d'origine
+        return int(np.argmin(lost_points(stack)))
@@ -0,0 +1,90 @@
+"""Occultation par le logo et choix automatique du niveau de correction.
+
+Le logo recouvre un carré de modules au centre ; chaque module recouvert
+rend faux le mot de code (8 bits) qui le porte. Les mots de code étant
+entrelacés entre blocs Reed-Solomon, on compte les mots touchés bloc par
+bloc, à partir des positions réelles des bits dans la matrice, et on les
+compare à la capacité de correction du bloc (moitié de ses mots de
+correction), moins une réserve pour l'usure et les défauts de lecture.
+"""
+import numpy as np
+from qrcode import base
+from qrcode.constants import (ERROR_CORRECT_H, ERROR_CORRECT_L, ERROR_CORRECT_M,
+                              ERROR_CORRECT_Q)
+
+from qrpro.masking import data_positions
+
+# Du moins au plus robuste : l'auto garde le premier niveau qui tient
+LEVELS = (ERROR_CORRECT_L, ERROR_CORRECT_M, ERROR_CORRECT_Q, ERROR_CORRECT_H)
+# Part de la capacité de correction laissée libre pour les dégâts à l'impression
+RESERVE = 0.25
+
+_CODEWORD_BLOCKS = {}
+
+
+def covered_modules(version, border, box_size, logo_size):
+    """Masque booléen des modules du symbole (sans bordure) touchés par le logo
+
+    Même géométrie que ``paste_logo`` : carré centré de ``logo_size`` % du
+    côté de l'image, bordure comprise ; un module partiellement couvert
+    compte comme perdu (logo supposé opaque).
+    """
+    side = 4 * version + 17
+    covered = np.zeros((side, side), dtype=bool)
+    if not logo_size:
+        return covered
+    image = (side + 2 * border) * box_size
+    logo = int(image * logo_size / 100)
+    start = (image - logo) // 2
+    first = max(start // box_size - border, 0)
+    last = min((start + logo - 1) // box_size - border, side - 1)
+    if logo > 0 and first <= last:
+        covered[first:last + 1, first:last + 1] = True
+    return covered
+
+
+def _codeword_blocks(version, level):
+    # Bloc Reed-Solomon de chaque mot de code, dans l'ordre entrelacé de create_bytes
+    key = (version, level)
+    blocks = _CODEWORD_BLOCKS.get(key)
+    if blocks is None:
+        rs_blocks = base.rs_blocks(version, level)
+        data = [block.data_count for block in rs_blocks]
+        ecc = [block.total_count - block.data_count for block in rs_blocks]
+        order = [b for i in range(max(data)) for b, count in enumerate(data) if i < count]
+        order += [b for i in range(max(ecc)) for b, count in enumerate(ecc) if i < count]
+        blocks = (np.array(order, dtype=np.intp), np.array(ecc))
+        _CODEWORD_BLOCKS[key] = blocks
+    return blocks
+
+
+def block_damage(version, level, covered):
+    """(mots touchés, mots corrigibles) par bloc pour un masque de modules perdus"""
+    order, ecc = _codeword_blocks(version, level)
+    rows, cols = data_positions(version)
+    # Les bits de remplissage au-delà du dernier mot de code ne comptent pas
+    bits = np.flatnonzero(covered[rows, cols])
+    codewords = np.unique(bits // 8)
+    codewords = codewords[codewords < len(order)]
+    hits = np.bincount(order[codewords], minlength=len(ecc))
+    return hits, ecc // 2
+
+
+def survives(version, level, covered, reserve=RESERVE):
+    """Le symbole reste lisible si chaque bloc garde sa réserve de correction"""
+    hits, correctable = block_damage(version, level, covered)
+    return bool(np.all(hits <= np.floor(correctable * (1 - reserve))))
+
+
+def auto_level(version_for, border, box_size, logo_size):
+    """Plus bas niveau dont la version (``version_for(niveau)``) survit au logo
+
+    ``version_for`` renvoie la version atteinte à ce niveau, ou None si le
+    contenu dépasse la version 40 (évalué alors en version 40). Sans logo,
+    c'est L ; si aucun niveau ne tient, H.
+    """
+    for level in LEVELS:
+        version = version_for(level) or 40
+        if survives(version, level, covered_modules(version, border, box_size, logo_size)):
+            return level
+    return ERROR_CORRECT_H
@@ -0,0 +1,111 @@
+"""Constructeurs de contenu (payload) pour chaque type de QR code."""
+
+
+def create_url_qr(url):
+    """Crée un QR code URL (ajoute https:// si le schéma manque)"""
+    if not url.startswith(('http://', 'https://')):
+        url = 'https://' + url
+    return url
+
+
+def create_email_qr(email, subject='', body=''):
+    """Crée un QR code mailto:"""
+    qr_data = f"mailto:{email}"
+    if subject or body:
+        qr_data += "?"
+        params = []
+        if subject:
+            params.append(f"subject={subject}")
+        if body:
+            params.append(f"body={body}")
+        qr_data += "&".join(params)
+    return qr_data
+
+
+def create_wifi_qr(ssid, password, security='WPA'):
+    """Crée un QR code pour connexion WiFi"""
+    security_map = {
+        'WPA': 'WPA',
+        'WEP': 'WEP',
+        'None': 'nopass'
+    }
+    wifi_type = security_map.get(security, 'WPA')
+    return f"WIFI:T:{wifi_type};S:{ssid};P:{password};;"
+
+
+def create_vcard_qr(data):
+    """Crée un QR code vCard"""
+    vcard = "BEGIN:VCARD\nVERSION:3.0\n"
+    vcard += f"FN:{data.get('name', '')}\n"
+    vcard += f"TEL:{data.get('phone', '')}\n"
+    vcard += f"EMAIL:{data.get('email', '')}\n"
+    vcard += f"ORG:{data.get('company', '')}\n"
+    vcard += f"TITLE:{data.get('title', '')}\n"
+    vcard += f"ADR:{data.get('address', '')}\n"
+    vcard += f"URL:{data.get('website', '')}\n"
+    vcard += f"NOTE:{data.get('note', '')}\n"
+    vcard += "END:VCARD"
+    return vcard
+
+
+def create_sms_qr(number, body=''):
+    """Crée un QR code SMS"""
+    qr_data = f"SMSTO:{number}"
+    if body:
+        qr_data += f":{body}"
+    return qr_data
+
+
+def create_tel_qr(number):
+    """Crée un QR code d'appel téléphonique"""
+    return f"tel:{number}"
+
+
+def create_event_qr(title, date=None, time=None, location='', description=''):
+    """Crée un QR code événement (VEVENT)"""
+    qr_data = f"BEGIN:VEVENT\nSUMMARY:{title}\n"
+    if date:
+        qr_data += f"DTSTART:{date}"
+        if time:
+            qr_data += f"T{time}"
+    if location:
+        qr_data += f"\nLOCATION:{location}"
+    if description:
+        qr_data += f"\nDESCRIPTION:{description}"
+    qr_data += "\nEND:VEVENT"
+    return qr_data
+
+
+def build_payload(record):
+    """Construit le contenu d'un enregistrement de lot (ligne CSV / objet JSON)
+
+    Le champ ``type`` choisit le constructeur (url, text, email, wifi, vcard,
+    sms, tel, event) ; un champ ``data`` est encodé tel quel.
+    """
+    if isinstance(record, str):
+        return record
+    if record.get('data'):
+        return record['data']
+
+    kind = (record.get('type') or 'text').strip().lower()
+    if kind == 'url':
+        return create_url_qr(record['url'])
+    if kind == 'text':
+        return record['text']
+    if kind == 'email':
+        return create_email_qr(record['email'], record.get('subject', ''),
+                               record.get('body', ''))
+    if kind == 'wifi':
+        return create_wifi_qr(record['ssid'], record.get('password', ''),
+                              record.get('security') or 'WPA')
+    if kind == 'vcard':
+        return create_vcard_qr(record)
+    if kind == 'sms':
+        return create_sms_qr(record['number'], record.get('body', ''))
+    if kind == 'tel':
+        return create_tel_qr(record['number'])
+    if kind == 'event':
+        return create_event_qr(record['title'], record.get('date'),
+                               record.get('time'), record.get('location', ''),
+                               record.get('description', ''))
+    raise ValueError(f"Type de contenu inconnu: {kind}")
@@ -0,0 +1,79 @@
+"""PNG compact : la plus petite représentation fidèle de l'image.
+
+- sans logo : 1 bit par pixel (niveaux de gris pour noir/blanc, sinon palette
+  de 2 couleurs, avec tRNS si une couleur est transparente), écrit depuis la
+  matrice par ``png_stream`` ;
+- avec logo : RGB si l'image est opaque, sinon RGBA ; si elle compte au
+  plus 256 couleurs, la palette (+ alpha) est aussi essayée et la plus
+  petite des deux sorties est gardée.
+
+Les pixels décodés sont toujours identiques à l'image RGBA d'origine.
+"""
+from io import BytesIO
+
+import numpy as np
+from PIL import Image
+
+from qrpro.png_stream import write_png_stream
+
+# Niveaux zlib : maximal pour les images 1 bit / palette (peu de données,
+# très compressibles), modéré pour les images en couleurs vraies.
+PALETTE_COMPRESS_LEVEL = 9
+TRUECOLOR_COMPRESS_LEVEL = 6
+
+
+def _paletted(image, colors):
+    # Correspondance exacte pixel -> index via les valeurs RGBA en uint32
+    pixels = np.asarray(image).view(np.uint32)[..., 0]
+    palette = np.array(sorted(int(np.array(rgba, dtype=np.uint8).view(np.uint32)[0])
+                              for _, rgba in colors), dtype=np.uint32)
+    indices = np.searchsorted(palette, pixels).astype(np.uint8)
+
+    entries = palette.view(np.uint8).reshape(-1, 4)
+    paletted = Image.fromarray(indices)
+    paletted = paletted.convert('P') if paletted.mode != 'P' else paletted
+    paletted.putpalette(entries[:, :3].tobytes())
+    options = {}
+    if (entries[:, 3] < 255).any():
+        options['transparency'] = entries[:, 3].tobytes()
+    bits = next(b for b in (1, 2, 4, 8) if len(entries) <= 1 << b)
+    return paletted, dict(options, bits=bits)
+
+
+def _save(image, **options):
+    buffered = BytesIO()
+    image.save(buffered, format='PNG', **options)
+    return buffered.getvalue()
+
+
+def optimize_image_png(image):
+    """Encode une image RGBA quelconque dans le mode PNG le plus compact"""
+    image = image if image.mode == 'RGBA' else image.convert('RGBA')
+    if image.getchannel('A').getextrema() == (255, 255):
+        truecolor = _save(image.convert('RGB'), compress_level=TRUECOLOR_COMPRESS_LEVEL)
+    else:
+        truecolor = _save(image, compress_level=TRUECOLOR_COMPRESS_LEVEL)
+
+    colors = image.getcolors(256)
+    if not colors:
+        return truecolor
+    # Palette possible : on garde la plus petite des deux représentations
+    paletted, options = _paletted(image, colors)
+    paletted = _save(paletted, compress_level=PALETTE_COMPRESS_LEVEL, **options)
+    return min(paletted, truecolor, key=len)
+
+
+def optimized_png(image, matrix=None, style=None):
+    """PNG compact d'un QR code ; passe par la matrice quand il n'y a pas de logo"""
+    if matrix is not None and style is not None and not style.get('logo'):
+        buffered = BytesIO()
+        write_png_stream(buffered, matrix, style, compress_level=PALETTE_COMPRESS_LEVEL)
+        return buffered.getvalue()
+    return optimize_image_png(image)
+
+
+def rgba_png(image):
+    """PNG RGBA 32 bits non optimisé, référence pour mesurer le gain"""
+    buffered = BytesIO()
+    image.save(buffered, format='PNG')
+    return buffered.getvalue()
@@ -0,0 +1,95 @@
+"""Écriture PNG en flux, ligne de modules par ligne de modules.
+
+Pour les très grands formats (affiches, habillages : ``box_size`` de
+plusieurs centaines), l'image complète n'est jamais construite : chaque
+ligne de modules donne une ligne de pixels, répétée ``box_size`` fois et
+compressée au fil de l'eau. La mémoire de pointe correspond à une seule
+ligne de pixels (1 bit par pixel) plus l'état de zlib.
+"""
+import struct
+import zlib
+
+import numpy as np
+from PIL import ImageColor
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+# Taille visée des blocs IDAT écrits
+IDAT_CHUNK = 64 * 1024
+
+# Filtres PNG : 'None' pour la première ligne d'une bande, 'Up' pour les
+# répétitions (la différence avec la ligne précédente est nulle)
+_FILTER_NONE = b'\x00'
+_FILTER_UP = b'\x02'
+
+
+def _chunk(kind, data):
+    body = kind + data
+    return struct.pack('>I', len(data)) + body + struct.pack('>I', zlib.crc32(body) & 0xFFFFFFFF)
+
+
+def _palette(style):
+    colors = []
+    for color in (style['back_color'], style['fill_color']):
+        if isinstance(color, str) and color.lower() == 'transparent':
+            colors.append((0, 0, 0, 0))
+        else:
+            colors.append(ImageColor.getcolor(color, 'RGBA'))
+    return colors
+
+
+def write_png_stream(stream, matrix, style, compress_level=6):
+    """Écrit dans ``stream`` le PNG (palette 1 bit) d'une matrice sans bordure
+
+    Les pixels sont identiques au rendu raster sans logo. Le logo n'est pas
+    pris en charge ici : pour une affiche avec logo, utiliser SVG ou PDF.
+    Renvoie le nombre d'octets écrits.
+    """
+    if style.get('logo'):
+        raise ValueError("Le logo n'est pas pris en charge par l'écriture PNG en flux")
+
+    box_size = style['box_size']
+    modules = np.pad(np.asarray(matrix, dtype=bool), style['border'])
+    width = modules.shape[1] * box_size
+    colors = _palette(style)
+
+    written = 0
+
+    def emit(data):
+        nonlocal written
+        stream.write(data)
+        written += len(data)
+
+    emit(PNG_SIGNATURE)
+    if colors == [(255, 255, 255, 255), (0, 0, 0, 255)]:
+        # Noir sur blanc : niveaux de gris 1 bit, bits inversés (1 = blanc)
+        emit(_chunk(b'IHDR', struct.pack('>IIBBBBB', width, width, 1, 0, 0, 0, 0)))
+        invert = True
+    else:
+        # Palette indexée, 1 bit par pixel : index 0 = fond, 1 = module foncé
+        emit(_chunk(b'IHDR', struct.pack('>IIBBBBB', width, width, 1, 3, 0, 0, 0)))
+        emit(_chunk(b'PLTE', bytes(c for color in colors for c in color[:3])))
+        if any(color[3] < 255 for color in colors):
+            emit(_chunk(b'tRNS', bytes(color[3] for color in colors)))
+        invert = False
+
+    compressor = zlib.compressobj(compress_level)
+    unchanged = _FILTER_UP + bytes((width + 7) // 8)
+    pending = []
+    pending_size = 0
+    if invert:
+        modules = ~modules
+    for row in modules:
+        # Une seule ligne de pixels en mémoire par ligne de modules
+        scanline = _FILTER_NONE + np.packbits(np.repeat(row, box_size)).tobytes()
+        for data in (scanline,) + (unchanged,) * (box_size - 1):
+            out = compressor.compress(data)
+            if out:
+                pending.append(out)
+                pending_size += len(out)
+        if pending_size >= IDAT_CHUNK:
+            emit(_chunk(b'IDAT', b''.join(pending)))
+            pending, pending_size = [], 0
+    pending.append(compressor.flush())
+    emit(_chunk(b'IDAT', b''.join(pending)))
+    emit(_chunk(b'IEND', b''))
+    return written
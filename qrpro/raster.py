@@ -0,0 +1,35 @@
+"""Rastérisation vectorisée : matrice de modules -> image PIL en une passe NumPy."""
+import numpy as np
+from PIL import Image, ImageColor
+
+
+def _rgba(color):
+    if isinstance(color, str) and color.lower() == 'transparent':
+        return (0, 0, 0, 0)
+    if isinstance(color, tuple):
+        return tuple(color) + (255,) * (4 - len(color))
+    return ImageColor.getcolor(color, 'RGBA')
+
+
+def matrix_to_array(matrix):
+    """Convertit la matrice de ``qr.get_matrix()`` en tableau booléen NumPy"""
+    return np.asarray(matrix, dtype=bool)
+
+
+def rasterize(matrix, box_size=10, fill_color='#000000', back_color='#FFFFFF'):
+    """Construit l'image RGBA d'un QR code à partir de sa matrice de modules
+
+    ``matrix`` inclut déjà la bordure (``qr.get_matrix()``). Les modules
+    passent par une palette à deux entrées (un pixel RGBA = un uint32), puis
+    chaque ligne est agrandie par répétition de blocs ; PIL reçoit un seul
+    tampon. Le résultat est identique, pixel pour pixel, à
+    ``qr.make_image(...).convert('RGBA')``.
+    """
+    modules = matrix_to_array(matrix).view(np.uint8)
+    palette = np.array([_rgba(back_color), _rgba(fill_color)],
+                       dtype=np.uint8).view(np.uint32).ravel()
+
+    row_pixels = np.repeat(palette[modules], box_size, axis=1)
+    pixels = np.repeat(row_pixels, box_size, axis=0)
+    height, width = pixels.shape
+    return Image.frombuffer('RGBA', (width, height), pixels, 'raw', 'RGBA', 0, 1)
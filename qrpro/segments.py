@@ -0,0 +1,165 @@
+"""Compilation des contenus en segments numérique / alphanumérique / octets.
+
+``QRCode.add_data`` ne sort du mode octets que pour des séries d'au moins
+20 caractères : le numéro d'un ``tel:``, d'un ``SMSTO:`` ou d'une vCard, une
+URL en majuscules restent en octets. Ici, une programmation dynamique sur
+les octets UTF-8 choisit le mode de chaque caractère en comptant l'en-tête de
+chaque changement de segment, pour la taille d'indicateur de longueur de
+chaque tranche de versions (1-9, 10-26, 27-40). On garde la plus petite
+version dont la capacité suffit.
+"""
+from functools import lru_cache
+
+from qrcode import util
+
+NUMERIC, ALPHANUMERIC, BYTE = util.MODE_NUMBER, util.MODE_ALPHA_NUM, util.MODE_8BIT_BYTE
+MODES = (NUMERIC, ALPHANUMERIC, BYTE)
+
+# Bits de l'indicateur de longueur par mode, pour les versions 1-9, 10-26, 27-40
+_COUNT_BITS = {
+    NUMERIC: (10, 12, 14),
+    ALPHANUMERIC: (9, 11, 13),
+    BYTE: (8, 16, 16),
+}
+_BANDS = ((1, 9), (10, 26), (27, 40))
+
+# Coût d'un caractère en sixièmes de bit : 10 bits / 3 chiffres, 11 bits / 2 caractères
+_CHAR_COST = {NUMERIC: 20, ALPHANUMERIC: 33, BYTE: 48}
+
+_DIGITS = frozenset(b'0123456789')
+_ALPHANUMERIC = frozenset(util.ALPHA_NUM)
+
+
+def _allowed(byte):
+    if byte in _DIGITS:
+        return MODES
+    if byte in _ALPHANUMERIC:
+        return (ALPHANUMERIC, BYTE)
+    return (BYTE,)
+
+
+def _data_bits(mode, length):
+    if mode == NUMERIC:
+        return 10 * (length // 3) + (0, 4, 7)[length % 3]
+    if mode == ALPHANUMERIC:
+        return 11 * (length // 2) + 6 * (length % 2)
+    return 8 * length
+
+
+def segment_bits(segments, band):
+    """Longueur exacte en bits de segments ``(mode, octets)`` pour une tranche"""
+    return sum(4 + _COUNT_BITS[mode][band] + _data_bits(mode, len(chunk))
+               for mode, chunk in segments)
+
+
+def split_segments(raw, band):
+    """Découpage optimal de ``raw`` (octets) pour une tranche de versions
+
+    Coûts en sixièmes de bit ; un segment terminé est arrondi au bit
+    supérieur, ce qui redonne exactement ``_data_bits`` à sa fermeture.
+    """
+    if not raw:
+        return []
+    header = {mode: (4 + _COUNT_BITS[mode][band]) * 6 for mode in MODES}
+    infinite = 1 << 60
+    costs = {mode: 0 for mode in MODES}
+    # back[i][mode] : mode du caractère i-1 sur le meilleur chemin finissant en mode
+    back = []
+    first = True
+    for byte in raw:
+        closed = {mode: -(-cost // 6) * 6 for mode, cost in costs.items()}
+        allowed = _allowed(byte)
+        new_costs, pointers = {}, {}
+        for mode in MODES:
+            if mode not in allowed:
+                new_costs[mode] = infinite
+                continue
+            if first:
+                best, previous = header[mode], None
+            else:
+                best, previous = costs[mode], mode
+                for other in MODES:
+                    if other != mode and closed[other] + header[mode] < best:
+                        best, previous = closed[other] + header[mode], other
+            new_costs[mode] = best + _CHAR_COST[mode]
+            pointers[mode] = previous
+        costs = new_costs
+        back.append(pointers)
+        first = False
+
+    mode = min(MODES, key=lambda m: (-(-costs[m] // 6), m))
+    modes = []
+    for pointers in reversed(back):
+        modes.append(mode)
+        mode = pointers[mode]
+    modes.reverse()
+
+    segments = []
+    start = 0
+    for i in range(1, len(raw) + 1):
+        if i == len(raw) or modes[i] != modes[start]:
+            segments.append((modes[start], raw[start:i]))
+            start = i
+    return segments
+
+
+def _fit(segments_for_band, error_correction, start, header_bits=0):
+    # Plus petite version >= start dont la capacité contient les segments (et l'en-tête)
+    limits = util.BIT_LIMIT_TABLE[error_correction]
+    for band, (low, high) in enumerate(_BANDS):
+        if high < start:
+            continue
+        segments = segments_for_band(band)
+        bits = segment_bits(segments, band)
+        for version in range(max(low, start), high + 1):
+            if bits + header_bits <= limits[version]:
+                return version, segments, bits
+    return None, segments, bits
+
+
+def _default_segments(raw):
+    # Découpage de QRCode.add_data (séries d'au moins 20 caractères)
+    return [(chunk.mode, chunk.data) for chunk in util.optimal_data_chunks(raw, minimum=20)]
+
+
+class CompiledPayload:
+    """Segments retenus et comparaison avec le découpage par défaut de qrcode
+
+    ``version`` vaut None si le contenu dépasse la version 40.
+    """
+
+    __slots__ = ('segments', 'bits', 'version', 'default_version', 'default_bits')
+
+    def __init__(self, segments, bits, version, default_version, default_bits):
+        self.segments = segments
+        self.bits = bits
+        self.version = version
+        self.default_version = default_version
+        self.default_bits = default_bits
+
+    @staticmethod
+    def modules(version):
+        """Modules par côté d'une version, bordure exclue"""
+        return 4 * version + 17 if version else None
+
+    def qr_data(self):
+        """Segments prêts pour ``QRCode.add_data``"""
+        return [util.QRData(chunk, mode=mode) for mode, chunk in self.segments]
+
+
+@lru_cache(maxsize=1024)
+def compile_payload(data, error_correction, version=None, header_bits=0):
+    """Compile ``data`` en segments pour la correction et la version données
+
+    Avec une version imposée, la recherche commence à cette version (comme
+    ``QRCode.make(fit=True)``). ``header_bits`` réserve la place d'un en-tête
+    écrit avant les segments (20 bits pour l'ajout structuré).
+    """
+    raw = util.to_bytestring(data)
+    start = version or 1
+    version, segments, bits = _fit(lambda band: split_segments(raw, band),
+                                   error_correction, start, header_bits)
+    default = _default_segments(raw)
+    default_version, _, default_bits = _fit(lambda band: default, error_correction,
+                                            start, header_bits)
+    return CompiledPayload(segments, bits, version, default_version, default_bits)
@@ -0,0 +1,113 @@
+"""Représentation compacte d'un QR code en session : bitmap des modules + style."""
+import os
+import tempfile
+import weakref
+
+import numpy as np
+
+from qrpro.artifact import QRArtifact
+from qrpro.cache import logo_store, render_cache
+from qrpro.generator import render_matrix
+
+
+class SessionQR:
+    """QR code conservé dans ``st.session_state`` sans ses pixels
+
+    Seuls la matrice de modules empaquetée (1 bit par module), le style
+    normalisé, la clé de cache et le logo brut (partagé avec ``logo_store``)
+    sont gardés. Empreinte par session : environ ``côté² / 8`` octets, soit
+    ~3,9 Ko pour une version 40 (177×177 modules), plus quelques centaines
+    d'octets de style et le logo, quels que soient ``box_size`` et la bordure.
+    L'image est relue dans le cache de rendu partagé, ou reconstruite avec son
+    logo si elle a été évincée.
+    """
+
+    __slots__ = ('key', 'style', 'side', 'packed', 'logo')
+
+    def __init__(self, key, style, matrix, logo=None):
+        self.key = key
+        self.style = style
+        self.side = matrix.shape[0]
+        self.packed = np.packbits(matrix).tobytes()
+        self.logo = logo
+
+    @classmethod
+    def from_artifact(cls, artifact):
+        """Session d'un artefact ; sans clé (logo refusé), il ne sera jamais mis en cache"""
+        return cls(artifact.key, artifact.style, artifact.matrix, artifact.logo)
+
+    @property
+    def matrix(self):
+        """Matrice booléenne des modules, sans bordure"""
+        bits = np.unpackbits(np.frombuffer(self.packed, dtype=np.uint8),
+                             count=self.side * self.side)
+        return bits.reshape(self.side, self.side).astype(bool)
+
+    @property
+    def modules(self):
+        """Nombre de modules par côté, bordure comprise"""
+        return self.side + 2 * self.style['border']
+
+    @property
+    def size(self):
+        """Dimensions en pixels, calculées sans rastériser"""
+        pixels = self.modules * self.style['box_size']
+        return (pixels, pixels)
+
+    def artifact(self):
+        """Artefact complet, depuis le cache partagé ou reconstruit"""
+        artifact = render_cache.get(self.key) if self.key is not None else None
+        if artifact is None:
+            matrix = self.matrix
+            artifact = QRArtifact(render_matrix(matrix, self.style, self.logo), matrix,
+                                  self.style, self.key, self.logo)
+            # Un rendu sans sa clé (logo refusé) ne doit pas prendre la place du rendu complet
+            if self.key is not None:
+                if self.logo is not None:
+                    logo_store.put(self.style['logo'], self.logo)
+                render_cache.put(self.key, artifact)
+        return artifact
+
+    @property
+    def nbytes(self):
+        """Mémoire propre à la session (bitmap + style + clé + logo)"""
+        style = sum(len(str(k)) + len(str(v)) for k, v in self.style.items())
+        return len(self.packed) + len(self.key or '') + len(self.logo or b'') + style
+
+
+def _unlink(path):
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+
+
+class SessionFile:
+    """Fichier temporaire gardé en session à la place de ses octets (archive, planche)
+
+    Le fichier est supprimé quand l'objet est libéré (fin de session, nouveau
+    lot) ou par ``discard``. ``read`` convient comme ``data`` différé d'un
+    ``st.download_button`` : le contenu n'est relu qu'au téléchargement.
+    """
+
+    __slots__ = ('path', '_finalizer', '__weakref__')
+
+    def __init__(self, suffix=''):
+        fd, self.path = tempfile.mkstemp(prefix='qrpro-', suffix=suffix)
+        os.close(fd)
+        self._finalizer = weakref.finalize(self, _unlink, self.path)
+
+    @property
+    def size(self):
+        return os.path.getsize(self.path)
+
+    def write(self, data):
+        with open(self.path, 'wb') as f:
+            f.write(data)
+
+    def read(self):
+        with open(self.path, 'rb') as f:
+            return f.read()
+
+    def discard(self):
+        self._finalizer()
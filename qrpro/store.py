@@ -0,0 +1,193 @@
+"""Cache persistant sur disque, partagé par plusieurs processus serveur.
+
+Optionnel : activé par la variable d'environnement ``QRPRO_STORE_DIR``.
+Chaque entrée est un fichier blob (octets encodés ou matrice empaquetée) ;
+un index SQLite en mode WAL tient leur taille et leur dernier accès pour
+l'éviction LRU. Les blobs sont écrits dans un fichier temporaire puis
+renommés, sous un nom unique par écriture : un processus qui lit pendant
+qu'un autre réécrit ou évince garde un fichier complet. Les lectures
+projettent le fichier en mémoire (``mmap``) sans le copier.
+"""
+import mmap
+import os
+import sqlite3
+import struct
+import threading
+import time
+import uuid
+
+import numpy as np
+
+DEFAULT_MAX_BYTES = int(os.environ.get('QRPRO_STORE_BYTES', 1024 * 1024 * 1024))
+
+# Formats conservés sur disque, en plus de la matrice des modules
+PERSISTED_FORMATS = ('PNG', 'SVG')
+MATRIX = 'MATRIX'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    key TEXT NOT NULL,
+    fmt TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (key, fmt)
+);
+CREATE INDEX IF NOT EXISTS blobs_last_used ON blobs (last_used);
+"""
+
+
+def pack_matrix(matrix):
+    """Matrice booléenne carrée -> côté (2 octets) + 1 bit par module"""
+    return struct.pack('>H', matrix.shape[0]) + np.packbits(matrix).tobytes()
+
+
+def unpack_matrix(raw):
+    (side,) = struct.unpack_from('>H', raw)
+    bits = np.unpackbits(np.frombuffer(raw, dtype=np.uint8, offset=2), count=side * side)
+    matrix = bits.astype(bool).reshape(side, side)
+    matrix.flags.writeable = False
+    return matrix
+
+
+def _map(path):
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return memoryview(b'')
+        # La projection reste valide après fermeture du fichier, et même
+        # après sa suppression par une éviction concurrente
+        return memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+
+class DiskStore:
+    """Blobs par (clé, format) sur disque, bornés par un budget en octets"""
+
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = os.path.abspath(directory)
+        self.max_bytes = max_bytes
+        self._blobs = os.path.join(self.directory, 'blobs')
+        os.makedirs(self._blobs, exist_ok=True)
+        self._local = threading.local()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        with self._connect() as db:
+            db.executescript(_SCHEMA)
+
+    def _connect(self):
+        # Une connexion par thread : sqlite3 ne les partage pas entre threads
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = sqlite3.connect(os.path.join(self.directory, 'index.sqlite'),
+                                 timeout=30, isolation_level=None)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            self._local.db = db
+        return db
+
+    def _path(self, filename):
+        return os.path.join(self._blobs, filename[:2], filename)
+
+    def get(self, key, fmt):
+        """Octets stockés (``memoryview`` sur le fichier projeté) ou None"""
+        db = self._connect()
+        row = db.execute('SELECT filename FROM blobs WHERE key = ? AND fmt = ?',
+                         (key, fmt)).fetchone()
+        if row is not None:
+            try:
+                view = _map(self._path(row[0]))
+            except FileNotFoundError:
+                # Évincé par un autre processus entre la requête et l'ouverture
+                view = None
+            if view is not None:
+                db.execute('UPDATE blobs SET last_used = ? WHERE key = ? AND fmt = ?',
+                           (time.time(), key, fmt))
+                self.hits += 1
+                return view
+        self.misses += 1
+        return None
+
+    def put(self, key, fmt, data):
+        """Écrit un blob (écriture atomique), puis évince au-delà du budget"""
+        size = len(data)
+        if size > self.max_bytes:
+            return
+        filename = f'{key}.{fmt.lower()}.{uuid.uuid4().hex}'
+        path = self._path(filename)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f'{path}.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+        db = self._connect()
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            old = db.execute('SELECT filename FROM blobs WHERE key = ? AND fmt = ?',
+                             (key, fmt)).fetchone()
+            db.execute('INSERT OR REPLACE INTO blobs VALUES (?, ?, ?, ?, ?)',
+                       (key, fmt, filename, size, time.time()))
+            stale = [old[0]] if old is not None else []
+            stale += self._evict(db)
+            db.execute('COMMIT')
+        except BaseException:
+            db.execute('ROLLBACK')
+            os.unlink(path)
+            raise
+        for name in stale:
+            self._unlink(name)
+
+    def _evict(self, db):
+        # Appelé dans la transaction de put() : renvoie les fichiers à supprimer
+        total = db.execute('SELECT COALESCE(SUM(size), 0) FROM blobs').fetchone()[0]
+        stale = []
+        if total <= self.max_bytes:
+            return stale
+        for key, fmt, filename, size in db.execute(
+                'SELECT key, fmt, filename, size FROM blobs ORDER BY last_used').fetchall():
+            if total <= self.max_bytes:
+                break
+            db.execute('DELETE FROM blobs WHERE key = ? AND fmt = ?', (key, fmt))
+            stale.append(filename)
+            total -= size
+            self.evictions += 1
+        return stale
+
+    def _unlink(self, filename):
+        try:
+            os.unlink(self._path(filename))
+        except FileNotFoundError:
+            pass
+
+    def get_matrix(self, key):
+        raw = self.get(key, MATRIX)
+        return unpack_matrix(raw) if raw is not None else None
+
+    def put_matrix(self, key, matrix):
+        self.put(key, MATRIX, pack_matrix(matrix))
+
+    def clear(self):
+        db = self._connect()
+        db.execute('BEGIN IMMEDIATE')
+        names = [row[0] for row in db.execute('SELECT filename FROM blobs')]
+        db.execute('DELETE FROM blobs')
+        db.execute('COMMIT')
+        for name in names:
+            self._unlink(name)
+
+    def stats(self):
+        """Compteurs (ceux de l'index sont communs à tous les processus)"""
+        entries, total = self._connect().execute(
+            'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM blobs').fetchone()
+        return {
+            'entries': entries,
+            'bytes': total,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
+
+
+# Instance du processus, None si aucun répertoire n'est configuré
+disk_store = DiskStore(os.environ['QRPRO_STORE_DIR']) if os.environ.get('QRPRO_STORE_DIR') else None
@@ -0,0 +1,127 @@
+"""Ajout structuré : un contenu trop long pour un symbole, réparti sur 2 à 16.
+
+Chaque partie porte sa position, le nombre de parties et la parité du
+contenu complet (OU exclusif de tous ses octets) : un lecteur compatible le
+reconstitue quel que soit l'ordre de lecture. Le découpage se fait aux
+frontières de caractères et garde chaque partie sous ``MAX_PART_VERSION``
+quand c'est possible : plusieurs petits symboles se génèrent et se lisent
+plus vite qu'un seul symbole géant.
+"""
+import math
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from functools import reduce
+from operator import xor
+
+import numpy as np
+from PIL import Image
+from qrcode import util
+
+from qrpro.artifact import QRArtifact
+from qrpro.batch import EXTENSIONS
+from qrpro.cache import logo_bytes, normalize_config
+from qrpro.generator import error_correction, render_matrix
+from qrpro.masking import FastQRCode
+from qrpro.raster import _rgba
+from qrpro.segments import compile_payload
+from qrpro.timing import timed
+
+MAX_PARTS = 16
+# Version visée pour chaque partie (97×97 modules) ; dépassée seulement si
+# 16 parties n'y suffisent pas
+MAX_PART_VERSION = 20
+# Mode (4 bits) + position (4) + total (4) + parité (8)
+HEADER_BITS = 20
+
+
+def parity(data):
+    """Parité d'ajout structuré : OU exclusif des octets UTF-8 du contenu"""
+    return reduce(xor, data.encode('utf-8'), 0)
+
+
+def _split(data, count):
+    # Parts à peu près égales en octets, coupées entre deux caractères
+    total = len(data.encode('utf-8'))
+    parts, start, size = [], 0, 0
+    for i, char in enumerate(data):
+        size += len(char.encode('utf-8'))
+        if len(parts) < count - 1 and size * count >= total * (len(parts) + 1):
+            parts.append(data[start:i + 1])
+            start = i + 1
+    parts.append(data[start:])
+    return parts
+
+
+def plan_parts(data, level, max_version=MAX_PART_VERSION):
+    """Découpe ``data`` en parties et compile chacune (en-tête compris)
+
+    Renvoie ``(parties, compilations)`` pour le plus petit nombre de parties
+    dont chacune tient sous ``max_version``, à défaut sous la version 40.
+    """
+    whole = compile_payload(data, level)
+    for cap in (max_version, 40):
+        # Borne basse : bits du contenu entier / capacité d'une partie
+        limit = util.BIT_LIMIT_TABLE[level][cap] - HEADER_BITS
+        first = max(2, math.ceil(whole.bits / limit))
+        for count in range(first, min(MAX_PARTS, len(data)) + 1):
+            parts = _split(data, count)
+            compiled = [compile_payload(part, level, None, HEADER_BITS) for part in parts]
+            if all(c.version is not None and c.version <= cap for c in compiled):
+                return parts, compiled
+    raise ValueError(f"Contenu trop long, même réparti sur {MAX_PARTS} QR codes")
+
+
+def encode_part(compiled, level, position, total, check):
+    """Matrice (sans bordure, lecture seule) d'une partie d'ajout structuré"""
+    qr = FastQRCode(version=compiled.version, error_correction=level, border=0)
+    qr.structured_append = (position, total, check)
+    for segment in compiled.qr_data():
+        qr.add_data(segment)
+    qr.make(fit=False)
+    matrix = np.asarray(qr.modules, dtype=bool)
+    matrix.flags.writeable = False
+    return matrix
+
+
+def generate_structured(data, config, max_workers=None):
+    """Artefacts des parties, rendues en parallèle avec le style de ``config``
+
+    Les durées des étapes exécutées dans les threads du pool vont aux
+    statistiques globales, pas au ``collect`` de l'appelant.
+    """
+    level = error_correction(data, config)
+    with timed('segment'):
+        parts, compiled = plan_parts(data, level)
+    check = parity(data)
+    style = normalize_config(config)
+    raw_logo = logo_bytes(config['logo']) if config.get('logo') else None
+
+    def render(position):
+        matrix = encode_part(compiled[position], level, position, len(parts), check)
+        return QRArtifact(render_matrix(matrix, style, raw_logo), matrix, style, logo=raw_logo)
+
+    with ThreadPoolExecutor(max_workers) as pool:
+        return list(pool.map(render, range(len(parts))))
+
+
+def structured_sheet(artifacts, columns=None):
+    """Planche unique : les parties en grille, dans l'ordre de lecture"""
+    columns = columns or math.ceil(math.sqrt(len(artifacts)))
+    rows = math.ceil(len(artifacts) / columns)
+    cell = max(max(a.size) for a in artifacts)
+    back = _rgba(artifacts[0].style['back_color'])
+    sheet = Image.new('RGBA', (columns * cell, rows * cell), back)
+    for index, artifact in enumerate(artifacts):
+        row, column = divmod(index, columns)
+        offset = (cell - artifact.size[0]) // 2
+        sheet.paste(artifact.image, (column * cell + offset, row * cell + offset))
+    return sheet
+
+
+def write_structured_zip(artifacts, output, fmt='PNG'):
+    """Archive ZIP des parties, nommées dans l'ordre (qr_01_sur_04.png…)"""
+    ext = EXTENSIONS[fmt.upper()]
+    total = len(artifacts)
+    with zipfile.ZipFile(output, 'w', compression=zipfile.ZIP_STORED) as archive:
+        for position, artifact in enumerate(artifacts, 1):
+            archive.writestr(f'qr_{position:02d}_sur_{total:02d}.{ext}', artifact.encode(fmt))
@@ -0,0 +1,108 @@
+"""Chronométrage léger des étapes de génération et agrégats p50/p95 glissants."""
+import json
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Ordre d'affichage des étapes connues
+STAGES = ('payload', 'segment', 'fit', 'reed_solomon', 'mask', 'place', 'qrcode_make',
+          'rasterize', 'logo', 'encode_png', 'encode_jpeg', 'encode_svg',
+          'encode_pdf', 'encode_base64', 'verify')
+
+
+def _percentile(sorted_values, fraction):
+    # Rang le plus proche : ceil(p·n)-ième valeur (p50 de 10 valeurs = la 5e) ;
+    # l'arrondi écarte l'erreur de virgule flottante (0.07 × 100 = 7.000…01)
+    index = max(0, math.ceil(round(fraction * len(sorted_values), 9)) - 1)
+    return sorted_values[min(index, len(sorted_values) - 1)]
+
+
+class StageStats:
+    """Durées par étape sur une fenêtre glissante, partagées par tout le processus"""
+
+    def __init__(self, window=1024):
+        self.window = window
+        self._samples = {}
+        self._totals = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage, seconds):
+        with self._lock:
+            samples = self._samples.get(stage)
+            if samples is None:
+                samples = self._samples[stage] = deque(maxlen=self.window)
+            samples.append(seconds)
+            count, total = self._totals.get(stage, (0, 0.0))
+            self._totals[stage] = (count + 1, total + seconds)
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._totals.clear()
+
+    def summary(self):
+        """{étape: count, sum, p50, p95, last} en secondes, étapes connues d'abord"""
+        with self._lock:
+            snapshot = {stage: list(samples) for stage, samples in self._samples.items()}
+            totals = dict(self._totals)
+        order = [s for s in STAGES if s in snapshot] + sorted(set(snapshot) - set(STAGES))
+        result = {}
+        for stage in order:
+            values = sorted(snapshot[stage])
+            count, total = totals[stage]
+            result[stage] = {
+                'count': count,
+                'sum': total,
+                'p50': _percentile(values, 0.50),
+                'p95': _percentile(values, 0.95),
+                'last': snapshot[stage][-1],
+            }
+        return result
+
+    def to_json(self):
+        return json.dumps(self.summary(), indent=2)
+
+    def to_prometheus(self, metric='qrpro_stage_seconds'):
+        """Format texte d'exposition Prometheus (type summary)"""
+        lines = [f"# HELP {metric} Durée des étapes de génération de QR code",
+                 f"# TYPE {metric} summary"]
+        for stage, values in self.summary().items():
+            label = f'stage="{stage}"'
+            lines.append(f'{metric}{{{label},quantile="0.5"}} {values["p50"]:.6f}')
+            lines.append(f'{metric}{{{label},quantile="0.95"}} {values["p95"]:.6f}')
+            lines.append(f'{metric}_sum{{{label}}} {values["sum"]:.6f}')
+            lines.append(f'{metric}_count{{{label}}} {values["count"]}')
+        return "\n".join(lines) + "\n"
+
+
+stage_stats = StageStats()
+_local = threading.local()
+
+
+@contextmanager
+def timed(stage, into=None):
+    """Chronomètre un bloc ; alimente les agrégats, la collecte en cours du
+    thread et, si fourni, le dict ``into``"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        stage_stats.record(stage, elapsed)
+        for breakdown in (getattr(_local, 'breakdown', None), into):
+            if breakdown is not None:
+                breakdown[stage] = breakdown.get(stage, 0.0) + elapsed
+
+
+@contextmanager
+def collect(breakdown=None):
+    """Rassemble dans un dict (nouveau ou ``breakdown``) les durées des étapes
+    exécutées dans ce bloc par le thread courant"""
+    previous = getattr(_local, 'breakdown', None)
+    breakdown = _local.breakdown = {} if breakdown is None else breakdown
+    try:
+        yield breakdown
+    finally:
+        _local.breakdown = previous
@@ -0,0 +1,201 @@
+"""Sorties vectorielles SVG et PDF écrites directement depuis la matrice de modules.
+
+Aucune rastérisation : chaque ligne de modules foncés est fusionnée en
+séries horizontales, et chaque série devient un seul rectangle.
+"""
+import base64
+import zlib
+from io import BytesIO
+
+import numpy as np
+from PIL import Image, ImageColor
+
+from qrpro.cache import stored_logo
+
+MIME_BY_FORMAT = {'PNG': 'image/png', 'JPEG': 'image/jpeg', 'GIF': 'image/gif'}
+
+# Côté maximal du logo embarqué dans un PDF (pixels)
+PDF_LOGO_MAX = 1024
+
+
+def dark_runs(matrix):
+    """Séries horizontales de modules foncés : tableaux (ligne, colonne, longueur)"""
+    modules = np.asarray(matrix, dtype=np.int8)
+    padded = np.zeros((modules.shape[0], modules.shape[1] + 2), dtype=np.int8)
+    padded[:, 1:-1] = modules
+    edges = np.diff(padded, axis=1)
+    rows, starts = np.nonzero(edges == 1)
+    _, ends = np.nonzero(edges == -1)
+    return rows, starts, ends - starts
+
+
+def _hex(color):
+    r, g, b, a = ImageColor.getcolor(color, 'RGBA')
+    return f"#{r:02x}{g:02x}{b:02x}", a / 255
+
+
+def _is_transparent(color):
+    return isinstance(color, str) and color.lower() == 'transparent'
+
+
+def _style_logo(style):
+    if not style.get('logo'):
+        return None
+    return stored_logo(style['logo'])
+
+
+def _logo_box(total, logo_size):
+    # Même géométrie que l'incrustation raster : côté = logo_size % du symbole
+    side = total * logo_size / 100
+    offset = (total - side) / 2
+    return offset, side
+
+
+def to_svg(matrix, style, raw_logo=None):
+    """Document SVG (str) pour une matrice sans bordure et un style normalisé"""
+    border = style['border']
+    total = matrix.shape[0] + 2 * border
+    pixels = total * style['box_size']
+    rows, cols, lengths = dark_runs(matrix)
+
+    path = "".join(f"M{c + border} {r + border}h{n}v1h-{n}z"
+                   for r, c, n in zip(rows.tolist(), cols.tolist(), lengths.tolist()))
+    fill, fill_opacity = _hex(style['fill_color'])
+    parts = [
+        '<?xml version="1.0" encoding="UTF-8"?>',
+        f'<svg xmlns="http://www.w3.org/2000/svg" xmlns:xlink="http://www.w3.org/1999/xlink" '
+        f'width="{pixels}" height="{pixels}" viewBox="0 0 {total} {total}" shape-rendering="crispEdges">',
+    ]
+    if not _is_transparent(style['back_color']):
+        back, back_opacity = _hex(style['back_color'])
+        opacity = f' fill-opacity="{back_opacity:g}"' if back_opacity < 1 else ''
+        parts.append(f'<rect width="{total}" height="{total}" fill="{back}"{opacity}/>')
+    opacity = f' fill-opacity="{fill_opacity:g}"' if fill_opacity < 1 else ''
+    parts.append(f'<path fill="{fill}"{opacity} d="{path}"/>')
+
+    raw_logo = raw_logo if raw_logo is not None else _style_logo(style)
+    if raw_logo is not None:
+        mime = MIME_BY_FORMAT.get(Image.open(BytesIO(raw_logo)).format, 'image/png')
+        offset, side = _logo_box(total, style['logo_size'])
+        href = f"data:{mime};base64,{base64.b64encode(raw_logo).decode()}"
+        parts.append(f'<image x="{offset:g}" y="{offset:g}" width="{side:g}" height="{side:g}" '
+                     f'preserveAspectRatio="none" xlink:href="{href}"/>')
+    parts.append('</svg>')
+    return "\n".join(parts)
+
+
+def _pdf_rgb(color):
+    r, g, b = ImageColor.getrgb(color)[:3]
+    return f"{r / 255:.4g} {g / 255:.4g} {b / 255:.4g}"
+
+
+class PdfWriter:
+    """Écriture minimale d'un PDF : objets numérotés, table xref, trailer"""
+
+    HEADER = b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n"
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.offsets = {}
+        self.stream.write(self.HEADER)
+        self._tell = len(self.HEADER)
+        self._next = 1
+
+    def reserve(self):
+        number = self._next
+        self._next += 1
+        return number
+
+    def write(self, number, body, data=None):
+        """Écrit l'objet ``number`` ; ``data`` en fait un flux (déjà compressé si besoin)"""
+        if data is not None:
+            # Le dictionnaire se termine par '>>' : on y ajoute /Length
+            body = f"{body[:-2].rstrip()} /Length {len(data)} >>\nstream\n".encode('latin-1')
+            body += data + b"\nendstream"
+        else:
+            body = body.encode('latin-1')
+        chunk = f"{number} 0 obj\n".encode() + body + b"\nendobj\n"
+        self.offsets[number] = self._tell
+        self.stream.write(chunk)
+        self._tell += len(chunk)
+
+    def close(self, root):
+        count = self._next
+        xref = [f"xref\n0 {count}\n", "0000000000 65535 f \n"]
+        xref += [f"{self.offsets[n]:010d} 00000 n \n" for n in range(1, count)]
+        trailer = f"trailer\n<< /Size {count} /Root {root} 0 R >>\nstartxref\n{self._tell}\n%%EOF\n"
+        self.stream.write(("".join(xref) + trailer).encode('latin-1'))
+
+
+def _pdf_content(matrix, style, origin=(0.0, 0.0), module=1.0, logo_name=None):
+    """Opérateurs PDF dessinant un QR code, coin inférieur gauche en ``origin`` (pt)"""
+    border = style['border']
+    total = matrix.shape[0] + 2 * border
+    size = total * module
+    x0, y0 = origin
+    ops = ["q"]
+    if not _is_transparent(style['back_color']):
+        ops.append(f"{_pdf_rgb(style['back_color'])} rg {x0:g} {y0:g} {size:g} {size:g} re f")
+    # Repère en modules, axe y vers le bas comme la matrice
+    ops.append(f"{module:g} 0 0 {-module:g} {x0:g} {y0 + size:g} cm {_pdf_rgb(style['fill_color'])} rg")
+    rows, cols, lengths = dark_runs(matrix)
+    ops.extend(f"{c + border} {r + border} {n} 1 re"
+               for r, c, n in zip(rows.tolist(), cols.tolist(), lengths.tolist()))
+    ops.append("f Q")
+    if logo_name:
+        offset, side = _logo_box(total, style['logo_size'])
+        ops.append(f"q {side * module:g} 0 0 {side * module:g} {x0 + offset * module:g} "
+                   f"{y0 + offset * module:g} cm /{logo_name} Do Q")
+    return "\n".join(ops)
+
+
+def write_pdf_logo(pdf, raw_logo):
+    """Écrit le logo comme image XObject (+ SMask si transparent) ; renvoie son numéro"""
+    logo = Image.open(BytesIO(raw_logo)).convert('RGBA')
+    if max(logo.size) > PDF_LOGO_MAX:
+        logo.thumbnail((PDF_LOGO_MAX, PDF_LOGO_MAX), Image.Resampling.LANCZOS)
+    width, height = logo.size
+    header = (f"<< /Type /XObject /Subtype /Image /Width {width} /Height {height} "
+              f"/BitsPerComponent 8 /Filter /FlateDecode")
+
+    number = pdf.reserve()
+    smask = ""
+    alpha = logo.getchannel('A')
+    if alpha.getextrema() != (255, 255):
+        mask_number = pdf.reserve()
+        pdf.write(mask_number, f"{header} /ColorSpace /DeviceGray >>",
+                  zlib.compress(alpha.tobytes()))
+        smask = f" /SMask {mask_number} 0 R"
+    pdf.write(number, f"{header} /ColorSpace /DeviceRGB{smask} >>",
+              zlib.compress(logo.convert('RGB').tobytes()))
+    return number
+
+
+def write_pdf(stream, matrix, style, raw_logo=None, module_pt=None):
+    """Écrit un PDF d'une page contenant le QR code ; un module = ``module_pt`` points"""
+    module = module_pt or style['box_size'] * 0.75  # px -> pt à 96 dpi
+    total = matrix.shape[0] + 2 * style['border']
+    size = total * module
+    raw_logo = raw_logo if raw_logo is not None else _style_logo(style)
+
+    pdf = PdfWriter(stream)
+    catalog, pages, page, content = (pdf.reserve() for _ in range(4))
+    resources = "<< >>"
+    if raw_logo is not None:
+        resources = f"<< /XObject << /Logo {write_pdf_logo(pdf, raw_logo)} 0 R >> >>"
+
+    ops = _pdf_content(matrix, style, module=module,
+                       logo_name='Logo' if raw_logo is not None else None)
+    pdf.write(content, "<< /Filter /FlateDecode >>", zlib.compress(ops.encode('latin-1')))
+    pdf.write(page, f"<< /Type /Page /Parent {pages} 0 R /MediaBox [0 0 {size:g} {size:g}] "
+                    f"/Resources {resources} /Contents {content} 0 R >>")
+    pdf.write(pages, f"<< /Type /Pages /Kids [{page} 0 R] /Count 1 >>")
+    pdf.write(catalog, f"<< /Type /Catalog /Pages {pages} 0 R >>")
+    pdf.close(catalog)
+
+
+def to_pdf(matrix, style, raw_logo=None, module_pt=None):
+    """Document PDF (bytes) d'une page"""
+    buffered = BytesIO()
+    write_pdf(buffered, matrix, style, raw_logo, module_pt)
+    return buffered.getvalue()
@@ -0,0 +1,342 @@
+"""Vérification de lecture : l'image rendue est relue comme le ferait un lecteur.
+
+La géométrie étant connue (bordure, taille des modules), l'image est
+échantillonnée au centre de chaque module puis seuillée entre la couleur
+des modules et celle du fond : on obtient la grille que verrait un lecteur
+bien cadré. Elle est comparée à la matrice encodée (modules abîmés par le
+logo, les couleurs ou la compression), puis décodée entièrement : format,
+démasquage, désentrelacement, correction Reed-Solomon de chaque bloc et
+lecture des segments.
+"""
+import time
+from io import BytesIO
+
+import numpy as np
+import qrcode
+from PIL import Image, ImageColor
+from qrcode import base, util
+
+from qrpro.masking import MODE_STRUCTURED_APPEND, data_positions, mask_patterns
+from qrpro.occlusion import LEVELS, _codeword_blocks, block_damage
+from qrpro.segments import _BANDS, _COUNT_BITS
+from qrpro.timing import timed
+
+MODE_ECI = 7
+
+_EXP = np.array(base.EXP_TABLE, dtype=np.int32)
+_LOG = np.array(base.LOG_TABLE, dtype=np.int32)
+_FORMATS = {}
+
+
+class DecodeError(Exception):
+    """Le symbole échantillonné n'a pas pu être décodé"""
+
+
+def _gmul(a, b):
+    if a == 0 or b == 0:
+        return 0
+    return base.EXP_TABLE[(base.LOG_TABLE[a] + base.LOG_TABLE[b]) % 255]
+
+
+def _gdiv(a, b):
+    if a == 0:
+        return 0
+    return base.EXP_TABLE[(base.LOG_TABLE[a] - base.LOG_TABLE[b]) % 255]
+
+
+def _poly_eval(poly, x):
+    # Coefficients du plus bas degré au plus haut
+    value = 0
+    for coefficient in reversed(poly):
+        value = _gmul(value, x) ^ coefficient
+    return value
+
+
+def _syndromes(codeword, ecc_count):
+    # S_j = c(α^j), tous les j d'un coup : exposants log(c_k) + j·(n-1-k)
+    codeword = np.asarray(codeword, dtype=np.int32)
+    nonzero = np.flatnonzero(codeword)
+    if not len(nonzero):
+        return [0] * ecc_count
+    powers = len(codeword) - 1 - nonzero
+    exponents = (_LOG[codeword[nonzero]][np.newaxis, :]
+                 + np.arange(ecc_count)[:, np.newaxis] * powers[np.newaxis, :]) % 255
+    return np.bitwise_xor.reduce(_EXP[exponents], axis=1).tolist()
+
+
+def rs_correct(codeword, ecc_count):
+    """Corrige un bloc (données + correction) ; renvoie (octets corrigés, erreurs)
+
+    Berlekamp-Massey pour le polynôme localisateur, recherche de Chien pour
+    les positions, Forney pour les valeurs (racines α^0…α^(n-k-1)). Lève
+    ``DecodeError`` au-delà de ``ecc_count // 2`` erreurs.
+    """
+    syndromes = _syndromes(codeword, ecc_count)
+    if not any(syndromes):
+        return bytes(codeword), 0
+
+    locator, previous = [1], [1]
+    length, shift, last = 0, 1, 1
+    for n, syndrome in enumerate(syndromes):
+        delta = syndrome
+        for i in range(1, length + 1):
+            delta ^= _gmul(locator[i], syndromes[n - i])
+        if delta == 0:
+            shift += 1
+            continue
+        factor = _gdiv(delta, last)
+        update = [0] * shift + [_gmul(factor, c) for c in previous]
+        new = [a ^ b for a, b in zip(locator + [0] * (len(update) - len(locator)),
+                                     update + [0] * (len(locator) - len(update)))]
+        if 2 * length <= n:
+            previous, length, last, shift = locator, n + 1 - length, delta, 1
+        else:
+            shift += 1
+        locator = new
+    if 2 * length > ecc_count:
+        raise DecodeError("trop d'erreurs dans un bloc")
+
+    size = len(codeword)
+    # Positions : Λ(α^-i) = 0 pour une erreur sur le coefficient de degré i
+    errors = [i for i in range(size) if _poly_eval(locator, base.EXP_TABLE[-i % 255]) == 0]
+    if len(errors) != length:
+        raise DecodeError("localisation des erreurs impossible")
+    omega = [0] * ecc_count
+    for i, s in enumerate(syndromes):
+        for j, c in enumerate(locator[:ecc_count - i]):
+            omega[i + j] ^= _gmul(s, c)
+    derivative = [locator[k] if k % 2 else 0 for k in range(1, len(locator))]
+    corrected = bytearray(codeword)
+    for i in errors:
+        inverse = base.EXP_TABLE[-i % 255]
+        magnitude = _gmul(base.EXP_TABLE[i % 255],
+                          _gdiv(_poly_eval(omega, inverse), _poly_eval(derivative, inverse)))
+        corrected[size - 1 - i] ^= magnitude
+    if any(_syndromes(corrected, ecc_count)):
+        raise DecodeError("correction Reed-Solomon incohérente")
+    return bytes(corrected), len(errors)
+
+
+def _format_patterns(version):
+    # Valeurs des modules de format (deux copies + module sombre) pour
+    # chaque couple (niveau, masque), relevées sur la librairie elle-même
+    patterns = _FORMATS.get(version)
+    if patterns is None:
+        size = 4 * version + 17
+        qr = qrcode.QRCode(version=version, border=0)
+        qr.modules_count = size
+        combos, values = [], []
+        for level in LEVELS:
+            for mask in range(8):
+                qr.error_correction = level
+                qr.modules = [[None] * size for _ in range(size)]
+                qr.setup_type_info(False, mask)
+                grid = np.array([[m is True for m in row] for row in qr.modules])
+                cells = np.array([[m is not None for m in row] for row in qr.modules])
+                combos.append((level, mask))
+                values.append(grid[cells])
+        rows, cols = np.nonzero(cells)
+        patterns = (rows, cols, combos, np.array(values))
+        _FORMATS[version] = patterns
+    return patterns
+
+
+def read_format(grid):
+    """(niveau, masque, modules de format faux) : motif valide le plus proche"""
+    version = (grid.shape[0] - 17) // 4
+    rows, cols, combos, values = _format_patterns(version)
+    distances = np.count_nonzero(values != grid[rows, cols], axis=1)
+    best = int(np.argmin(distances))
+    # Deux copies de 15 bits, distance minimale 7 entre formats : au-delà de
+    # 3 erreurs par copie, la lecture n'est plus sûre
+    if distances[best] > 7:
+        raise DecodeError("informations de format illisibles")
+    level, mask = combos[best]
+    return level, mask, int(distances[best])
+
+
+def read_codewords(grid, mask):
+    """Mots de code entrelacés, lus dans l'ordre de placement et démasqués"""
+    rows, cols = data_positions((grid.shape[0] - 17) // 4)
+    bits = grid[rows, cols] ^ mask_patterns(grid.shape[0])[mask][rows, cols]
+    return np.packbits(bits[:len(bits) // 8 * 8]).tobytes()
+
+
+def correct_blocks(codewords, version, level):
+    """Désentrelace, corrige chaque bloc ; renvoie (données, erreurs par bloc)"""
+    order, ecc = _codeword_blocks(version, level)
+    stream = np.frombuffer(codewords[:len(order)], dtype=np.uint8)
+    data, errors = b'', []
+    for block, ecc_count in enumerate(ecc.tolist()):
+        corrected, count = rs_correct(stream[order == block], ecc_count)
+        data += corrected[:len(corrected) - ecc_count]
+        errors.append(count)
+    return data, errors
+
+
+def read_segments(data, version):
+    """Contenu (octets) et en-tête d'ajout structuré (position, total, parité) ou None"""
+    bits = np.unpackbits(np.frombuffer(data, dtype=np.uint8))
+    band = next(b for b, (low, high) in enumerate(_BANDS) if low <= version <= high)
+    pos = 0
+
+    def take(n):
+        nonlocal pos
+        if pos + n > len(bits):
+            raise DecodeError("segment tronqué")
+        value = 0
+        for bit in bits[pos:pos + n]:
+            value = value << 1 | int(bit)
+        pos += n
+        return value
+
+    out, header = bytearray(), None
+    while len(bits) - pos >= 4:
+        mode = take(4)
+        if mode == 0:
+            break
+        if mode == MODE_STRUCTURED_APPEND:
+            header = (take(4), take(4) + 1, take(8))
+            continue
+        if mode == MODE_ECI:
+            take(8)
+            continue
+        if mode not in _COUNT_BITS:
+            raise DecodeError(f"mode de segment inconnu : {mode}")
+        length = take(_COUNT_BITS[mode][band])
+        if mode == util.MODE_NUMBER:
+            for i in range(0, length, 3):
+                group = min(3, length - i)
+                out += str(take((0, 4, 7, 10)[group])).zfill(group).encode()
+        elif mode == util.MODE_ALPHA_NUM:
+            for i in range(0, length, 2):
+                if length - i >= 2:
+                    value = take(11)
+                    out += bytes([util.ALPHA_NUM[value // 45], util.ALPHA_NUM[value % 45]])
+                else:
+                    out += bytes([util.ALPHA_NUM[take(6)]])
+        else:
+            out += bytes(take(8) for _ in range(length))
+    return bytes(out), header
+
+
+def _luminance(image):
+    # Composé sur blanc, comme sur papier ou sur une page web claire ; la
+    # conversion 'L' de PIL applique les mêmes poids que _color_luminance
+    if image.mode in ('RGBA', 'LA', 'P'):
+        image = image.convert('RGBA')
+        image = Image.alpha_composite(Image.new('RGBA', image.size, (255, 255, 255, 255)), image)
+    return np.asarray(image.convert('L'))
+
+
+def _color_luminance(color):
+    if isinstance(color, str) and color.lower() == 'transparent':
+        return 255.0
+    r, g, b = ImageColor.getrgb(color)[:3]
+    return 0.299 * r + 0.587 * g + 0.114 * b
+
+
+def sample_grid(image, side, style):
+    """Grille des modules sombres lue dans l'image (bordure retirée)
+
+    Chaque module est la moyenne de sa moitié centrale, seuillée à mi-chemin
+    entre la luminance des modules et celle du fond.
+    """
+    box, border = style['box_size'], style['border']
+    lum = _luminance(image)
+    start, stop = border * box, (border + side) * box
+    if lum.shape[0] < stop or lum.shape[1] < stop:
+        raise DecodeError("image plus petite que la géométrie annoncée")
+    inner = slice(box // 4, box - box // 4) if box >= 4 else slice(0, box)
+    modules = lum[start:stop, start:stop].reshape(side, box, side, box)
+    values = modules[:, inner, :, inner].mean(axis=(1, 3), dtype=np.float32)
+    fill, back = _color_luminance(style['fill_color']), _color_luminance(style['back_color'])
+    if fill == back:
+        raise DecodeError("aucun contraste entre modules et fond")
+    return (values < (fill + back) / 2) == (fill < back)
+
+
+class Verification:
+    """Résultat d'une vérification
+
+    ``damaged`` : modules lus différemment de la matrice ; ``hits`` /
+    ``correctable`` : mots de code touchés et corrigibles par bloc ;
+    ``decoded`` : contenu relu (None si le décodage a échoué, voir ``error``).
+    """
+
+    __slots__ = ('version', 'level', 'damaged', 'hits', 'correctable', 'corrected',
+                 'decoded', 'expected', 'error', 'seconds')
+
+    def __init__(self, version, level, damaged, hits, correctable, corrected=None,
+                 decoded=None, expected=None, error=None, seconds=0.0):
+        self.version = version
+        self.level = level
+        self.damaged = damaged
+        self.hits = hits
+        self.correctable = correctable
+        self.corrected = corrected
+        self.decoded = decoded
+        self.expected = expected
+        self.error = error
+        self.seconds = seconds
+
+    @property
+    def passed(self):
+        """Décodé, et identique au contenu attendu s'il est connu"""
+        if self.decoded is None:
+            return False
+        return self.expected is None or self.decoded == self.expected
+
+    @property
+    def budget(self):
+        """Part de la capacité de correction consommée (bloc le plus touché)"""
+        return max((h / c if c else float(h > 0)) for h, c in zip(self.hits, self.correctable))
+
+    def summary(self):
+        if self.passed:
+            return (f"lisible • {self.damaged} module(s) abîmé(s), "
+                    f"{self.budget:.0%} de la correction utilisée")
+        if self.decoded is not None:
+            return "contenu relu différent du contenu encodé"
+        return (f"illisible • {self.error} ({self.damaged} module(s) abîmé(s), "
+                f"{self.budget:.0%} de la correction nécessaire)")
+
+
+def verify_image(image, matrix, style, data=None):
+    """Échantillonne ``image`` avec la géométrie de ``style`` et la décode
+
+    ``matrix`` est la matrice encodée (sans bordure), ``data`` le contenu
+    attendu (str ou bytes), comparé au contenu relu.
+    """
+    start = time.perf_counter()
+    with timed('verify'):
+        version = (matrix.shape[0] - 17) // 4
+        expected = data.encode('utf-8') if isinstance(data, str) else data
+        grid = sample_grid(image, matrix.shape[0], style)
+        damage = grid != matrix
+        # Niveau de la matrice encodée (le format du symbole d'origine)
+        level = read_format(np.asarray(matrix, dtype=bool))[0]
+        hits, correctable = block_damage(version, level, damage)
+        report = Verification(version, level, int(np.count_nonzero(damage)),
+                              hits.tolist(), correctable.tolist(), expected=expected)
+        try:
+            read_level, mask, _ = read_format(grid)
+            data_bytes, report.corrected = correct_blocks(read_codewords(grid, mask),
+                                                          version, read_level)
+            report.decoded = read_segments(data_bytes, version)[0]
+        except DecodeError as e:
+            report.error = str(e)
+    report.seconds = time.perf_counter() - start
+    return report
+
+
+def verify_artifact(artifact, data=None, fmt=None):
+    """Vérifie un artefact, ou ses octets encodés dans ``fmt`` (PNG, JPEG)
+
+    Avec ``fmt``, l'image relue est celle du fichier livré : les défauts de
+    compression JPEG sont alors pris en compte.
+    """
+    image = artifact.image
+    if fmt is not None:
+        image = Image.open(BytesIO(artifact.encode(fmt)))
+    return verify_image(image, artifact.matrix, artifact.style, data)
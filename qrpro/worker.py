@@ -0,0 +1,108 @@
+"""File de rendu partagée : les QR codes sont générés hors du thread du script.
+
+Un rerun Streamlit s'exécute dans le thread de sa session ; un rendu lourd
+(grande version, gros modules, logo) y bloquerait toute interaction. Les
+demandes passent par une file commune servie par un pool de threads (numpy,
+zlib et PIL relâchent le GIL dans leurs boucles) et la page interroge le
+``Future`` renvoyé. Une demande identique déjà en cours partage ce ``Future``.
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from qrpro.artifact import QRArtifact
+from qrpro.cache import logo_bytes, render_key
+from qrpro.generator import LogoError, generate_qr_artifact
+from qrpro.structured import generate_structured, structured_sheet
+from qrpro.timing import collect
+
+DEFAULT_WORKERS = int(os.environ.get('QRPRO_RENDER_WORKERS', min(4, os.cpu_count() or 1)))
+
+
+class RenderResult:
+    """Résultat d'un rendu : l'artefact, l'avertissement éventuel (logo) et
+    les durées des étapes mesurées dans le thread de rendu
+
+    Pour un ajout structuré, ``parts`` contient les artefacts des parties et
+    ``artifact`` la planche qui les rassemble.
+    """
+
+    __slots__ = ('artifact', 'warning', 'timings', 'parts')
+
+    def __init__(self, artifact, warning, timings, parts=None):
+        self.artifact = artifact
+        self.warning = warning
+        self.timings = timings
+        self.parts = parts
+
+
+def _render(data, config):
+    timings = {}
+    warning = None
+    with collect(timings):
+        try:
+            artifact = generate_qr_artifact(data, config)
+        except LogoError as e:
+            artifact, warning = e.artifact, str(e)
+        # PNG et URI base64 mémorisés dans l'artefact avant de rendre la main
+        artifact.data_uri()
+    return RenderResult(artifact, warning, timings)
+
+
+def _render_structured(data, config):
+    timings = {}
+    with collect(timings):
+        parts = generate_structured(data, config)
+        sheet = QRArtifact(structured_sheet(parts))
+        sheet.png
+    return RenderResult(sheet, None, timings, parts)
+
+
+class RenderWorker:
+    """Pool de threads de rendu avec regroupement des demandes identiques"""
+
+    def __init__(self, max_workers=DEFAULT_WORKERS):
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix='qrpro-render')
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._submitted = 0
+        self._shared = 0
+
+    def submit(self, data, config, structured=False):
+        """Met un rendu en file ; renvoie un ``Future`` de ``RenderResult``
+
+        Le logo est lu ici, dans le thread appelant : le fichier uploadé n'est
+        jamais partagé avec le thread de rendu. ``structured`` répartit le
+        contenu sur plusieurs QR codes (ajout structuré).
+        """
+        if config.get('logo'):
+            config = dict(config, logo=logo_bytes(config['logo']))
+        key = render_key(data, config) + (':parts' if structured else '')
+        render = _render_structured if structured else _render
+        with self._lock:
+            self._submitted += 1
+            future = self._pending.get(key)
+            if future is not None:
+                self._shared += 1
+                return future
+            future = self._pending[key] = self._executor.submit(render, data, config)
+        future.add_done_callback(lambda _: self._forget(key))
+        return future
+
+    def _forget(self, key):
+        with self._lock:
+            self._pending.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'workers': self.max_workers,
+                'pending': len(self._pending),
+                'submitted': self._submitted,
+                'shared': self._shared,
+            }
+
+
+# Instance partagée par toutes les sessions du processus
+render_worker = RenderWorker()
@@ -1,12 +1,25 @@
 # app.py
 import streamlit as st
 import qrcode
-from PIL import Image, ImageDraw, ImageFont
-from io import BytesIO
-import base64
-import validators
-import json
-import time
+from concurrent.futures import wait
+
+from qrpro.batch import generate_batch_zip, load_records
+from qrpro.labels import TEMPLATES, write_label_sheets
+from qrpro.verify import verify_artifact
+from qrpro.cache import normalize_config, render_cache
+from qrpro.capacity import estimate
+# error_correction est aussi le nom du choix du formulaire : alias explicite
+from qrpro.generator import AUTO_ERROR_CORRECTION, compile_data, preview_qr_code
+from qrpro.generator import error_correction as resolve_error_correction
+from qrpro.occlusion import covered_modules, survives
+from qrpro.payloads import (create_email_qr, create_event_qr, create_sms_qr,
+                            create_tel_qr, create_url_qr, create_vcard_qr,
+                            create_wifi_qr)
+from qrpro.session import SessionFile, SessionQR
+from qrpro.store import disk_store
+from qrpro.structured import write_structured_zip
+from qrpro.timing import stage_stats, timed
+from qrpro.worker import render_worker
 
 # Configuration de la page - DOIT ÊTRE LA PREMIÈRE COMMANDE
 st.set_page_config(
@@ -154,393 +167,642 @@ if 'qr_data' not in st.session_state:
     st.session_state.qr_data = ""
 if 'qr_config' not in st.session_state:
     st.session_state.qr_config = {}
+if 'qr_timings' not in st.session_state:
+    st.session_state.qr_timings = {}
+if 'batch_zip' not in st.session_state:
+    st.session_state.batch_zip = None
+    st.session_state.batch_stats = None
+if 'labels_pdf' not in st.session_state:
+    st.session_state.labels_pdf = None
+    st.session_state.labels_stats = None
+if 'render_job' not in st.session_state:
+    st.session_state.render_job = None
+    st.session_state.render_notice = None
+if 'qr_parts' not in st.session_state:
+    st.session_state.qr_parts = None
+
+# Intervalle d'interrogation d'un rendu en file, et attente courte au clic :
+# un rendu rapide s'affiche dès ce passage, un rendu lourd ne bloque pas la page
+RENDER_POLL_SECONDS = 0.25
+RENDER_INLINE_WAIT = 0.15
+# Largeur maximale d'affichage de st.image : une image plus large serait
+# réduite et réencodée à chaque rerun
+DISPLAY_WIDTH = 1460
+# Aperçu en direct : rastérisé à cette largeur, pas à la taille finale
+PREVIEW_WIDTH = 220
+
+EC_NAMES = {
+    qrcode.constants.ERROR_CORRECT_L: "L",
+    qrcode.constants.ERROR_CORRECT_M: "M",
+    qrcode.constants.ERROR_CORRECT_Q: "Q",
+    qrcode.constants.ERROR_CORRECT_H: "H",
+}
 
 # Fonctions utilitaires
-def generate_qr_code(data, config):
-    """Génère un QR code avec configuration"""
+def submit_render(data, config, payload_timings, structured=False):
+    """Met le rendu en file dans le pool partagé ; relevé par collect_render()"""
+    future = render_worker.submit(data, config, structured)
+    st.session_state.render_job = (future, data, config, payload_timings)
+    return future
+
+def collect_render():
+    """Relève le rendu en file s'il est terminé ; renvoie True dans ce cas"""
+    job = st.session_state.render_job
+    if job is None or not job[0].done():
+        return False
+    future, data, config, payload_timings = job
+    st.session_state.render_job = None
     try:
-        qr = qrcode.QRCode(
-            version=config.get('version', None),
-            error_correction=qrcode.constants.ERROR_CORRECT_H,
-            box_size=config.get('box_size', 10),
-            border=config.get('border', 4),
-        )
-        qr.add_data(data)
-        qr.make(fit=True)
-        
-        img = qr.make_image(
-            fill_color=config.get('fill_color', '#000000'),
-            back_color=config.get('back_color', '#FFFFFF')
-        )
-        
-        # Conversion PIL pour manipulation
-        img = img.convert('RGBA')
-        
-        # Ajout de logo si spécifié
-        if config.get('logo'):
-            try:
-                logo = Image.open(config['logo']).convert("RGBA")
-                # Redimensionner le logo
-                logo_size = config.get('logo_size', 15)  # pourcentage
-                qr_size = img.size[0]
-                logo_new_size = int(qr_size * logo_size / 100)
-                logo = logo.resize((logo_new_size, logo_new_size))
-                
-                # Position au centre
-                pos = ((qr_size - logo_new_size) // 2, 
-                      (qr_size - logo_new_size) // 2)
-                
-                # Créer un mask pour transparence
-                mask = logo.split()[3] if len(logo.split()) == 4 else None
-                img.paste(logo, pos, mask)
-            except Exception as e:
-                st.warning(f"Impossible d'ajouter le logo: {e}")
-        
-        return img
+        result = future.result()
     except Exception as e:
-        st.error(f"Erreur lors de la génération du QR code: {e}")
-        return None
-
-def get_qr_download_link(img, filename="qr_code.png"):
+        st.session_state.render_notice = ('error', f"Erreur lors de la génération du QR code: {e}")
+        return True
+    # Sauvegarde dans session state (config normalisée : le logo n'y figure que par son empreinte)
+    st.session_state.qr_data = data
+    st.session_state.qr_config = normalize_config(config)
+    st.session_state.qr_timings = {**payload_timings, **result.timings}
+    discard_parts()
+    if result.parts:
+        # Ajout structuré : planche et archive des parties sur disque, la session ne garde que les fichiers
+        sheet = SessionFile('.png')
+        sheet.write(result.artifact.png)
+        display = result.artifact.display_png(DISPLAY_WIDTH)
+        if display is not result.artifact.png:
+            display_file = SessionFile('.png')
+            display_file.write(display)
+        else:
+            display_file = sheet
+        archive = SessionFile('.zip')
+        write_structured_zip(result.parts, archive.path)
+        st.session_state.qr_parts = {
+            'sheet': sheet,
+            'sheet_display': display_file,
+            'zip': archive,
+            'versions': [(artifact.matrix.shape[0] - 17) // 4 for artifact in result.parts],
+        }
+        st.session_state.generated_qr = None
+        st.session_state.render_notice = ('success', None)
+        return True
+    # Seul le bitmap des modules reste en session, pas les pixels
+    st.session_state.generated_qr = SessionQR.from_artifact(result.artifact)
+    st.session_state.render_notice = ('warning', result.warning) if result.warning else ('success', None)
+    return True
+
+def discard_parts():
+    """Supprime la planche et l'archive des parties gardées en session"""
+    parts = st.session_state.qr_parts
+    if parts:
+        for file in {parts['sheet'], parts['sheet_display'], parts['zip']}:
+            file.discard()
+    st.session_state.qr_parts = None
+
+def set_qr_data(value):
+    """Callback des boutons rapides : l'état est posé avant le rerun du clic"""
+    st.session_state.qr_data = value
+
+def show_estimate(data, config, split_long):
+    """Version, taille et place restante prévues, lues dans la table de capacités"""
+    guess = estimate(data, config)
+    level = f"{EC_NAMES[guess.level]}{' auto' if config['error_correction'] == AUTO_ERROR_CORRECTION else ''}"
+    if guess.version is None:
+        over = f"{-guess.remaining} {guess.unit} de trop pour la version 40 ({level})"
+        if guess.low is not None:
+            st.caption(f"📐 {over} en un seul segment : tiendra peut-être une fois découpé en segments")
+        elif split_long:
+            st.caption(f"📐 {over} : le contenu sera réparti sur plusieurs QR codes")
+        else:
+            st.warning(f"📐 {over}")
+        return
+    # Contenu mixte : la version exacte dépend du découpage en segments
+    bound = "" if guess.exact else "au plus "
+    versions = guess.version if guess.exact else f"{guess.low} à {guess.version}"
+    st.caption(f"📐 Version {versions} ({level}) • {bound}{guess.modules}×{guess.modules} modules, "
+               f"{guess.pixels}×{guess.pixels} px • {'au moins ' if bound else ''}{guess.remaining} "
+               f"{guess.unit} libres sur {guess.capacity} ({guess.mode_name})")
+
+def get_qr_download_link(artifact, filename="qr_code.png"):
     """Génère un lien de téléchargement pour l'image"""
-    buffered = BytesIO()
-    img.save(buffered, format="PNG")
-    img_str = base64.b64encode(buffered.getvalue()).decode()
-    href = f'<a href="data:image/png;base64,{img_str}" download="{filename}" style="text-decoration: none;">📥 Télécharger</a>'
+    href = f'<a href="{artifact.data_uri()}" download="{filename}" style="text-decoration: none;">📥 Télécharger</a>'
     return href
 
-def create_wifi_qr(ssid, password, security='WPA'):
-    """Crée un QR code pour connexion WiFi"""
-    security_map = {
-        'WPA': 'WPA',
-        'WEP': 'WEP',
-        'None': 'nopass'
-    }
-    wifi_type = security_map.get(security, 'WPA')
-    return f"WIFI:T:{wifi_type};S:{ssid};P:{password};;"
-
-def create_vcard_qr(data):
-    """Crée un QR code vCard"""
-    vcard = "BEGIN:VCARD\nVERSION:3.0\n"
-    vcard += f"FN:{data.get('name', '')}\n"
-    vcard += f"TEL:{data.get('phone', '')}\n"
-    vcard += f"EMAIL:{data.get('email', '')}\n"
-    vcard += f"ORG:{data.get('company', '')}\n"
-    vcard += f"TITLE:{data.get('title', '')}\n"
-    vcard += f"ADR:{data.get('address', '')}\n"
-    vcard += f"URL:{data.get('website', '')}\n"
-    vcard += f"NOTE:{data.get('note', '')}\n"
-    vcard += "END:VCARD"
-    return vcard
-
-# Header principal
-st.markdown("""
-<div class="main-header">
-    <h1 style="margin:0; font-size: 2.8rem;">🔳 QR Code Pro</h1>
-    <p style="margin:10px 0 0 0; font-size: 1.2rem; opacity: 0.9;">Générateur de QR codes gratuit & personnalisable</p>
-    <div style="margin-top: 15px;">
-        <span class="badge">Gratuit</span>
-        <span class="badge">Sans limites</span>
-        <span class="badge">100% Privé</span>
-    </div>
-</div>
-""", unsafe_allow_html=True)
-
-# Layout principal
-col1, col2 = st.columns([1, 1])
-
-with col1:
-    st.markdown("### 📝 **Contenu du QR Code**")
-    
-    # Sélection du type de contenu
-    content_type = st.selectbox(
-        "Type de contenu",
-        ["URL", "Texte", "Email", "WiFi", "Contact (vCard)", "SMS", "Téléphone", "Événement"],
-        help="Sélectionnez le type de contenu à encoder"
-    )
-    
-    # Champs dynamiques selon le type
-    qr_data = ""
-    
-    if content_type == "URL":
-        url = st.text_input("URL complète", placeholder="https://example.com", 
-                           help="Commencez toujours par http:// ou https://")
-        if url:
-            if not url.startswith(('http://', 'https://')):
-                url = 'https://' + url
-            qr_data = url
-            
-    elif content_type == "Texte":
-        qr_data = st.text_area("Texte à encoder", height=150,
-                              placeholder="Entrez votre texte ici...",
-                              help="Tout texte peut être encodé dans un QR code")
-        
-    elif content_type == "Email":
-        col_email1, col_email2 = st.columns(2)
-        with col_email1:
-            email = st.text_input("Adresse email", placeholder="contact@exemple.com")
-        with col_email2:
-            subject = st.text_input("Sujet", placeholder="Sujet du message")
-        body = st.text_area("Message", placeholder="Corps du message")
-        
-        if email:
-            qr_data = f"mailto:{email}"
-            if subject or body:
-                qr_data += "?"
-                params = []
-                if subject:
-                    params.append(f"subject={subject}")
-                if body:
-                    params.append(f"body={body}")
-                qr_data += "&".join(params)
-                
-    elif content_type == "WiFi":
-        col_wifi1, col_wifi2 = st.columns(2)
-        with col_wifi1:
-            ssid = st.text_input("Nom du réseau (SSID)", placeholder="Nom WiFi")
-        with col_wifi2:
-            password = st.text_input("Mot de passe", type="password")
-        security = st.selectbox("Type de sécurité", ["WPA/WPA2", "WEP", "Aucun"])
-        
-        if ssid and password:
-            qr_data = create_wifi_qr(ssid, password, security)
-            
-    elif content_type == "Contact (vCard)":
-        col_vcard1, col_vcard2 = st.columns(2)
-        with col_vcard1:
-            name = st.text_input("Nom complet")
-            phone = st.text_input("Téléphone")
-            email_vcard = st.text_input("Email")
-        with col_vcard2:
-            company = st.text_input("Entreprise")
-            title = st.text_input("Poste")
-            website = st.text_input("Site web")
-        
-        vcard_data = {
-            'name': name,
-            'phone': phone,
-            'email': email_vcard,
-            'company': company,
-            'title': title,
-            'website': website
-        }
-        qr_data = create_vcard_qr(vcard_data)
-        
-    elif content_type == "SMS":
-        col_sms1, col_sms2 = st.columns(2)
-        with col_sms1:
-            sms_number = st.text_input("Numéro de téléphone", placeholder="+33612345678")
-        with col_sms2:
-            sms_body = st.text_input("Message SMS")
-        
-        if sms_number:
-            qr_data = f"SMSTO:{sms_number}"
-            if sms_body:
-                qr_data += f":{sms_body}"
-                
-    elif content_type == "Téléphone":
-        phone = st.text_input("Numéro de téléphone", placeholder="+33612345678")
-        if phone:
-            qr_data = f"tel:{phone}"
-            
-    elif content_type == "Événement":
-        col_event1, col_event2 = st.columns(2)
-        with col_event1:
-            event_title = st.text_input("Titre de l'événement")
-            event_date = st.date_input("Date")
-            event_time = st.time_input("Heure")
-        with col_event2:
-            event_location = st.text_input("Lieu")
-            event_description = st.text_area("Description")
-        
-        if event_title:
-            qr_data = f"BEGIN:VEVENT\nSUMMARY:{event_title}\n"
-            if event_date:
-                qr_data += f"DTSTART:{event_date}"
-                if event_time:
-                    qr_data += f"T{event_time}"
-            if event_location:
-                qr_data += f"\nLOCATION:{event_location}"
-            if event_description:
-                qr_data += f"\nDESCRIPTION:{event_description}"
-            qr_data += "\nEND:VEVENT"
-
-with col2:
-    st.markdown("### 🎨 **Personnalisation**")
-    
-    # Options de personnalisation
-    with st.expander("📏 **Dimensions**", expanded=True):
-        col_size1, col_size2 = st.columns(2)
-        with col_size1:
-            box_size = st.slider("Taille des modules", 5, 30, 10, 
-                                help="Taille des points du QR code")
-        with col_size2:
-            border = st.slider("Bordure", 1, 10, 4, 
-                              help="Espace blanc autour du QR code")
-    
-    with st.expander("🎨 **Couleurs**", expanded=True):
-        col_color1, col_color2 = st.columns(2)
-        with col_color1:
-            fill_color = st.color_picker("Couleur des modules", "#000000")
-        with col_color2:
-            back_color = st.color_picker("Couleur de fond", "#FFFFFF")
-    
-    with st.expander("🖼️ **Logo personnalisé**"):
-        logo_file = st.file_uploader("Ajouter un logo", type=['png', 'jpg', 'jpeg'],
-                                    help="Le logo sera placé au centre du QR code")
-        if logo_file:
-            logo_size = st.slider("Taille du logo (%)", 10, 40, 15)
-    
-    with st.expander("⚙️ **Paramètres avancés**"):
-        version = st.selectbox("Version QR", 
-                              ["Auto"] + [str(i) for i in range(1, 41)],
-                              help="Version 1-40 (plus grand = plus de données)")
-        error_correction = st.selectbox(
-            "Correction d'erreurs",
-            ["L (7%)", "M (15%)", "Q (25%)", "H (30%)"],
-            help="Plus la correction est élevée, plus le QR code est robuste"
-        )
-        
-        # Mapping correction d'erreurs
-        error_map = {
-            "L (7%)": qrcode.constants.ERROR_CORRECT_L,
-            "M (15%)": qrcode.constants.ERROR_CORRECT_M,
-            "Q (25%)": qrcode.constants.ERROR_CORRECT_Q,
-            "H (30%)": qrcode.constants.ERROR_CORRECT_H
-        }
-
-# Bouton de génération principal
-generate_col1, generate_col2, generate_col3 = st.columns([1, 2, 1])
-with generate_col2:
-    generate_btn = st.button("🚀 **GÉNÉRER LE QR CODE**", 
-                            type="primary", 
-                            use_container_width=True,
-                            disabled=not qr_data)
-
-# Génération du QR code
-if generate_btn and qr_data:
-    with st.spinner("🔄 **Génération en cours...**"):
-        # Préparation de la configuration
-        config = {
-            'box_size': box_size,
-            'border': border,
-            'fill_color': fill_color,
-            'back_color': back_color,
-            'logo': logo_file,
-            'logo_size': logo_size if logo_file else 0,
-            'version': None if version == "Auto" else int(version),
-            'error_correction': error_map.get(error_correction, qrcode.constants.ERROR_CORRECT_H)
-        }
-        
-        # Sauvegarde dans session state
-        st.session_state.qr_data = qr_data
-        st.session_state.qr_config = config
-        
-        # Génération
-        qr_image = generate_qr_code(qr_data, config)
-        
-        if qr_image:
-            st.session_state.generated_qr = qr_image
-            
-            # Animation de succès
-            st.success("✅ **QR code généré avec succès !**")
-            st.balloons()
+@st.fragment(run_every=RENDER_POLL_SECONDS)
+def render_status():
+    """Interroge le rendu en file sans relancer la page ; rerun complet à la fin"""
+    if collect_render():
+        st.rerun()
+    st.info("🔄 **Génération en cours...**")
 
-# Affichage du QR code généré
-if st.session_state.generated_qr:
+@st.fragment
+def result_card(content_type):
+    """Carte du QR généré : ses boutons (formats, test) ne relancent que ce fragment"""
+    qr_artifact = st.session_state.generated_qr.artifact()
+    style = st.session_state.qr_config
     st.markdown("---")
     st.markdown("### 📱 **Votre QR Code**")
-    
+
     # Affichage dans une card
     with st.container():
         st.markdown('<div class="qr-card fade-in">', unsafe_allow_html=True)
-        
+    
         col_display1, col_display2 = st.columns([2, 1])
-        
+    
         with col_display1:
             # Afficher l'image
-            st.image(st.session_state.generated_qr, 
-                    use_column_width=True,
+            # PNG mémorisé dans l'artefact : Streamlit le sert sans réencoder
+            st.image(qr_artifact.display_png(DISPLAY_WIDTH), output_format="PNG",
+                    width="stretch",
                     caption="Votre QR code personnalisé")
-        
+    
         with col_display2:
             st.markdown("#### 📊 **Informations**")
             st.markdown(f"**Type:** {content_type}")
-            st.markdown(f"**Taille:** {box_size}px/module")
-            st.markdown(f"**Couleur:** {fill_color}")
-            
+            st.markdown(f"**Taille:** {style['box_size']}px/module")
+            st.markdown(f"**Couleur:** {style['fill_color']}")
+            compiled = compile_data(st.session_state.qr_data, style)
+            if compiled.version:
+                side = compiled.modules(compiled.version)
+                st.markdown(f"**Version:** {compiled.version} ({side}×{side} modules)")
+                level = resolve_error_correction(st.session_state.qr_data, style)
+                auto = " (auto)" if style['error_correction'] == AUTO_ERROR_CORRECTION else ""
+                st.markdown(f"**Correction:** {EC_NAMES[level]}{auto}")
+                covered = covered_modules(compiled.version, style['border'], style['box_size'],
+                                          style['logo_size'])
+                if style['logo'] and not survives(compiled.version, level, covered):
+                    st.warning("Logo trop grand : il masque plus de modules que la correction "
+                               "d'erreurs ne peut en rétablir. Réduisez-le ou passez en H.")
+                if compiled.version < compiled.default_version:
+                    default_side = compiled.modules(compiled.default_version)
+                    st.caption(f"Segments numériques/alphanumériques : version {compiled.default_version} "
+                               f"({default_side}×{default_side}) sans optimisation, "
+                               f"{default_side ** 2 - side ** 2} modules de moins")
+        
             # Téléchargement
             st.markdown("---")
             st.markdown("#### 💾 **Télécharger**")
-            
+        
             # Formats disponibles
             format_col1, format_col2 = st.columns(2)
             with format_col1:
                 if st.button("PNG", use_container_width=True):
-                    buffered = BytesIO()
-                    st.session_state.generated_qr.save(buffered, format="PNG")
                     st.download_button(
                         label="📥 Télécharger PNG",
-                        data=buffered.getvalue(),
+                        data=qr_artifact.png,
                         file_name="qr_code.png",
                         mime="image/png",
+                        on_click="ignore",
                         use_container_width=True
                     )
-            
+        
             with format_col2:
                 if st.button("JPG", use_container_width=True):
-                    buffered = BytesIO()
-                    rgb_image = st.session_state.generated_qr.convert('RGB')
-                    rgb_image.save(buffered, format="JPEG", quality=95)
                     st.download_button(
                         label="📥 Télécharger JPG",
-                        data=buffered.getvalue(),
+                        data=qr_artifact.jpeg,
                         file_name="qr_code.jpg",
                         mime="image/jpeg",
+                        on_click="ignore",
                         use_container_width=True
                     )
-            
-            # Taille recommandée pour impression
-            st.info(f"**💡 Conseil:** Taille recommandée pour impression: **{box_size * 3}mm**")
         
-        st.markdown('</div>', unsafe_allow_html=True)
+            # Formats vectoriels : écrits depuis la matrice, sans rastérisation
+            format_col3, format_col4 = st.columns(2)
+            with format_col3:
+                if st.button("SVG", use_container_width=True):
+                    st.download_button(
+                        label="📥 Télécharger SVG",
+                        data=qr_artifact.svg,
+                        file_name="qr_code.svg",
+                        mime="image/svg+xml",
+                        on_click="ignore",
+                        use_container_width=True
+                    )
         
+            with format_col4:
+                if st.button("PDF", use_container_width=True):
+                    st.download_button(
+                        label="📥 Télécharger PDF",
+                        data=qr_artifact.pdf,
+                        file_name="qr_code.pdf",
+                        mime="application/pdf",
+                        on_click="ignore",
+                        use_container_width=True
+                    )
+        
+            # Taille recommandée pour impression
+            st.info(f"**💡 Conseil:** Taille recommandée pour impression: **{style['box_size'] * 3}mm**. "
+                    "Pour l'impression, préférez SVG ou PDF : vectoriels, ils s'agrandissent sans perte.")
+    
+        st.markdown('</div>', unsafe_allow_html=True)
+    
         # Test du QR code
         st.markdown("### 🔍 **Tester votre QR code**")
         test_col1, test_col2, test_col3 = st.columns(3)
         with test_col1:
-            if st.button("📱 Scanner avec téléphone", use_container_width=True):
-                st.info("Utilisez l'appareil photo de votre téléphone pour scanner ce QR code")
+            if st.button("🔍 Vérifier la lecture", use_container_width=True):
+                # Relecture du PNG livré, avec la géométrie connue du rendu
+                report = verify_artifact(qr_artifact, st.session_state.qr_data, 'PNG')
+                if report.passed:
+                    st.success(f"✅ {report.summary()}")
+                else:
+                    st.error(f"❌ {report.summary()}")
+                st.caption("Confirmez avec l'appareil photo de votre téléphone avant d'imprimer.")
         with test_col2:
             if st.button("🔄 Regénérer", use_container_width=True):
-                st.rerun()
+                st.rerun(scope="fragment")
         with test_col3:
             if st.button("🗑️ Réinitialiser", use_container_width=True):
                 st.session_state.generated_qr = None
+                st.session_state.qr_parts = None
                 st.session_state.qr_data = ""
                 st.rerun()
 
+# Header principal
+st.markdown("""
+<div class="main-header">
+    <h1 style="margin:0; font-size: 2.8rem;">🔳 QR Code Pro</h1>
+    <p style="margin:10px 0 0 0; font-size: 1.2rem; opacity: 0.9;">Générateur de QR codes gratuit & personnalisable</p>
+    <div style="margin-top: 15px;">
+        <span class="badge">Gratuit</span>
+        <span class="badge">Sans limites</span>
+        <span class="badge">100% Privé</span>
+    </div>
+</div>
+""", unsafe_allow_html=True)
+
+# Onglets principaux
+tab_single, tab_batch = st.tabs(["🔳 QR Code unique", "📦 Génération en lot"])
+
+with tab_single:
+    # Layout principal
+    col1, col2 = st.columns([1, 1])
+
+    with col1:
+        st.markdown("### 📝 **Contenu du QR Code**")
+    
+        # Sélection du type de contenu
+        content_type = st.selectbox(
+            "Type de contenu",
+            ["URL", "Texte", "Email", "WiFi", "Contact (vCard)", "SMS", "Téléphone", "Événement"],
+            help="Sélectionnez le type de contenu à encoder"
+        )
+    
+        # Champs dynamiques selon le type
+        qr_data = ""
+        # Durées des étapes de ce rerun (construction du contenu, génération, export)
+        run_timings = {}
+    
+        if content_type == "URL":
+            url = st.text_input("URL complète", placeholder="https://example.com", 
+                               help="Commencez toujours par http:// ou https://")
+            if url:
+                with timed('payload', into=run_timings):
+                    qr_data = create_url_qr(url)
+            
+        elif content_type == "Texte":
+            qr_data = st.text_area("Texte à encoder", height=150,
+                                  placeholder="Entrez votre texte ici...",
+                                  help="Tout texte peut être encodé dans un QR code")
+        
+        elif content_type == "Email":
+            col_email1, col_email2 = st.columns(2)
+            with col_email1:
+                email = st.text_input("Adresse email", placeholder="contact@exemple.com")
+            with col_email2:
+                subject = st.text_input("Sujet", placeholder="Sujet du message")
+            body = st.text_area("Message", placeholder="Corps du message")
+        
+            if email:
+                with timed('payload', into=run_timings):
+                    qr_data = create_email_qr(email, subject, body)
+                
+        elif content_type == "WiFi":
+            col_wifi1, col_wifi2 = st.columns(2)
+            with col_wifi1:
+                ssid = st.text_input("Nom du réseau (SSID)", placeholder="Nom WiFi")
+            with col_wifi2:
+                password = st.text_input("Mot de passe", type="password")
+            security = st.selectbox("Type de sécurité", ["WPA/WPA2", "WEP", "Aucun"])
+        
+            if ssid and password:
+                with timed('payload', into=run_timings):
+                    qr_data = create_wifi_qr(ssid, password, security)
+            
+        elif content_type == "Contact (vCard)":
+            col_vcard1, col_vcard2 = st.columns(2)
+            with col_vcard1:
+                name = st.text_input("Nom complet")
+                phone = st.text_input("Téléphone")
+                email_vcard = st.text_input("Email")
+            with col_vcard2:
+                company = st.text_input("Entreprise")
+                title = st.text_input("Poste")
+                website = st.text_input("Site web")
+        
+            vcard_data = {
+                'name': name,
+                'phone': phone,
+                'email': email_vcard,
+                'company': company,
+                'title': title,
+                'website': website
+            }
+            with timed('payload', into=run_timings):
+                qr_data = create_vcard_qr(vcard_data)
+        
+        elif content_type == "SMS":
+            col_sms1, col_sms2 = st.columns(2)
+            with col_sms1:
+                sms_number = st.text_input("Numéro de téléphone", placeholder="+33612345678")
+            with col_sms2:
+                sms_body = st.text_input("Message SMS")
+        
+            if sms_number:
+                with timed('payload', into=run_timings):
+                    qr_data = create_sms_qr(sms_number, sms_body)
+                
+        elif content_type == "Téléphone":
+            phone = st.text_input("Numéro de téléphone", placeholder="+33612345678")
+            if phone:
+                with timed('payload', into=run_timings):
+                    qr_data = create_tel_qr(phone)
+            
+        elif content_type == "Événement":
+            col_event1, col_event2 = st.columns(2)
+            with col_event1:
+                event_title = st.text_input("Titre de l'événement")
+                event_date = st.date_input("Date")
+                event_time = st.time_input("Heure")
+            with col_event2:
+                event_location = st.text_input("Lieu")
+                event_description = st.text_area("Description")
+        
+            if event_title:
+                with timed('payload', into=run_timings):
+                    qr_data = create_event_qr(event_title, event_date, event_time,
+                                              event_location, event_description)
+
+        # Estimation sous le formulaire, remplie une fois les options connues
+        estimate_slot = st.empty()
+
+    with col2:
+        st.markdown("### 🎨 **Personnalisation**")
+    
+        # Options de personnalisation
+        with st.expander("📏 **Dimensions**", expanded=True):
+            col_size1, col_size2 = st.columns(2)
+            with col_size1:
+                box_size = st.slider("Taille des modules", 5, 30, 10, 
+                                    help="Taille des points du QR code")
+            with col_size2:
+                border = st.slider("Bordure", 1, 10, 4, 
+                                  help="Espace blanc autour du QR code")
+    
+        with st.expander("🎨 **Couleurs**", expanded=True):
+            col_color1, col_color2 = st.columns(2)
+            with col_color1:
+                fill_color = st.color_picker("Couleur des modules", "#000000")
+            with col_color2:
+                back_color = st.color_picker("Couleur de fond", "#FFFFFF")
+    
+        with st.expander("🖼️ **Logo personnalisé**"):
+            logo_file = st.file_uploader("Ajouter un logo", type=['png', 'jpg', 'jpeg'],
+                                        help="Le logo sera placé au centre du QR code")
+            if logo_file:
+                logo_size = st.slider("Taille du logo (%)", 10, 40, 15)
+    
+        with st.expander("⚙️ **Paramètres avancés**"):
+            version = st.selectbox("Version QR", 
+                                  ["Auto"] + [str(i) for i in range(1, 41)],
+                                  help="Version 1-40 (plus grand = plus de données)")
+            error_correction = st.selectbox(
+                "Correction d'erreurs",
+                ["Auto (selon le logo)", "L (7%)", "M (15%)", "Q (25%)", "H (30%)"],
+                help="Plus la correction est élevée, plus le QR code est robuste. "
+                     "Auto : le niveau le plus bas qui résiste à la surface masquée par le logo"
+            )
+            renderer = st.selectbox(
+                "Moteur de rendu",
+                ["numpy", "pil"],
+                help="numpy : rendu vectorisé rapide • pil : rendu d'origine de la librairie qrcode (pixels identiques)"
+            )
+            split_long = st.checkbox(
+                "✂️ Découper les contenus trop longs", value=True,
+                help="Au-delà de la version 40, répartit le contenu sur 2 à 16 QR codes (ajout structuré) "
+                     "que les lecteurs compatibles réassemblent"
+            )
+        
+            # Mapping correction d'erreurs
+            error_map = {
+                "Auto (selon le logo)": AUTO_ERROR_CORRECTION,
+                "L (7%)": qrcode.constants.ERROR_CORRECT_L,
+                "M (15%)": qrcode.constants.ERROR_CORRECT_M,
+                "Q (25%)": qrcode.constants.ERROR_CORRECT_Q,
+                "H (30%)": qrcode.constants.ERROR_CORRECT_H
+            }
+
+    # Préparation de la configuration
+    current_config = {
+        'box_size': box_size,
+        'border': border,
+        'fill_color': fill_color,
+        'back_color': back_color,
+        'logo': logo_file,
+        'logo_size': logo_size if logo_file else 0,
+        'version': None if version == "Auto" else int(version),
+        'error_correction': error_map.get(error_correction, qrcode.constants.ERROR_CORRECT_H),
+        'renderer': renderer
+    }
+
+    # Rien n'est encodé ici : simple lecture de la table de capacités
+    if qr_data:
+        with estimate_slot.container():
+            show_estimate(qr_data, current_config, split_long)
+
+    # Aperçu en direct, sur demande : il encode le contenu à chaque frappe.
+    # Encodage en cache, style re-rastérisé à la largeur de l'aperçu
+    with col2:
+        live_preview = st.toggle("👁️ Aperçu en direct", value=False,
+                                 help="Encode le contenu à chaque modification ; "
+                                      "mis à jour à chaque changement de couleur, taille ou bordure")
+        if live_preview and qr_data:
+            try:
+                st.image(preview_qr_code(qr_data, current_config, PREVIEW_WIDTH), width=PREVIEW_WIDTH,
+                         caption="Aperçu")
+            except Exception as e:
+                st.caption(f"Aperçu indisponible: {e}")
+
+    # Bouton de génération principal
+    generate_col1, generate_col2, generate_col3 = st.columns([1, 2, 1])
+    with generate_col2:
+        generate_btn = st.button("🚀 **GÉNÉRER LE QR CODE**", 
+                                type="primary", 
+                                use_container_width=True,
+                                disabled=not qr_data)
+
+    # Génération du QR code : en file dans le pool de rendu partagé
+    if generate_btn and qr_data:
+        # Trop long pour un seul symbole : ajout structuré, si l'option est cochée
+        structured = split_long and compile_data(qr_data, current_config).version is None
+        wait([submit_render(qr_data, current_config, run_timings, structured)], timeout=RENDER_INLINE_WAIT)
+    collect_render()
+
+    if st.session_state.render_job:
+        render_status()
+
+    notice = st.session_state.render_notice
+    st.session_state.render_notice = None
+    if notice:
+        level, message = notice
+        if level == 'success':
+            # Animation de succès
+            st.success("✅ **QR code généré avec succès !**")
+            st.balloons()
+        elif level == 'warning':
+            st.warning(message)
+        else:
+            st.error(message)
+
+    # Affichage du QR code généré
+    if st.session_state.generated_qr:
+        result_card(content_type)
+    elif st.session_state.qr_parts:
+        parts = st.session_state.qr_parts
+        st.markdown("---")
+        st.markdown(f"### 🧩 **Votre contenu en {len(parts['versions'])} QR codes**")
+        st.image(parts['sheet_display'].path, output_format="PNG", caption="Planche des parties, dans l'ordre de lecture")
+        st.caption(f"Versions {min(parts['versions'])} à {max(parts['versions'])} • un lecteur compatible "
+                   "ajout structuré reconstitue le contenu quel que soit l'ordre de scan")
+        parts_col1, parts_col2 = st.columns(2)
+        with parts_col1:
+            st.download_button("📥 Planche PNG", parts['sheet'].read, file_name="qr_parties.png",
+                               mime="image/png", on_click="ignore", use_container_width=True)
+        with parts_col2:
+            st.download_button("📥 Parties (ZIP)", parts['zip'].read, file_name="qr_parties.zip",
+                               mime="application/zip", on_click="ignore", use_container_width=True)
+
+with tab_batch:
+    st.markdown("### 📦 **Génération en lot**")
+    st.markdown("Importez un fichier **CSV** ou **JSON** : une ligne par QR code. "
+                "La colonne `type` choisit le format (url, text, email, wifi, vcard, sms, tel, event), "
+                "`data` encode un contenu brut et `filename` nomme le fichier dans l'archive.")
+    batch_file = st.file_uploader("Fichier de contenus", type=['csv', 'json'], key="batch_file")
+    batch_format = st.radio("Format des images", ["PNG", "JPG", "SVG", "PDF"], horizontal=True, key="batch_format")
+    batch_verify = st.checkbox("🔍 Vérifier la lecture de chaque QR code", value=True, key="batch_verify",
+                               help="Chaque image est relue et décodée après l'ajout du logo")
+    st.caption("Les options de personnalisation de l'onglet « QR Code unique » s'appliquent à tout le lot.")
+
+    if batch_file and st.button("📦 **GÉNÉRER LE LOT**", type="primary", use_container_width=True):
+        try:
+            records = load_records(batch_file)
+        except Exception as e:
+            st.error(f"Fichier illisible: {e}")
+            records = []
+
+        if records:
+            progress_bar = st.progress(0.0, text="🔄 Génération du lot...")
+
+            def report_progress(done, total):
+                progress_bar.progress(done / total, text=f"🔄 {done}/{total} QR codes")
+
+            # Archive sur disque : la session ne garde que le chemin
+            if st.session_state.batch_zip:
+                st.session_state.batch_zip.discard()
+            archive = SessionFile('.zip')
+            stats = generate_batch_zip(records, current_config, archive.path, fmt=batch_format,
+                                       progress=report_progress, verify=batch_verify)
+            st.session_state.batch_zip = archive
+            st.session_state.batch_stats = stats
+
+    if st.session_state.batch_zip:
+        stats = st.session_state.batch_stats
+        st.success(f"✅ **{stats['written']}/{stats['total']} QR codes générés** en "
+                   f"{stats['seconds']:.1f} s ({stats['codes_per_second']:.0f} codes/s)")
+        for index, error in stats['errors'][:10]:
+            st.warning(f"Ligne {index + 1}: {error}")
+        if 'verified' in stats:
+            if stats['failed']:
+                st.error(f"❌ **{len(stats['failed'])}/{stats['verified']} QR codes illisibles** "
+                         "(logo trop grand ou contraste insuffisant)")
+                for index, summary in stats['failed'][:10]:
+                    st.warning(f"Ligne {index + 1}: {summary}")
+            else:
+                st.success(f"🔍 {stats['verified']} QR codes relus et décodés sans erreur")
+            st.caption(f"Vérification : {stats['verifications_per_second']:.0f} codes/s par processus")
+        st.download_button(
+            label="📥 Télécharger le ZIP",
+            data=st.session_state.batch_zip.read,
+            file_name="qr_codes.zip",
+            mime="application/zip",
+            on_click="ignore",
+            use_container_width=True
+        )
+
+    st.markdown("---")
+    st.markdown("#### 🏷️ **Planche d'étiquettes**")
+    st.markdown("Le même fichier, imposé sur des planches à imprimer (PDF vectoriel, plusieurs pages). "
+                "La colonne `label` s'imprime sous chaque QR code.")
+    labels_col1, labels_col2 = st.columns(2)
+    with labels_col1:
+        labels_template = st.selectbox("Gabarit", list(TEMPLATES),
+                                       format_func=lambda name: TEMPLATES[name].name, key="labels_template")
+    with labels_col2:
+        labels_code_mm = st.number_input("Côté du QR code (mm, 0 = maximum)", 0.0, 200.0, 0.0,
+                                         step=1.0, key="labels_code_mm")
+
+    if batch_file and st.button("🏷️ **GÉNÉRER LES ÉTIQUETTES**", use_container_width=True):
+        try:
+            records = load_records(batch_file)
+        except Exception as e:
+            st.error(f"Fichier illisible: {e}")
+            records = []
+
+        if records:
+            progress_bar = st.progress(0.0, text="🔄 Imposition des étiquettes...")
+
+            def report_progress(done, total):
+                progress_bar.progress(done / total, text=f"🔄 {done}/{total} étiquettes")
+
+            document = SessionFile('.pdf')
+            try:
+                stats = write_label_sheets(records, current_config, document.path, labels_template,
+                                           code_mm=labels_code_mm or None, progress=report_progress)
+            except ValueError as e:
+                document.discard()
+                st.error(str(e))
+            else:
+                if st.session_state.labels_pdf:
+                    st.session_state.labels_pdf.discard()
+                st.session_state.labels_pdf = document
+                st.session_state.labels_stats = stats
+
+    if st.session_state.labels_pdf:
+        stats = st.session_state.labels_stats
+        st.success(f"✅ **{stats['written']} étiquettes sur {stats['pages']} page(s)** • "
+                   f"{stats['distinct']} QR code(s) distinct(s), en {stats['seconds']:.1f} s")
+        for index, error in stats['errors'][:10]:
+            st.warning(f"Ligne {index + 1}: {error}")
+        st.download_button(
+            label="📥 Télécharger les étiquettes (PDF)",
+            data=st.session_state.labels_pdf.read,
+            file_name="etiquettes.pdf",
+            mime="application/pdf",
+            on_click="ignore",
+            use_container_width=True
+        )
+
 # Section des QR codes rapides
 st.markdown("---")
 st.markdown("### ⚡ **QR Codes Rapides**")
 
 quick_cols = st.columns(4)
 with quick_cols[0]:
-    if st.button("🌐 Google", use_container_width=True):
-        st.session_state.qr_data = "https://www.google.com"
-        st.rerun()
+    st.button("🌐 Google", use_container_width=True, on_click=set_qr_data, args=("https://www.google.com",))
 with quick_cols[1]:
-    if st.button("📱 WhatsApp", use_container_width=True):
-        st.session_state.qr_data = "https://wa.me/33600000000"
-        st.rerun()
+    st.button("📱 WhatsApp", use_container_width=True, on_click=set_qr_data, args=("https://wa.me/33600000000",))
 with quick_cols[2]:
-    if st.button("📧 Gmail", use_container_width=True):
-        st.session_state.qr_data = "https://mail.google.com"
-        st.rerun()
+    st.button("📧 Gmail", use_container_width=True, on_click=set_qr_data, args=("https://mail.google.com",))
 with quick_cols[3]:
-    if st.button("📍 Maps", use_container_width=True):
-        st.session_state.qr_data = "https://maps.google.com"
-        st.rerun()
+    st.button("📍 Maps", use_container_width=True, on_click=set_qr_data, args=("https://maps.google.com",))
 
 # Section d'utilisation
 with st.expander("📚 **Guide d'utilisation**", expanded=False):
@@ -585,20 +847,9 @@ with footer_col2:
     </div>
     """, unsafe_allow_html=True)
 
-# Sidebar avec informations supplémentaires
-with st.sidebar:
-    st.markdown("### ℹ️ **À propos**")
-    st.markdown("""
-    **QR Code Pro** est un générateur de QR codes :
-    
-    ✓ **100% gratuit** - Pas de limitations
-    ✓ **Aucun enregistrement** - Vos données restent privées
-    ✓ **Fonctionne hors ligne** - Après chargement initial
-    ✓ **Multi-formats** - PNG, JPG
-    ✓ **Personnalisation avancée** - Couleurs, logos, etc.
-    """)
-    
-    st.markdown("---")
+@st.fragment
+def sidebar_panel():
+    """Statistiques et partage : leurs widgets ne relancent que ce fragment"""
     st.markdown("### 📊 **Statistiques**")
     
     if st.session_state.generated_qr:
@@ -608,16 +859,68 @@ with st.sidebar:
         st.metric("📏 Taille du QR", f"{qr_size[0]}×{qr_size[1]} px")
         st.metric("📊 Données encodées", f"{data_length} caractères")
         st.metric("🎨 Couleur principale", st.session_state.qr_config.get('fill_color', '#000000'))
+        if st.checkbox("🗜️ Comparer au PNG 32 bits", help="Encode une fois la version RGBA d'origine pour mesurer le gain"):
+            png_bytes, rgba_bytes = st.session_state.generated_qr.artifact().png_savings()
+            st.metric("🗜️ PNG optimisé", f"{png_bytes / 1024:.1f} Ko",
+                      delta=f"-{(rgba_bytes - png_bytes) / 1024:.1f} Ko vs RGBA ({rgba_bytes / 1024:.1f} Ko)",
+                      delta_color="inverse")
+    
+    if st.session_state.qr_timings:
+        st.markdown("**⏱️ Dernière génération**")
+        st.table({
+            "Étape": list(st.session_state.qr_timings),
+            "ms": [f"{seconds * 1000:.2f}" for seconds in st.session_state.qr_timings.values()],
+        })
+    
+    with st.expander("⏱️ Latences (toutes sessions)"):
+        stage_summary = stage_stats.summary()
+        if stage_summary:
+            st.table({
+                "Étape": list(stage_summary),
+                "p50 ms": [f"{v['p50'] * 1000:.2f}" for v in stage_summary.values()],
+                "p95 ms": [f"{v['p95'] * 1000:.2f}" for v in stage_summary.values()],
+                "n": [v['count'] for v in stage_summary.values()],
+            })
+            st.download_button("📥 JSON", stage_stats.to_json(), file_name="qrpro_timings.json",
+                               mime="application/json", on_click="ignore", use_container_width=True)
+            st.download_button("📥 Prometheus", stage_stats.to_prometheus(), file_name="qrpro_timings.prom",
+                               mime="text/plain", on_click="ignore", use_container_width=True)
+        else:
+            st.caption("Aucune mesure pour l'instant")
+    
+    cache_stats = render_cache.stats()
+    st.caption(f"Cache de rendu : {cache_stats['hits']} succès / {cache_stats['misses']} échecs • "
+               f"{cache_stats['entries']} codes, {cache_stats['bytes'] / 1e6:.1f} Mo")
+    if disk_store is not None:
+        store_stats = disk_store.stats()
+        st.caption(f"Cache disque : {store_stats['hits']} succès / {store_stats['misses']} échecs • "
+                   f"{store_stats['entries']} fichiers, {store_stats['bytes'] / 1e6:.1f} Mo")
+    worker_stats = render_worker.stats()
+    st.caption(f"File de rendu : {worker_stats['pending']} en cours sur {worker_stats['workers']} threads • "
+               f"{worker_stats['shared']}/{worker_stats['submitted']} demandes partagées")
     
     st.markdown("---")
     st.markdown("### 🌐 **Partager**")
     
     if st.session_state.generated_qr:
-        buffered = BytesIO()
-        st.session_state.generated_qr.save(buffered, format="PNG")
-        img_str = base64.b64encode(buffered.getvalue()).decode()
-        
-        html_code = f'<img src="data:image/png;base64,{img_str}" width="200" alt="QR Code">'
+        # URI base64 mémorisée dans l'artefact : aucun ré-encodage entre deux reruns
+        html_code = f'<img src="{st.session_state.generated_qr.artifact().data_uri()}" width="200" alt="QR Code">'
         
         st.code(html_code, language='html')
         st.caption("Code HTML pour intégration")
+
+# Sidebar avec informations supplémentaires
+with st.sidebar:
+    st.markdown("### ℹ️ **À propos**")
+    st.markdown("""
+    **QR Code Pro** est un générateur de QR codes :
+    
+    ✓ **100% gratuit** - Pas de limitations
+    ✓ **Aucun enregistrement** - Vos données restent privées
+    ✓ **Fonctionne hors ligne** - Après chargement initial
+    ✓ **Multi-formats** - PNG, JPG, SVG, PDF
+    ✓ **Personnalisation avancée** - Couleurs, logos, etc.
+    """)
+    
+    st.markdown("---")
+    sidebar_panel()